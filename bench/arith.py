@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import evaluator
+from evaluator import init_env, run_ast
+from nodes import from_json
+from astgen import var, op, define, assign, while_
+
+# Arithmetic-heavy loops on the tree walker, with the operator inline caches
+# (evaluator.OperatorSite) and with them switched off, i.e. every operator
+# looked up in the env and applied through eval_apply.
+
+def loop(n, body, init):
+	return init + [
+		define('i', 0),
+		while_(op('<', var('i'), n), body + [assign('i', op('+', var('i'), 1))]),
+	]
+
+def int_arith(n):
+	return loop(n, [
+		assign('s', op('%', op('+', var('s'), op('*', var('i'), var('i'))), 1000003)),
+	], [define('s', 0)])
+
+def float_arith(n):
+	return loop(n, [
+		assign('s', op('+', op('*', var('s'), 0.5), op('/.', var('i'), 3.0))),
+	], [define('s', 0.0)])
+
+def compare(n):
+	return loop(n, [
+		assign('s', op('+', var('s'), op('-', op('>=', op('%', var('i'), 3), 1), op('==', var('i'), 7)))),
+	], [define('s', 0)])
+
+def str_concat(n):
+	return loop(n, [
+		assign('s', op('+', var('t'), 'ab')),
+	], [define('s', ''), define('t', 'xy')])
+
+def mixed(n):
+	# str + int is not specialized, the site falls back to plus()
+	return loop(n, [
+		assign('s', op('+', 'x', var('i'))),
+	], [define('s', '')])
+
+WORKLOADS = [
+	('int + * %', int_arith),
+	('float + * /.', float_arith),
+	('compare', compare),
+	('str + str', str_concat),
+	('str + int', mixed),
+]
+
+def run(ast, cached):
+	evaluator.inline_caches = cached
+	env = init_env()
+	start = time.perf_counter()
+	run_ast(ast, env, 'tree')
+	return time.perf_counter() - start, env[1]['s']
+
+def main():
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+	print('{0:<16}{1:>12}{2:>12}{3:>10}{4:>14}'.format('workload', 'generic s', 'cached s', 'speedup', 'cached ops/s'))
+	try:
+		for name, build in WORKLOADS:
+			generic, expected = run(from_json(build(n)), False)
+			cached, result = run(from_json(build(n)), True)
+			if result != expected:
+				raise SystemExit('inline caches changed the result of ' + name)
+			print('{0:<16}{1:>12.3f}{2:>12.3f}{3:>9.2f}x{4:>14,.0f}'.format(name, generic, cached, generic / cached, n / cached))
+	finally:
+		evaluator.inline_caches = True
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,59 @@
+# Helpers that build dict ASTs in the same shape as example/*.json, for
+# benchmark programs the Python parser can't produce yet. Run them through
+# nodes.from_json() first, like the JSON loader does.
+
+def var(name, line=0):
+	return {'tag': 'variable', 'name': name, 'type': 'variable', 'line': line}
+
+def op(name, *operands):
+	return {
+		'tag': 'application',
+		'operator': {'tag': 'variable', 'name': name, 'type': 'operator', 'line': 0},
+		'operands': list(operands),
+		'line': 0,
+	}
+
+def call(name, *operands):
+	return {'tag': 'application', 'operator': var(name), 'operands': list(operands), 'line': 0}
+
+def define(name, right):
+	return {'tag': 'var_definition', 'left': name, 'right': right, 'line': 0}
+
+def assign(name, right):
+	return {'tag': 'assignment', 'left': var(name), 'right': right, 'returnLeft': False, 'line': 0}
+
+def func(name, parameters, body):
+	return define(name, {
+		'tag': 'function_definition',
+		'is_class': False,
+		'name': name,
+		'parent': [],
+		'parameters': list(parameters),
+		'body': body,
+		'line': 0,
+	})
+
+def ret(expression):
+	return {'tag': 'return', 'expression': expression, 'line': 0}
+
+def if_(predicate, consequent, alternative=None):
+	return {'tag': 'if', 'predicate': predicate, 'consequent': consequent, 'alternative': alternative, 'line': 0}
+
+def while_(predicate, consequent):
+	return {'tag': 'while', 'predicate': predicate, 'consequent': consequent, 'line': 0}
+
+def for_range(name, start, end, consequent, closed=False, increment=None):
+	return {
+		'tag': 'for',
+		'variable': var(name),
+		'range': {'tag': 'range', 'from': start, 'to': end, 'closed': closed, 'line': 0},
+		'increment': increment,
+		'consequent': consequent,
+		'line': 0,
+	}
+
+def for_in(name, range_expr, consequent):
+	return {'tag': 'for', 'variable': var(name), 'range': range_expr, 'increment': None, 'consequent': consequent, 'line': 0}
+
+def stmt(tag):
+	return {'tag': tag, 'line': 0}
@@ -0,0 +1,60 @@
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import binast
+from nodes import from_json
+
+# Size and load time of the binary AST format against the JSON one, for the
+# example programs: loading JSON means json.loads + from_json, the binary
+# file is decoded whole from bytes or from a memory-mapped file, or only its
+# first top-level statement is decoded.
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'example')
+
+def best(run, repeat=50):
+	times = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		run()
+		times.append(time.perf_counter() - start)
+	return min(times)
+
+def mapped(path, decode):
+	with binast.open_file(path) as f:
+		return decode(f)
+
+def main():
+	names = sys.argv[1:] or ['exp_eval', 'bmi']
+	with tempfile.TemporaryDirectory() as directory:
+		for name in names:
+			with open(os.path.join(EXAMPLES, name + '.json')) as f:
+				text = f.read()
+			data = binast.json_to_binary(json.loads(text))
+			if binast.binary_to_json(data) != json.loads(text):
+				raise SystemExit('round trip changed ' + name)
+			path = os.path.join(directory, name + '.yjab')
+			with open(path, 'wb') as f:
+				f.write(data)
+			source = os.path.join(EXAMPLES, name + '.yjlo')
+			print('{0}: source {1:,} B, JSON {2:,} B, binary {3:,} B ({4:.0f}x smaller than JSON)'.format(
+				name, os.path.getsize(source) if os.path.exists(source) else 0,
+				len(text), len(data), len(text) / len(data)))
+			cases = [
+				('json + from_json', lambda: from_json(json.loads(text))),
+				('binary, bytes', lambda: binast.loads(data)),
+				('binary, mmap', lambda: mapped(path, binast.AstFile.program)),
+				('mmap, 1st statement', lambda: mapped(path, lambda f: f.statement(0))),
+			]
+			baseline = None
+			for case, run in cases:
+				elapsed = best(run)
+				baseline = baseline or elapsed
+				print('  {0:<22}{1:>10.3f} ms{2:>8.1f}x'.format(case, elapsed * 1000, baseline / elapsed))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,60 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from cache import ProgramCache
+from evaluator import init_env, load_ast, load_program
+from lexer import Lexer
+from parser import Parser
+
+# Startup cost with and without the program cache: a cold start parses the
+# JSON AST (and compiles it for the vm) or lexes and parses a script, a warm
+# start unpickles the entry written by the cold one.
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'example')
+
+def best(run, repeat=20):
+	times = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		run()
+		times.append(time.perf_counter() - start)
+	return min(times)
+
+def script(n):
+	return ''.join('total_{0} := ({0} + width) * height - {0} % 7\n'.format(i) for i in range(n))
+
+def main():
+	files = sys.argv[1:] or [os.path.join(EXAMPLES, name) for name in ('exp_eval.json', 'bmi.json')]
+	cases = []
+	for path in files:
+		with open(path) as f:
+			ast_str = f.read()
+		name = os.path.basename(path)
+		cases.append((name, ast_str, 'ast', lambda ast_str=ast_str, cache=None: load_ast(ast_str, cache)))
+		cases.append((name + ' (vm)', ast_str, 'vm', lambda ast_str=ast_str, cache=None: load_program(ast_str, init_env(), cache)))
+	source = script(2000)
+	cases.append(('2000-line script', source, 'source', lambda source=source, cache=None:
+		cache.load(source, 'source', lambda: Parser().parse(list(Lexer().scan(source)))) if cache
+		else Parser().parse(list(Lexer().scan(source)))))
+
+	with tempfile.TemporaryDirectory() as directory:
+		cache = ProgramCache(directory)
+		print('{0:<22}{1:>12}{2:>12}{3:>12}{4:>10}'.format('program', 'input KiB', 'cold ms', 'warm ms', 'speedup'))
+		for name, text, kind, load in cases:
+			cold = best(load)
+			load(cache=cache)
+			hits = cache.hits
+			warm = best(lambda: load(cache=cache))
+			if cache.hits - hits != 20:
+				raise SystemExit('cache missed on ' + name)
+			print('{0:<22}{1:>12,.0f}{2:>12.2f}{3:>12.2f}{4:>9.1f}x'.format(
+				name, len(text) / 1024, cold * 1000, warm * 1000, cold / warm))
+		size = sum(size for _, size, _ in cache.entries())
+		print('{0} entries, {1:,.0f} KiB on disk'.format(len(cache.entries()), size / 1024))
+
+if __name__ == '__main__':
+	main()
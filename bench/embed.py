@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from lexer import Lexer
+from parser import Parser
+from evaluator import ENGINES, init_env, run_ast
+from interpreter import Interpreter
+
+# Many runs of one small script, as a service embedding the language would
+# do: lexing, parsing and building the global env on every run against an
+# Interpreter that compiles the script once and layers a fresh global frame
+# over its shared builtin frame per run.
+
+SOURCE = '''
+var total = 0
+for i in 0..<n {
+	total += i * i
+}
+'''
+
+def fresh(n, runs, engine):
+	for k in range(runs):
+		env = init_env()
+		env[1]['n'] = n + k % 3
+		run_ast(Parser().parse(list(Lexer().scan(SOURCE))), env, engine)
+	return env[1]['total']
+
+def embedded(n, runs, engine):
+	interpreter = Interpreter(engine)
+	program = interpreter.compile(SOURCE)
+	for k in range(runs):
+		result = interpreter.run(program, {'n': n + k % 3})
+	return result['total']
+
+def main():
+	runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+	n = 10
+	print('{0:,} runs of a {1}-iteration script'.format(runs, n))
+	print('{0:<10}{1:>12}{2:>12}{3:>10}{4:>14}'.format('engine', 'fresh s', 'embedded s', 'speedup', 'runs/s'))
+	for engine in ENGINES:
+		start = time.perf_counter()
+		expected = fresh(n, runs, engine)
+		before = time.perf_counter() - start
+		start = time.perf_counter()
+		result = embedded(n, runs, engine)
+		after = time.perf_counter() - start
+		if result != expected:
+			raise SystemExit('results differ on ' + engine)
+		print('{0:<10}{1:>12.3f}{2:>12.3f}{3:>9.2f}x{4:>14,.0f}'.format(engine, before, after, before / after, runs / after))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,78 @@
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from evaluator import ENGINES, FunctionType, init_env, run_ast
+from nodes import from_json
+from astgen import var, op, call, define, assign, func, ret, if_, while_
+
+# Compares the execution engines on the example programs and on loop-heavy
+# and call-heavy microbenchmarks. Times include compiling the AST, since
+# that is what a run costs; output is captured instead of printed.
+
+def load_example(name):
+	with open(os.path.join(ROOT, 'example', name)) as f:
+		return json.load(f)
+
+def loop_heavy(n):
+	return [
+		define('i', 0),
+		define('s', 0),
+		while_(op('<', var('i'), n), [
+			assign('s', op('+', var('s'), op('*', var('i'), 2))),
+			assign('i', op('+', var('i'), 1)),
+		]),
+	]
+
+def call_heavy(n):
+	return [
+		func('fib', ['n'], [
+			if_(op('<', var('n'), 2), [ret(var('n'))]),
+			ret(op('+', call('fib', op('-', var('n'), 1)), call('fib', op('-', var('n'), 2)))),
+		]),
+		call('print', call('fib', n)),
+	]
+
+WORKLOADS = [
+	('example/bmi', lambda: load_example('bmi.json'), ['70', '180']),
+	('example/exp_eval', lambda: load_example('exp_eval.json'),
+		['1+2*3', '(4-1)*2', '12 * (3 + 4) - 100 / 7', '((((1+2)*3)-4)/5)%6', 'exit']),
+	('loop-heavy', lambda: loop_heavy(50000), []),
+	('call-heavy (fib 18)', lambda: call_heavy(18), []),
+]
+
+def run_once(ast, engine, inputs):
+	output = []
+	env = init_env()
+	feed = iter(inputs)
+	env[1]['input'] = (FunctionType.PRIMITIVE, lambda prompt='': next(feed))
+	env[1]['print'] = (FunctionType.PRIMITIVE, lambda *xs: output.extend(xs))
+	start = time.perf_counter()
+	run_ast(ast, env, engine)
+	return time.perf_counter() - start, output
+
+def main():
+	repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+	print('{0:<24}'.format('workload') + ''.join('{0:>12}'.format(e) for e in ENGINES))
+	for name, build, inputs in WORKLOADS:
+		ast = from_json(build())
+		times = []
+		outputs = []
+		for engine in ENGINES:
+			best = None
+			for _ in range(repeat):
+				elapsed, output = run_once(ast, engine, inputs)
+				best = elapsed if best is None else min(best, elapsed)
+			times.append(best)
+			outputs.append(output)
+		print('{0:<24}'.format(name) + ''.join('{0:>11.4f}s'.format(t) for t in times))
+		print('{0:<24}'.format('  speedup vs tree') + ''.join('{0:>11.1f}x'.format(times[0] / t) for t in times))
+		if any(output != outputs[0] for output in outputs):
+			raise SystemExit('engines disagree on ' + name)
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from lexer import Lexer
+from parser import Parser
+from evaluator import ENGINES, FunctionType, Governor, init_env, run_ast
+
+# Cost of the resource governor on the bench/workloads programs: each runs
+# without one, which is the normal path and only pays a None check per loop
+# iteration and call, and under a Governor with limits too high to be hit,
+# which counts every step and looks at the clock and the process memory
+# every CHECK_EVERY steps.
+
+WORKLOADS = os.path.join(ROOT, 'bench', 'workloads')
+LIMITS = dict(max_steps=10 ** 12, max_memory=1 << 40, timeout=3600)
+
+def run(ast, engine, governed):
+	env = init_env()
+	env[1]['print'] = (FunctionType.PRIMITIVE, lambda *xs: None)
+	start = time.perf_counter()
+	if governed:
+		with Governor(**LIMITS) as governor:
+			run_ast(ast, env, engine)
+		steps = governor.steps
+	else:
+		run_ast(ast, env, engine)
+		steps = None
+	return time.perf_counter() - start, steps
+
+def best(ast, engine, governed, repeat):
+	return min(run(ast, engine, governed) for _ in range(repeat))
+
+def main():
+	repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+	print('{0:<10}{1:<10}{2:>12}{3:>12}{4:>10}{5:>12}'.format('workload', 'engine', 'plain s', 'governed s', 'overhead', 'steps'))
+	for filename in sorted(os.listdir(WORKLOADS)):
+		with open(os.path.join(WORKLOADS, filename)) as f:
+			ast = Parser().parse(list(Lexer().scan(f.read())))
+		name = os.path.splitext(filename)[0]
+		for engine in ENGINES:
+			plain, _ = best(ast, engine, False, repeat)
+			governed, steps = best(ast, engine, True, repeat)
+			print('{0:<10}{1:<10}{2:>12.3f}{3:>12.3f}{4:>9.1f}%{5:>12,}'.format(
+				name, engine, plain, governed, 100 * (governed - plain) / plain, steps))
+			name = ''
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from lexer import Lexer
+from parser import Parser
+from evaluator import ENGINES, init_env, run_ast
+
+# A sum over n numbers, walked four ways by `for`: a range literal, which the
+# loop counts itself, a Range value, a list built up front and a generator,
+# which hands over one number per yield from a thread of its own. The peak
+# allocation of each, taken in another run under tracemalloc, shows which
+# of them hold the whole sequence.
+
+SOURCES = (
+	('literal', 'var t = 0\nfor i in 0..<n { t += i }'),
+	('range', 'var r = 0..<n\nvar t = 0\nfor i in r { t += i }'),
+	('list', 'var xs = []\nfor i in 0..<n { xs = (n - 1 - i, xs) }\nvar t = 0\nfor i in xs { t += i }'),
+	('generator', 'func count(n) {\n\tvar i = 0\n\twhile i < n {\n\t\tyield i\n\t\ti += 1\n\t}\n}\nvar t = 0\nfor i in count(n) { t += i }'),
+)
+
+def run(ast, engine, n):
+	env = init_env()
+	env[1]['n'] = n
+	start = time.perf_counter()
+	run_ast(ast, env, engine)
+	return time.perf_counter() - start, env[1]['t']
+
+def peak(ast, engine, n):
+	tracemalloc.start()
+	try:
+		run(ast, engine, n)
+		return tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+def main():
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+	asts = [(name, Parser().parse(list(Lexer().scan(source)))) for name, source in SOURCES]
+	print('{0:<10}{1:<12}{2:>10}{3:>16}{4:>12}'.format('engine', 'sequence', 'seconds', 'elements/s', 'peak KiB'))
+	for engine in ENGINES:
+		label = engine
+		for name, ast in asts:
+			runs = [run(ast, engine, n) for _ in range(3)]
+			elapsed = min(seconds for seconds, _ in runs)
+			total = runs[0][1]
+			if total != n * (n - 1) // 2:
+				raise SystemExit('{0} on {1} sums to {2}'.format(name, engine, total))
+			print('{0:<10}{1:<12}{2:>10.3f}{3:>16,.0f}{4:>12,.0f}'.format(
+				label, name, elapsed, n / elapsed, peak(ast, engine, n) / 1024))
+			label = ''
+
+if __name__ == '__main__':
+	main()
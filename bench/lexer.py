@@ -0,0 +1,65 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from lexer import Lexer, tokenize_file
+
+# Lexer throughput and peak memory on a generated source: the character-at-
+# a-time Lexer.tokenize against the master-pattern scanner, over a string and
+# streamed from a memory-mapped file.
+
+SNIPPET = '''/* block
+comment */
+func area_{0}(width, height) {{
+	var total_{0} = width * height + 1_000 - 3.25 // trailing
+	if total_{0} >= 10 && width != height {{
+		print("area: " + total_{0}, 'done')
+	}}
+	for i in 0..<{0} {{ total_{0} += i }}
+	return total_{0}
+}}
+'''
+
+def generate(n):
+	return ''.join(SNIPPET.format(i) for i in range(n))
+
+def measure(run):
+	# timed and traced separately, tracemalloc slows allocation down a lot
+	start = time.perf_counter()
+	count = run()
+	elapsed = time.perf_counter() - start
+	tracemalloc.start()
+	run()
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	return count, elapsed, peak
+
+def main():
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+	source = generate(n)
+	with tempfile.NamedTemporaryFile('w', suffix='.yjlo', delete=False) as f:
+		f.write(source)
+	try:
+		cases = [
+			('tokenize', lambda: len(Lexer().tokenize(source))),
+			('scan', lambda: sum(1 for _ in Lexer().scan(source))),
+			('stream (mmap)', lambda: sum(1 for _ in tokenize_file(f.name))),
+		]
+		print('{0} lines, {1:,} bytes'.format(source.count('\n'), len(source)))
+		print('{0:<16}{1:>10}{2:>10}{3:>14}{4:>12}'.format('lexer', 'tokens', 'seconds', 'tokens/s', 'peak KiB'))
+		counts = set()
+		for name, run in cases:
+			count, elapsed, peak = measure(run)
+			counts.add(count)
+			print('{0:<16}{1:>10,}{2:>10.3f}{3:>14,.0f}{4:>12,.0f}'.format(name, count, elapsed, count / elapsed, peak / 1024))
+	finally:
+		os.unlink(f.name)
+	if len(counts) != 1:
+		raise SystemExit('lexers disagree: ' + str(counts))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,46 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from evaluator import ENGINES, init_env, run_ast
+from nodes import from_json
+from astgen import var, op, call, define, assign, while_, for_range
+
+# List walking: every `.head`/`.tail` checks that its target is a list, so
+# this is quadratic in n unless that check is O(1).
+
+def refer(obj, member):
+	return {'tag': 'application', 'operator': var('.'), 'operands': [obj, var(member)], 'line': 0}
+
+def build_and_walk(n):
+	return [
+		define('xs', call('$list')),
+		for_range('i', 0, n, [
+			assign('xs', op(',', var('i'), var('xs'))),
+		]),
+		define('s', 0),
+		while_(op('_!', refer(var('xs'), 'isEmpty')), [
+			assign('s', op('+', var('s'), refer(var('xs'), 'head'))),
+			assign('xs', refer(var('xs'), 'tail')),
+		]),
+	]
+
+def main():
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+	ast = from_json(build_and_walk(n))
+	results = set()
+	print('{0:<10}{1:>10}{2:>16}'.format('engine', 'seconds', 'elements/s'))
+	for engine in ENGINES:
+		env = init_env()
+		start = time.perf_counter()
+		run_ast(ast, env, engine)
+		elapsed = time.perf_counter() - start
+		results.add(env[1]['s'])
+		print('{0:<10}{1:>10.3f}{2:>16,.0f}'.format(engine, elapsed, n / elapsed))
+	if len(results) != 1:
+		raise SystemExit('engines disagree: ' + str(results))
+
+if __name__ == '__main__':
+	main()
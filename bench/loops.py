@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from evaluator import ENGINES, init_env, run_ast
+from nodes import from_json
+from astgen import var, op, call, define, assign, if_, while_, for_range, for_in, stmt
+
+# Loop throughput: every workload runs its body n times and should do so in
+# constant Python stack on every engine.
+
+def while_loop(n):
+	return [
+		define('i', 0),
+		define('s', 0),
+		while_(op('<', var('i'), n), [
+			assign('s', op('+', var('s'), var('i'))),
+			assign('i', op('+', var('i'), 1)),
+		]),
+	]
+
+def while_break_continue(n):
+	return [
+		define('i', 0),
+		define('s', 0),
+		while_(var('true'), [
+			assign('i', op('+', var('i'), 1)),
+			if_(op('>', var('i'), n), [stmt('break')]),
+			if_(op('==', op('%', var('i'), 2), 0), [stmt('continue')]),
+			assign('s', op('+', var('s'), var('i'))),
+		]),
+	]
+
+def for_range_loop(n):
+	return [
+		define('s', 0),
+		for_range('i', 0, n, [
+			assign('s', op('+', var('s'), var('i'))),
+		]),
+	]
+
+def for_lst_loop(n):
+	return [
+		define('xs', call('$list')),
+		for_range('i', 0, n, [
+			assign('xs', op(',', var('i'), var('xs'))),
+		]),
+		define('s', 0),
+		for_in('x', var('xs'), [
+			assign('s', op('+', var('s'), var('x'))),
+		]),
+	]
+
+WORKLOADS = [
+	('while', while_loop),
+	('while+break/continue', while_break_continue),
+	('for range', for_range_loop),
+	('for in list', for_lst_loop),
+]
+
+def main():
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+	print('{0:<24}{1:<10}{2:>10}{3:>16}'.format('workload', 'engine', 'seconds', 'iterations/s'))
+	for name, build in WORKLOADS:
+		ast = from_json(build(n))
+		results = set()
+		for engine in ENGINES:
+			env = init_env()
+			start = time.perf_counter()
+			run_ast(ast, env, engine)
+			elapsed = time.perf_counter() - start
+			results.add(env[1]['s'])
+			print('{0:<24}{1:<10}{2:>10.3f}{3:>16,.0f}'.format(name, engine, elapsed, n / elapsed))
+		if len(results) != 1:
+			raise SystemExit('engines disagree on ' + name + ': ' + str(results))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from lexer import Lexer
+from parser import Parser
+from evaluator import ENGINES, FunctionType, init_env, memo_counting, memo_stats, run_ast
+from purity import memoize
+
+# Memoization on the bench/workloads programs: each runs as written, then
+# with the pure recursive functions memoized as `--memo` does it, which only
+# finds fib among them; the hits and misses are those of one memoized run.
+# The other workloads show what the unmemoized path costs, a dict lookup
+# per call.
+
+WORKLOADS = os.path.join(ROOT, 'bench', 'workloads')
+
+def parse(source, memo):
+	ast = Parser().parse(list(Lexer().scan(source)))
+	memoize(ast, memo)
+	return ast
+
+def run(ast, engine):
+	env = init_env()
+	env[1]['print'] = (FunctionType.PRIMITIVE, lambda *xs: None)
+	start = time.perf_counter()
+	run_ast(ast, env, engine)
+	return time.perf_counter() - start
+
+def best(ast, engine, repeat):
+	return min(run(ast, engine) for _ in range(repeat))
+
+def main():
+	repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+	print('{0:<10}{1:<10}{2:>12}{3:>12}{4:>10}{5:>10}{6:>10}'.format('workload', 'engine', 'plain s', 'memo s', 'speedup', 'hits', 'misses'))
+	for filename in sorted(os.listdir(WORKLOADS)):
+		with open(os.path.join(WORKLOADS, filename)) as f:
+			source = f.read()
+		plain_ast = parse(source, False)
+		memo_ast = parse(source, True)
+		name = os.path.splitext(filename)[0]
+		for engine in ENGINES:
+			plain = best(plain_ast, engine, repeat)
+			memo = best(memo_ast, engine, repeat)
+			with memo_counting({}) as registry:
+				run(memo_ast, engine)
+			stats = memo_stats(registry)
+			print('{0:<10}{1:<10}{2:>12.4f}{3:>12.4f}{4:>9.1f}x{5:>10,}{6:>10,}'.format(
+				name, engine, plain, memo, plain / memo,
+				sum(s.hits for s in stats), sum(s.misses for s in stats)))
+			name = ''
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,182 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from lexer import Lexer, TokenType
+from parser import Parser
+from nodes import to_json
+
+# Expression parsing: the shunting-yard parser the Parser had before
+# Parser.expression, kept here as ShuntingYard.expr, against the Pratt
+# parser, one expression per line. expr() runs across line breaks, so every
+# line is tokenized on its own, and the lines stick to what it can parse (no
+# parentheses, unary operators or calls), so both must build the same trees.
+# expr() builds JSON-format dicts.
+
+class ShuntingYard(Parser):
+	def expr(self):
+		prev = None
+		node = None
+		infix = []
+		paren_count = 0
+		while not self.reach_eof():
+			if self.t.type == TokenType.NEWLINE:
+				self.skip()
+				# TODO
+				break
+			prev = self.t
+			# TODO check expr terminator
+			if self.check_operator(')') and paren_count == 0:
+				break
+			# TODO bracket
+			if self.check_operator('('):
+				paren_count += 1
+			if self.check_operator(')'):
+				paren_count -= 1
+
+			# process tokens
+			if self.check_name('func'):
+				# TODO
+				pass
+			elif self.check(TokenType.STRING) or self.check(TokenType.NUMBER):
+				# constant
+				node = {
+					'tag': 'constant',
+					'value': self.t.value,
+					'line': self.t.line,
+				}
+				self.advance()
+			elif self.check_name() and self.check_next(TokenType.OPERATOR, '('):
+				# func call
+				node = self.func_call()
+			elif self.check_name():
+				# variable
+				node = {
+					'tag': 'variable',
+					'name': self.t.value,
+					'type': 'variable',
+					'line': self.t.line,
+				}
+				self.advance()
+			elif self.check_operator():
+				# operator
+				node = {
+					'tag': 'variable',
+					'name': self.t.value,
+					'type': 'operator',
+					'line': self.t.line,
+				}
+				self.advance()
+			else:
+				raise Exception('[Parser] Unsupported expression token')
+			infix.append(node)
+		# print(infix)
+		
+		# in-fix to post-fix
+		postfix = []
+		temp_stack = []
+		for node in infix:
+			if node['tag'] == 'variable' and node['type'] == 'variable':
+				postfix.append(node)
+			elif node['tag'] == 'constant':
+				postfix.append(node['value'])
+			else:
+				# operator
+				# TODO unary & increment/decrement
+				while len(temp_stack) > 0 and self.get_precedence(node['name']) <= self.get_precedence(temp_stack[-1]['name']):
+					postfix.append(temp_stack.pop())
+				temp_stack.append(node)
+		while len(temp_stack) > 0:
+			postfix.append(temp_stack.pop())
+		if len(postfix) == 1:
+			return postfix[0]
+
+		# print(postfix)
+		# build AST
+		ast_stack = []
+		for node in postfix:
+			if isinstance(node, dict) and node['tag'] == 'variable' and node['type'] == 'operator':
+				operands = []
+				operands = [ast_stack.pop()] + operands
+				operands = [ast_stack.pop()] + operands
+				apply_node = {
+					'tag': 'application',
+					'operator': node,
+					'operands': operands,
+					'line': node['line'],
+				}
+				ast_stack.append(apply_node)
+			else:
+				ast_stack.append(node)
+		return ast_stack[0]
+
+	def func_call(self):
+		apply_node = {
+			'tag': 'application',
+			'line': self.t.line,
+		}
+		apply_node['operator'] = {
+			'tag': 'variable',
+			'line': self.t.line,
+			'name': self.t.value,
+			'type': 'variable',
+		}
+		operands = []
+		self.advance() # var name
+		self.advance('(')
+		self.ignore_newline()
+		while not self.check_operator(')'):
+			operands.append(self.expr())
+			if self.check_operator(')'):
+				break
+			self.advance(',')
+			self.ignore_newline()
+		self.advance(')')
+		apply_node['operands'] = operands
+		return apply_node
+
+LINES = [
+	'a{0} + b * 3 - c / d == e && g < 2 || h',
+	'total{0} * 1.5 + 2 * width - height % 7 != 0',
+	'x{0} <= y + z * w && x >= 1 || done',
+	'count{0} + 1',
+]
+
+def generate(n):
+	return [LINES[i % len(LINES)].format(i) for i in range(n)]
+
+def parse_expr(lines):
+	asts = []
+	for tokens in lines:
+		parser = ShuntingYard()
+		parser.init_tokens(tokens)
+		asts.append(parser.expr())
+	return asts
+
+def parse_expression(lines):
+	asts = []
+	for tokens in lines:
+		parser = Parser()
+		parser.init_tokens(tokens)
+		asts.append(parser.expression())
+	return asts
+
+def main():
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+	lines = [Lexer().tokenize(line) for line in generate(n)]
+	print('{0:,} lines, {1:,} tokens'.format(n, sum(len(tokens) for tokens in lines)))
+	print('{0:<20}{1:>10}{2:>14}'.format('parser', 'seconds', 'lines/s'))
+	results = []
+	for name, parse in [('expr (shunting)', parse_expr), ('expression (Pratt)', parse_expression)]:
+		start = time.perf_counter()
+		asts = parse(lines)
+		elapsed = time.perf_counter() - start
+		results.append(asts)
+		print('{0:<20}{1:>10.3f}{2:>14,.0f}'.format(name, elapsed, n / elapsed))
+	if results[0] != to_json(results[1]):
+		raise SystemExit('parsers disagree')
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,65 @@
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import lst
+from lexer import Lexer
+from parser import Parser
+from evaluator import ENGINES, FunctionType, init_env, printing, run_ast
+from output import FileWriter, Sink
+
+# print-heavy scripts to /dev/null: the old print, a print() call per value
+# with lists through lst2arr, against the buffered sink. Both write to the
+# same stream, once a buffered file, where the difference is the Python work
+# per print, and once one that writes through as python -u does, where the
+# old print makes a write per value and one per newline.
+
+SOURCES = (
+	('lines', 'for i in 0..<n { print(i, "x") }'),
+	('lists', 'var xs = []\nfor i in 0..<200 { xs = (i, xs) }\nfor i in 0..<n / 100 { print(xs) }'),
+)
+
+def old_print(*xs):
+	for x in xs:
+		if lst.is_lst(x):
+			print(lst.lst2arr(x))
+		else:
+			print(x)
+
+def run(ast, engine, n, devnull, old):
+	env = init_env()
+	env[1]['n'] = n
+	start = time.perf_counter()
+	if old:
+		env[1]['print'] = (FunctionType.PRIMITIVE, old_print)
+		with redirect_stdout(devnull):
+			run_ast(ast, env, engine)
+	else:
+		with printing(Sink(FileWriter(devnull))):
+			run_ast(ast, env, engine)
+	return time.perf_counter() - start
+
+def streams():
+	yield 'buffered', open(os.devnull, 'w')
+	yield 'unbuffered', io.TextIOWrapper(open(os.devnull, 'wb', buffering=0), write_through=True)
+
+def main():
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+	asts = [(name, Parser().parse(list(Lexer().scan(source)))) for name, source in SOURCES]
+	print('{0:<12}{1:<10}{2:<10}{3:>12}{4:>12}{5:>10}'.format('stream', 'engine', 'script', 'print s', 'sink s', 'speedup'))
+	for stream, devnull in streams():
+		with devnull:
+			for engine in ENGINES:
+				label = engine
+				for name, ast in asts:
+					before = min(run(ast, engine, n, devnull, True) for _ in range(3))
+					after = min(run(ast, engine, n, devnull, False) for _ in range(3))
+					print('{0:<12}{1:<10}{2:<10}{3:>12.4f}{4:>12.4f}{5:>9.1f}x'.format(stream, label, name, before, after, before / after))
+					stream = label = ''
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from evaluator import ENGINES
+from interpreter import Interpreter
+
+# A sum over a file of n numbers, one per line, read four ways: input() per
+# line from stdin as scripts had to, lines() of stdin, lines(path) and the
+# lines of mmap(path). Each is timed and then run again under tracemalloc;
+# none of them holds more than a line at a time, so the peaks stay flat as
+# the file grows, and read(path), taken whole for comparison, grows with it.
+
+SOURCES = (
+	('input', 'var t = 0\nfor i in 0..<n { t += int(input()) }'),
+	('stdin lines', 'var t = 0\nfor line in lines() { t += int(line) }'),
+	('file lines', 'var t = 0\nfor line in lines(path) { t += int(line) }'),
+	('mmap lines', 'var v = mmap(path)\nvar t = 0\nfor line in v.lines { t += int(line) }\nv.close()'),
+	('read', 'var s = read(path)\nvar t = s.length'),
+)
+
+def run(interpreter, program, path, n, stdin):
+	with open(path) as f:
+		previous = sys.stdin
+		sys.stdin = f
+		try:
+			start = time.perf_counter()
+			env = interpreter.run(program, {'path': path, 'n': n}, input=None if stdin else f)
+			return time.perf_counter() - start, env['t']
+		finally:
+			sys.stdin = previous
+
+def peak(interpreter, program, path, n, stdin):
+	tracemalloc.start()
+	try:
+		run(interpreter, program, path, n, stdin)
+		return tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+def main():
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+	with tempfile.TemporaryDirectory() as directory:
+		path = os.path.join(directory, 'numbers.txt')
+		with open(path, 'w') as f:
+			for i in range(n):
+				f.write('{0}\n'.format(i))
+		size = os.path.getsize(path)
+		print('{0:,} lines, {1:,} bytes'.format(n, size))
+		print('{0:<10}{1:<14}{2:>10}{3:>14}{4:>12}'.format('engine', 'reading', 'seconds', 'lines/s', 'peak KiB'))
+		for engine in ENGINES:
+			interpreter = Interpreter(engine)
+			label = engine
+			for name, source in SOURCES:
+				program = interpreter.compile(source)
+				# input() goes through builtins.input, which reads sys.stdin
+				stdin = name == 'input'
+				elapsed, total = min(run(interpreter, program, path, n, stdin) for _ in range(3))
+				if total != (size if name == 'read' else n * (n - 1) // 2):
+					raise SystemExit('{0} on {1} gives {2}'.format(name, engine, total))
+				print('{0:<10}{1:<14}{2:>10.3f}{3:>14,.0f}{4:>12,.0f}'.format(
+					label, name, elapsed, n / elapsed, peak(interpreter, program, path, n, stdin) / 1024))
+				label = ''
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,111 @@
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from lexer import Lexer
+from parser import Parser
+from evaluator import ENGINES, init_env, run_ast
+
+# The tokenizer loop of example/exp_eval.yjlo, as written there and with
+# chars() and builder(): the first builds a cell per character up front and
+# copies `current` on every `+=`, so long numbers make it quadratic; the
+# second walks the string in place and joins each number once. Each is timed
+# and then run again under tracemalloc for the peak it allocates, which for
+# the first grows with the input and for the second stays flat.
+
+BEFORE = '''
+func tokenize(str) {
+	var chars = $string_to_char_list(str)
+	var count = 0
+	var total = 0
+	var current = ""
+	while !chars.isEmpty {
+		var c = chars.head
+		if c >= '0' && c <= '9' {
+			current = c
+			chars = chars.tail
+			while !chars.isEmpty && chars.head >= '0' && chars.head <= '9' {
+				current += chars.head
+				chars = chars.tail
+			}
+			total += current.length
+		} else {
+			chars = chars.tail
+		}
+		count += 1
+	}
+	return (count, total)
+}
+var result = tokenize(source)
+'''
+
+AFTER = '''
+func tokenize(str) {
+	var chars = chars(str)
+	var count = 0
+	var total = 0
+	var current = builder()
+	while !chars.isEmpty {
+		var c = chars.head
+		if c >= '0' && c <= '9' {
+			current.clear()
+			while !chars.isEmpty && chars.head >= '0' && chars.head <= '9' {
+				current.add(chars.head)
+				chars = chars.tail
+			}
+			total += current.toString().length
+		} else {
+			chars = chars.tail
+		}
+		count += 1
+	}
+	return (count, total)
+}
+var result = tokenize(source)
+'''
+
+def expression(terms, digits):
+	number = ''.join(str(i % 10) for i in range(digits))
+	return '+'.join([number] * terms)
+
+def run(ast, engine, source):
+	env = init_env()
+	env[1]['source'] = source
+	start = time.perf_counter()
+	run_ast(ast, env, engine)
+	return time.perf_counter() - start, repr(env[1]['result'])
+
+def peak(ast, engine, source):
+	tracemalloc.start()
+	try:
+		run(ast, engine, source)
+		return tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+def main():
+	terms = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+	digits = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+	source = expression(terms, digits)
+	asts = [Parser().parse(list(Lexer().scan(program))) for program in (BEFORE, AFTER)]
+	print('{0} characters, numbers of {1} digits'.format(len(source), digits))
+	print('{0:<10}{1:>12}{2:>12}{3:>10}{4:>14}{5:>14}'.format('engine', 'before s', 'after s', 'speedup', 'before KiB', 'after KiB'))
+	for engine in ENGINES:
+		times = []
+		peaks = []
+		results = set()
+		for ast in asts:
+			elapsed, result = run(ast, engine, source)
+			times.append(elapsed)
+			results.add(result)
+			peaks.append(peak(ast, engine, source) / 1024)
+		if len(results) != 1:
+			raise SystemExit('before and after disagree: ' + str(results))
+		print('{0:<10}{1:>12.4f}{2:>12.4f}{3:>9.1f}x{4:>14,.0f}{5:>14,.0f}'.format(
+			engine, times[0], times[1], times[0] / times[1], peaks[0], peaks[1]))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,187 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from lexer import Lexer
+from parser import Parser
+from evaluator import ENGINES, FunctionType, init_env, run_ast
+from optimizer import optimize
+
+# Benchmark suite over the .yjlo programs in bench/workloads and example/.
+# Every workload is lexed, parsed and evaluated on each engine; the three
+# phases are timed separately (best of --repeat runs), then run once more
+# under tracemalloc for their peak memory, so tracing never skews a time.
+# Evaluation includes compiling for the closure and vm engines, that is
+# what a run costs. Results go to a JSON file named after the commit:
+#
+#   python bench/suite.py                        all workloads, all engines
+#   python bench/suite.py -e tree -e vm fib      some of them
+#   python bench/suite.py --compare old.json     ratios against an earlier run
+
+WORKLOADS = os.path.join(ROOT, 'bench', 'workloads')
+EXAMPLES = os.path.join(ROOT, 'example')
+RESULTS = os.path.join(ROOT, 'bench', 'results')
+# stdin for the examples that read it
+INPUTS = {
+	'bmi': ['70', '180'],
+	'exp_eval': ['1+2*3', '(4-1)*2', '12 * (3 + 4) - 100 / 7', '((((1+2)*3)-4)/5)%6', 'exit'],
+}
+
+def workloads():
+	found = []
+	for directory in (WORKLOADS, EXAMPLES):
+		for filename in sorted(os.listdir(directory)):
+			name, ext = os.path.splitext(filename)
+			if ext == '.yjlo':
+				found.append((name, os.path.join(directory, filename)))
+	return found
+
+def commit():
+	try:
+		rev = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL)
+		dirty = subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT)
+	except (OSError, subprocess.CalledProcessError):
+		return 'unknown'
+	return rev.decode().strip() + ('-dirty' if dirty.strip() else '')
+
+## PHASES
+
+def tokenize(source):
+	return list(Lexer().scan(source))
+
+def parse(tokens):
+	return Parser().parse(tokens)
+
+def evaluate(ast, engine, inputs):
+	# output is captured, so printing is not part of the time
+	output = []
+	env = init_env()
+	feed = iter(inputs)
+	env[1]['input'] = (FunctionType.PRIMITIVE, lambda prompt='': next(feed))
+	env[1]['print'] = (FunctionType.PRIMITIVE, lambda *xs: output.extend(xs))
+	run_ast(ast, env, engine)
+	return output
+
+def best(run, repeat):
+	times = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		result = run()
+		times.append(time.perf_counter() - start)
+	return min(times), result
+
+def peak(run):
+	tracemalloc.start()
+	try:
+		run()
+		return tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+def measure(name, path, engines, repeat, optimized):
+	with open(path) as f:
+		source = f.read()
+	inputs = INPUTS.get(name, [])
+	tokenize_s, tokens = best(lambda: tokenize(source), repeat)
+	parse_s, ast = best(lambda: parse(tokens), repeat)
+	if optimized:
+		ast = optimize(ast)
+	result = {
+		'source_bytes': len(source.encode('utf-8')),
+		'tokens': len(tokens),
+		'tokenize_s': tokenize_s,
+		'parse_s': parse_s,
+		'tokenize_peak_bytes': peak(lambda: tokenize(source)),
+		'parse_peak_bytes': peak(lambda: parse(tokens)),
+		'engines': {},
+	}
+	outputs = {}
+	for engine in engines:
+		evaluate_s, outputs[engine] = best(lambda: evaluate(ast, engine, inputs), repeat)
+		result['engines'][engine] = {
+			'evaluate_s': evaluate_s,
+			'evaluate_peak_bytes': peak(lambda: evaluate(ast, engine, inputs)),
+		}
+	if any(output != outputs[engines[0]] for output in outputs.values()):
+		raise SystemExit('engines disagree on ' + name)
+	return result
+
+## REPORT
+
+def ratio(old, new):
+	if not old or not new:
+		return ''
+	return '{0:>8.2f}x'.format(old / new)
+
+def report(results, baseline=None):
+	# times in ms, peaks in KiB; with a baseline, old / new (> 1 is faster)
+	old = (baseline or {}).get('workloads', {})
+	print('{0:<12}{1:<10}{2:>12}{3:>12}{4:>10}'.format('workload', 'phase', 'ms', 'peak KiB', 'vs base' if baseline else ''))
+	for name, result in results['workloads'].items():
+		before = old.get(name, {})
+		rows = [
+			('tokenize', result['tokenize_s'], result['tokenize_peak_bytes'], before.get('tokenize_s')),
+			('parse', result['parse_s'], result['parse_peak_bytes'], before.get('parse_s')),
+		]
+		for engine, stats in result['engines'].items():
+			rows.append((engine, stats['evaluate_s'], stats['evaluate_peak_bytes'],
+				before.get('engines', {}).get(engine, {}).get('evaluate_s')))
+		for phase, seconds, peak_bytes, base in rows:
+			print('{0:<12}{1:<10}{2:>12.3f}{3:>12,.0f}{4:>10}'.format(
+				name, phase, seconds * 1000, peak_bytes / 1024, ratio(base, seconds) if baseline else ''))
+			name = ''
+
+def main():
+	arg_parser = argparse.ArgumentParser(description='Time and measure YJLO Script workloads per phase and engine.')
+	arg_parser.add_argument('names', nargs='*', help='workloads to run, default all')
+	arg_parser.add_argument('-e', '--engine', action='append', choices=ENGINES, help='engine to run, default all')
+	arg_parser.add_argument('-r', '--repeat', type=int, default=3, help='runs per phase, the best is kept')
+	arg_parser.add_argument('-O', '--optimize', action='store_true', help='run the optimized AST')
+	arg_parser.add_argument('-o', '--out', help='results file, default bench/results/<commit>.json')
+	arg_parser.add_argument('--compare', help='an earlier results file to compare with')
+	args = arg_parser.parse_args()
+
+	found = workloads()
+	names = [name for name, _ in found]
+	for name in args.names:
+		if name not in names:
+			raise SystemExit('unknown workload {0}, one of: {1}'.format(name, ', '.join(names)))
+	engines = args.engine or list(ENGINES)
+	results = {
+		'commit': commit(),
+		'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+		'python': platform.python_implementation() + ' ' + platform.python_version(),
+		'platform': platform.platform(),
+		'repeat': args.repeat,
+		'optimize': args.optimize,
+		'workloads': {},
+	}
+	for name, path in found:
+		if not args.names or name in args.names:
+			results['workloads'][name] = measure(name, path, engines, args.repeat, args.optimize)
+
+	baseline = None
+	if args.compare:
+		with open(args.compare) as f:
+			baseline = json.load(f)
+		print('baseline: {0} ({1})'.format(baseline.get('commit'), baseline.get('time')))
+	report(results, baseline)
+
+	out = args.out
+	if out is None:
+		os.makedirs(RESULTS, exist_ok=True)
+		out = os.path.join(RESULTS, '{0}{1}.json'.format(results['commit'], '-O' if args.optimize else ''))
+	with open(out, 'w') as f:
+		json.dump(results, f, indent=2)
+	print('results written to ' + os.path.relpath(out))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,263 @@
+import io
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+import binast
+from evaluator import ENGINES, EvalExeption, Governor, ResourceExceeded, load_ast
+from interpreter import Interpreter, Program
+from output import MemoryWriter, Sink
+
+# Batch runner: many scripts, or one script over many input sets, on a pool
+# of worker processes. Every script is parsed once here; the pool gets the
+# programs once, when a worker starts, and jobs refer to them by index. The
+# vm engine gets its bytecode compiled here too, closure code doesn't pickle
+# so each worker compiles a script the first time it runs it.
+#
+#   python batch.py scripts/                      every script in a directory
+#   python batch.py exp_eval.yjlo --inputs cases/ one run per input file
+#   python batch.py --manifest jobs.json -j 8 --timeout 5 --max-steps 1000000
+#
+# Limits are enforced by a Governor (see evaluator.py) per job, which names
+# the line a job stopped at; a timer signal a second after the timeout
+# stops a job stuck inside a single primitive.
+#
+# A manifest is a JSON list of {"script": path, "input": [lines] or path},
+# paths relative to the manifest. Outputs are printed in job order, the
+# throughput report goes to stderr.
+
+SCRIPT_EXTS = ('.yjlo', '.json', '.yjab')
+ALARM_GRACE = 1.0
+# a job's own globals: none, its lines are the input of the run, see Worker.run
+RUN_GLOBALS = ()
+
+class JobTimeout(BaseException):
+	# a BaseException, so nothing in a script run can swallow it
+	pass
+
+class Job(object):
+	def __init__(self, script, input_name=None, lines=()):
+		self.script = script
+		self.input_name = input_name
+		self.lines = list(lines)
+
+	@property
+	def name(self):
+		if self.input_name is None:
+			return self.script
+		return '{0} < {1}'.format(self.script, self.input_name)
+
+## LOADING
+
+def read_lines(path):
+	with open(path) as f:
+		return f.read().splitlines()
+
+def load_program(path, interpreter):
+	with open(path, 'rb') as f:
+		data = f.read()
+	# optimized and memoized as the interpreter does it for source text
+	if binast.is_binary(data):
+		return Program(load_ast(binast.AstFile(data), optimize=interpreter.optimize, memo=interpreter.memo))
+	text = data.decode('utf-8')
+	if path.endswith('.json'):
+		return Program(load_ast(text, optimize=interpreter.optimize, memo=interpreter.memo), text)
+	return interpreter.compile(text)
+
+def scripts_in(path):
+	if not os.path.isdir(path):
+		return [path]
+	return [os.path.join(path, name) for name in sorted(os.listdir(path))
+		if os.path.splitext(name)[1] in SCRIPT_EXTS]
+
+def input_sets(path):
+	# a directory of input files, or a JSON list of line lists
+	if os.path.isdir(path):
+		return [(name, read_lines(os.path.join(path, name))) for name in sorted(os.listdir(path))]
+	with open(path) as f:
+		sets = json.load(f)
+	return [('#{0}'.format(i), lines) for i, lines in enumerate(sets)]
+
+def manifest_jobs(path):
+	base = os.path.dirname(os.path.abspath(path))
+	with open(path) as f:
+		entries = json.load(f)
+	jobs = []
+	for entry in entries:
+		script = os.path.join(base, entry['script'])
+		lines = entry.get('input', [])
+		if isinstance(lines, str):
+			jobs.append(Job(script, lines, read_lines(os.path.join(base, lines))))
+		else:
+			jobs.append(Job(script, None if 'input' not in entry else 'input', lines))
+	return jobs
+
+def error_message(e):
+	# script and parser errors as the CLI prints them, others with their type
+	if isinstance(e, EvalExeption) or str(e).startswith('[Parser]'):
+		return str(e)
+	return '{0}: {1}'.format(type(e).__name__, e)
+
+## WORKER
+
+worker = None
+
+class Worker(object):
+	def __init__(self, programs, engine, timeout, limits):
+		self.programs = programs
+		self.interpreter = Interpreter(engine)
+		self.timeout = timeout
+		self.limits = limits
+
+	def run(self, index, lines):
+		# -> (status, output, error, seconds), status is ok, error, limit or timeout
+		output = MemoryWriter()
+		stream = io.StringIO(''.join(line + '\n' for line in lines))
+		governor = None
+		if self.timeout or self.limits:
+			governor = Governor(timeout=self.timeout, **self.limits)
+		status, error = 'ok', None
+		start = time.perf_counter()
+		alarm = self.timeout and hasattr(signal, 'setitimer')
+		try:
+			if alarm:
+				signal.setitimer(signal.ITIMER_REAL, self.timeout + ALARM_GRACE)
+			self.interpreter.run(self.programs[index], None, governor, Sink(output), stream)
+		except JobTimeout:
+			status, error = 'timeout', 'timed out after {0} s'.format(self.timeout)
+		except ResourceExceeded as e:
+			status, error = 'timeout' if e.resource == 'time' else 'limit', str(e)
+		except Exception as e:
+			status, error = 'error', error_message(e)
+		finally:
+			if alarm:
+				signal.setitimer(signal.ITIMER_REAL, 0)
+		return status, output.getvalue(), error, time.perf_counter() - start
+
+def on_alarm(signum, frame):
+	raise JobTimeout()
+
+def init_worker(programs, engine, timeout, limits):
+	global worker
+	worker = Worker(programs, engine, timeout, limits)
+	if hasattr(signal, 'SIGALRM'):
+		signal.signal(signal.SIGALRM, on_alarm)
+
+def run_job(index, lines):
+	return worker.run(index, lines)
+
+## BATCH
+
+def run_batch(jobs, engine='tree', workers=None, timeout=None, optimize=False, limits=None, memo=False):
+	# -> one (job, status, output, error, seconds) per job, in order; limits
+	# are max_steps and max_memory for each job's Governor
+	interpreter = Interpreter(engine, optimize, memo=memo)
+	programs = []
+	indexes = {}
+	results = [None] * len(jobs)
+	pending = []
+	for i, job in enumerate(jobs):
+		if job.script not in indexes:
+			try:
+				program = load_program(job.script, interpreter)
+			except Exception as e:
+				# a script that doesn't parse fails all its jobs
+				indexes[job.script] = e
+			else:
+				if engine == 'vm':
+					program.compiled(engine, RUN_GLOBALS)
+				indexes[job.script] = len(programs)
+				programs.append(program)
+		index = indexes[job.script]
+		if isinstance(index, Exception):
+			results[i] = (job, 'error', '', error_message(index), None)
+		else:
+			pending.append((i, index))
+	pool = ProcessPoolExecutor(workers, initializer=init_worker, initargs=(programs, engine, timeout, limits or {}))
+	stuck = False
+	try:
+		futures = [(i, pool.submit(run_job, index, jobs[i].lines)) for i, index in pending]
+		for i, future in futures:
+			try:
+				# the worker's alarm normally ends a job first, this is for
+				# platforms without SIGALRM, where the job keeps its worker
+				status, output, error, seconds = future.result(None if timeout is None else timeout * 2 + ALARM_GRACE)
+			except FutureTimeout:
+				status, output, error, seconds = 'timeout', '', 'no result after {0} s'.format(timeout * 2 + ALARM_GRACE), None
+				stuck = True
+			except Exception as e:
+				status, output, error, seconds = 'error', '', 'worker failed: {0}'.format(e), None
+			results[i] = (jobs[i], status, output, error, seconds)
+	finally:
+		pool.shutdown(wait=not stuck, cancel_futures=True)
+	return results
+
+def report(results, elapsed, workers, file=None):
+	file = file or sys.stderr
+	counts = {}
+	for _, status, _, _, _ in results:
+		counts[status] = counts.get(status, 0) + 1
+	busy = sum(r[4] for r in results if r[4] is not None)
+	file.write('{0:,} jobs on {1} worker{2} in {3:.3f} s: {4}\n'.format(
+		len(results), workers, '' if workers == 1 else 's', elapsed, ', '.join('{0} {1}'.format(n, s) for s, n in sorted(counts.items()))))
+	file.write('{0:,.1f} jobs/s, {1:.3f} s of script time, {2:.2f}x parallel\n'.format(
+		len(results) / elapsed if elapsed else 0, busy, busy / elapsed if elapsed else 0))
+
+def main():
+	import argparse
+	arg_parser = argparse.ArgumentParser(description='Run many YJLO Script programs, or one over many inputs, in parallel.')
+	arg_parser.add_argument('paths', nargs='*', help='scripts (.yjlo, JSON or binary AST) or directories of them')
+	arg_parser.add_argument('--manifest', help='JSON list of {"script": path, "input": lines or path}')
+	arg_parser.add_argument('--inputs', help='directory of input files, or JSON list of line lists, one run each')
+	arg_parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help='worker processes (default: CPU count)')
+	arg_parser.add_argument('--timeout', type=float, help='seconds per job')
+	arg_parser.add_argument('--max-steps', type=int, help='loop iterations and calls per job')
+	arg_parser.add_argument('--max-memory', type=float, metavar='MIB', help='memory a job may add to its worker, in MiB')
+	arg_parser.add_argument('--engine', choices=ENGINES, default='tree')
+	arg_parser.add_argument('-O', '--optimize', action='store_true', help='fold constants and drop dead branches first')
+	arg_parser.add_argument('--memo', action='store_true', help='also memoize the recursive functions proven pure')
+	arg_parser.add_argument('--json', metavar='FILE', help='also write the results as JSON')
+	arg_parser.add_argument('-q', '--quiet', action='store_true', help='only print the report')
+	args = arg_parser.parse_args()
+
+	jobs = []
+	if args.manifest:
+		jobs.extend(manifest_jobs(args.manifest))
+	scripts = [script for path in args.paths for script in scripts_in(path)]
+	if args.inputs:
+		sets = input_sets(args.inputs)
+		jobs.extend(Job(script, name, lines) for script in scripts for name, lines in sets)
+	else:
+		jobs.extend(Job(script) for script in scripts)
+	if not jobs:
+		arg_parser.error('no scripts to run')
+
+	start = time.perf_counter()
+	limits = {}
+	if args.max_steps is not None:
+		limits['max_steps'] = args.max_steps
+	if args.max_memory is not None:
+		limits['max_memory'] = int(args.max_memory * (1 << 20))
+	results = run_batch(jobs, args.engine, args.workers, args.timeout, args.optimize, limits, args.memo)
+	elapsed = time.perf_counter() - start
+	if not args.quiet:
+		for job, status, output, error, seconds in results:
+			print('==> {0} [{1}{2}]'.format(job.name, status, '' if seconds is None else ', {0:.3f} s'.format(seconds)))
+			sys.stdout.write(output)
+			if output and not output.endswith('\n'):
+				print()
+			if error:
+				print('[ERROR]' + error)
+	report(results, elapsed, args.workers)
+	if args.json:
+		with open(args.json, 'w') as f:
+			json.dump([{'script': job.script, 'input': job.input_name, 'status': status, 'output': output,
+				'error': error, 'seconds': seconds} for job, status, output, error, seconds in results], f, indent=2)
+	if any(status != 'ok' for _, status, _, _, _ in results):
+		sys.exit(1)
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,327 @@
+import mmap
+import struct
+import sys
+
+from nodes import NODE_CLASSES, Node, from_json, to_json
+
+# Binary AST format, a compact alternative to the JSON one. A file is a
+# header followed by four sections:
+#   strings  every name and string constant once, as uint32 count, count + 1
+#            uint32 offsets and the UTF-8 blob, so string i is a slice
+#   lines    uint32 node count, then the line of every node in pre-order as
+#            a varint: 0 for none, else zigzag(line - previous line) + 1
+#   index    uint32 statement count, then (body offset, first node) uint32
+#            pairs for the top-level statements
+#   body     the program as tagged values, nodes as NODE + kind followed by
+#            their fields in Node.FIELDS order minus the line
+# All integers are little-endian. AstFile reads from any buffer, including a
+# memory-mapped file, and decodes strings and statements only when asked.
+
+MAGIC = b'YJAB'
+VERSION = 2
+HEADER = struct.Struct('<4sHHIIII')	# magic, version, reserved, section offsets
+UINT32 = struct.Struct('<I')
+PAIR = struct.Struct('<II')
+FLOAT = struct.Struct('<d')
+
+## VALUE TAGS
+
+NONE = 0
+FALSE = 1
+TRUE = 2
+INT = 3			# zigzag varint
+FLOAT64 = 4
+STRING = 5		# varint string index
+LIST = 6		# varint count, items
+NODE = 0x10		# + Kind
+SMALL_INT = 0x80	# + n, for 0 <= n < 0x80
+
+KIND_CLASSES = {cls.kind: cls for cls in NODE_CLASSES.values()}
+# field attributes written to the body, the line goes to the line table
+BODY_FIELDS = {cls.kind: tuple(attr for _, attr in cls.FIELDS if attr != 'line')
+	for cls in NODE_CLASSES.values()}
+
+def write_varint(buf, n):
+	while n > 0x7f:
+		buf.append(n & 0x7f | 0x80)
+		n >>= 7
+	buf.append(n)
+
+def zigzag(n):
+	return n << 1 if n >= 0 else (-n << 1) - 1
+
+def unzigzag(n):
+	return n >> 1 if not n & 1 else -((n + 1) >> 1)
+
+## WRITER
+
+class Writer(object):
+	def __init__(self):
+		self.strings = {}
+		self.lines = bytearray()
+		self.node_count = 0
+		self.prev_line = 0
+		self.body = bytearray()
+
+	def string(self, s):
+		index = self.strings.get(s)
+		if index is None:
+			index = self.strings[s] = len(self.strings)
+		return index
+
+	def line(self, line):
+		self.node_count += 1
+		if line is None:
+			self.lines.append(0)
+		else:
+			write_varint(self.lines, zigzag(line - self.prev_line) + 1)
+			self.prev_line = line
+
+	def value(self, value):
+		body = self.body
+		if isinstance(value, Node):
+			body.append(NODE + value.kind)
+			self.line(value.line)
+			for attr in BODY_FIELDS[value.kind]:
+				self.value(getattr(value, attr))
+		elif value is None:
+			body.append(NONE)
+		elif value is True:
+			body.append(TRUE)
+		elif value is False:
+			body.append(FALSE)
+		elif isinstance(value, int):
+			if 0 <= value < 0x80:
+				body.append(SMALL_INT + value)
+			else:
+				body.append(INT)
+				write_varint(body, zigzag(value))
+		elif isinstance(value, float):
+			body.append(FLOAT64)
+			body += FLOAT.pack(value)
+		elif isinstance(value, str):
+			body.append(STRING)
+			write_varint(body, self.string(value))
+		elif isinstance(value, (list, tuple)):
+			body.append(LIST)
+			write_varint(body, len(value))
+			for item in value:
+				self.value(item)
+		else:
+			raise ValueError('Cannot encode AST value: ' + repr(value))
+
+	def program(self, ast):
+		if not isinstance(ast, list):
+			raise ValueError('An AST program is a list of statements')
+		index = []
+		self.body.append(LIST)
+		write_varint(self.body, len(ast))
+		for stmt in ast:
+			index.append((len(self.body), self.node_count))
+			self.value(stmt)
+		return index
+
+	def dumps(self, ast):
+		index = self.program(ast)
+		blobs = [s.encode('utf-8') for s in self.strings]
+		strings = bytearray(UINT32.pack(len(blobs)))
+		offset = 0
+		strings += UINT32.pack(offset)
+		for blob in blobs:
+			offset += len(blob)
+			strings += UINT32.pack(offset)
+		strings += b''.join(blobs)
+		lines = UINT32.pack(self.node_count) + self.lines
+		index_section = UINT32.pack(len(index)) + b''.join(PAIR.pack(*entry) for entry in index)
+		strings_at = HEADER.size
+		lines_at = strings_at + len(strings)
+		index_at = lines_at + len(lines)
+		body_at = index_at + len(index_section)
+		header = HEADER.pack(MAGIC, VERSION, 0, strings_at, lines_at, index_at, body_at)
+		return b''.join([header, strings, lines, index_section, self.body])
+
+## READER
+
+class AstFile(object):
+	def __init__(self, data, closer=None):
+		if len(data) < HEADER.size:
+			raise ValueError('Not a binary AST: too short')
+		magic, version, _, self.strings_at, self.lines_at, self.index_at, self.body_at = HEADER.unpack_from(data)
+		if magic != MAGIC:
+			raise ValueError('Not a binary AST: bad magic')
+		if version != VERSION:
+			raise ValueError('Unsupported binary AST version: ' + str(version))
+		self.data = data
+		self.closer = closer
+		self.string_count = UINT32.unpack_from(data, self.strings_at)[0]
+		self.string_blob = self.strings_at + 4 * (self.string_count + 2)
+		self._strings = [None] * self.string_count
+		self._lines = None
+		self._program = None
+
+	''' Lazy Tables '''
+	def string(self, index):
+		s = self._strings[index]
+		if s is None:
+			start, end = PAIR.unpack_from(self.data, self.strings_at + 4 + 4 * index)
+			s = self._strings[index] = str(self.data[self.string_blob + start:self.string_blob + end], 'utf-8')
+		return s
+
+	@property
+	def lines(self):
+		if self._lines is None:
+			data = self.data
+			count = UINT32.unpack_from(data, self.lines_at)[0]
+			pos = self.lines_at + 4
+			lines = []
+			line = 0
+			for _ in range(count):
+				n = data[pos]
+				pos += 1
+				if n > 0x7f:
+					n &= 0x7f
+					shift = 7
+					while True:
+						b = data[pos]
+						pos += 1
+						n |= (b & 0x7f) << shift
+						if b < 0x80:
+							break
+						shift += 7
+				if n == 0:
+					lines.append(None)
+				else:
+					line += unzigzag(n - 1)
+					lines.append(line)
+			self._lines = lines
+		return self._lines
+
+	''' Decoding '''
+	def decode(self, pos, node):
+		# the value at pos, whose first node is number node in pre-order;
+		# a closure keeps the state in locals, this is the load hot path
+		data = self.data
+		lines = self.lines
+		string = self.string
+		classes = KIND_CLASSES
+		fields = BODY_FIELDS
+
+		def varint():
+			nonlocal pos
+			n = data[pos]
+			pos += 1
+			if n < 0x80:
+				return n
+			n &= 0x7f
+			shift = 7
+			while True:
+				b = data[pos]
+				pos += 1
+				n |= (b & 0x7f) << shift
+				if b < 0x80:
+					return n
+				shift += 7
+
+		def value():
+			nonlocal pos, node
+			tag = data[pos]
+			pos += 1
+			if tag >= SMALL_INT:
+				return tag - SMALL_INT
+			elif tag >= NODE:
+				cls = classes.get(tag - NODE)
+				if cls is None:
+					raise ValueError('Unknown AST kind: ' + str(tag - NODE))
+				line = lines[node]
+				node += 1
+				args = [value() for _ in fields[cls.kind]]
+				args.append(line)
+				return cls(*args)
+			elif tag == STRING:
+				return string(varint())
+			elif tag == LIST:
+				return [value() for _ in range(varint())]
+			elif tag == NONE:
+				return None
+			elif tag == TRUE:
+				return True
+			elif tag == FALSE:
+				return False
+			elif tag == INT:
+				return unzigzag(varint())
+			elif tag == FLOAT64:
+				pos += 8
+				return FLOAT.unpack_from(data, pos - 8)[0]
+			raise ValueError('Unknown AST value tag: ' + str(tag))
+
+		return value()
+
+	''' Statements '''
+	def __len__(self):
+		return UINT32.unpack_from(self.data, self.index_at)[0]
+
+	def statement(self, i):
+		# decodes the i-th top-level statement only
+		if not 0 <= i < len(self):
+			raise IndexError('statement index out of range')
+		offset, node = PAIR.unpack_from(self.data, self.index_at + 4 + 8 * i)
+		return self.decode(self.body_at + offset, node)
+
+	def __iter__(self):
+		for i in range(len(self)):
+			yield self.statement(i)
+
+	def program(self):
+		if self._program is None:
+			self._program = self.decode(self.body_at, 0)
+		return self._program
+
+	def close(self):
+		if self.closer is not None:
+			self.closer()
+			self.closer = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+## API
+
+def dumps(ast):
+	return Writer().dumps(ast)
+
+def loads(data):
+	return AstFile(data).program()
+
+def is_binary(data):
+	return data[:len(MAGIC)] == MAGIC
+
+def open_file(path):
+	# memory-mapped, nothing is decoded until a statement is asked for
+	with open(path, 'rb') as f:
+		data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+	try:
+		return AstFile(data, data.close)
+	except ValueError:
+		data.close()
+		raise
+
+def json_to_binary(obj):
+	return dumps(from_json(obj))
+
+def binary_to_json(data):
+	return to_json(loads(data))
+
+if __name__ == '__main__':
+	# python binast.py in.json out.yjab, or back from binary to JSON
+	import json
+	with open(sys.argv[1], 'rb') as f:
+		data = f.read()
+	if is_binary(data):
+		with open(sys.argv[2], 'w') as f:
+			json.dump(binary_to_json(data), f, indent=2)
+	else:
+		with open(sys.argv[2], 'wb') as f:
+			f.write(json_to_binary(json.loads(data)))
@@ -0,0 +1,488 @@
+from evaluator import EvalExeption, is_self_evaluating, init_env
+from nodes import Kind, Node
+from resolver import Resolver, block_names, is_func_def
+from compiler import Program
+
+# Bytecode compiler: flattens the AST into a list of (opcode, argument) words
+# with a constant pool per function, see vm.py for the machine that runs it.
+# Variables use the slots computed by resolver.py; jump arguments are
+# absolute offsets into the instruction list.
+
+## OPCODES
+LOAD_CONST = 0
+LOAD_LOCAL = 1
+LOAD_OUTER = 2
+STORE_LOCAL = 3
+STORE_OUTER = 4
+POP = 5
+DUP = 6
+JUMP = 7
+POP_JUMP_IF_FALSE = 8
+POP_JUMP_IF_TRUE = 9
+JUMP_UNLESS_TRUE = 10
+JUMP_UNLESS_FALSE = 11
+CALL = 12
+RETURN_VALUE = 13
+RETURN_NONE = 14
+MAKE_FUNCTION = 15
+MAKE_INSTANCE = 16
+PUSH_FRAME = 17
+POP_FRAME = 18
+GET_MEMBER = 19
+SET_MEMBER = 20
+CONTAINS = 21
+RANGE_TEST = 22
+BINARY_ADD = 23
+GET_ITER = 24
+FOR_ITER = 25
+SET_INDEX = 26
+LOAD_NAME = 27
+STORE_NAME = 28
+LOOP_TEST = 29
+
+OPNAMES = {v: k for k, v in list(globals().items()) if k.isupper() and isinstance(v, int)}
+JUMPS = (JUMP, POP_JUMP_IF_FALSE, POP_JUMP_IF_TRUE, JUMP_UNLESS_TRUE, JUMP_UNLESS_FALSE, FOR_ITER, LOOP_TEST)
+
+# LOOP_TEST is POP_JUMP_IF_FALSE for the test of a loop and FOR_ITER the
+# step of a for-in loop; going on into the body, both are a governor step
+# at the line of the loop, as the other engines take one per iteration.
+# LOAD_OUTER/STORE_OUTER pack (depth, slot) into one argument; LOAD_NAME and
+# STORE_NAME take a constant (name, places) for a name that resolves to
+# more than one place, see resolver.py
+DEPTH_SHIFT = 16
+SLOT_MASK = (1 << DEPTH_SHIFT) - 1
+
+class Code(object):
+	__slots__ = ('name', 'parameters', 'scope', 'line', 'memo', 'instructions', 'constants', 'lines', 'names', 'caches')
+
+	def __init__(self, name, parameters, scope, line=None, memo=None):
+		self.name = name
+		self.parameters = parameters
+		self.scope = scope
+		self.line = line	# of the definition
+		self.memo = memo	# FuncDef.memo
+		self.instructions = []
+		self.constants = []
+		self.lines = []		# source line per instruction
+		self.names = {}		# variable name per load/store, for the disassembler
+		self.caches = {}	# inline caches of GET_MEMBER/SET_MEMBER, by offset
+
+class Target(object):
+	# an enclosing loop or switch, the destination of break/continue/fallthrough
+	__slots__ = ('is_loop', 'frames', 'breaks', 'continues', 'fallthroughs')
+
+	def __init__(self, is_loop, frames):
+		self.is_loop = is_loop
+		self.frames = frames
+		self.breaks = []
+		self.continues = []
+		self.fallthroughs = []
+
+class Compiler(object):
+	def __init__(self, builtins):
+		self.res = Resolver(builtins)
+		self.code = None
+		self.targets = []
+		self.frames = 0		# frames pushed by the code compiled so far
+		self.line = 0
+
+	''' Emit '''
+	def emit(self, op, arg=0):
+		pos = len(self.code.instructions)
+		self.code.instructions.append(op)
+		self.code.instructions.append(arg)
+		self.code.lines.append(self.line)
+		return pos
+
+	def here(self):
+		return len(self.code.instructions)
+
+	def patch(self, pos, target=None):
+		self.code.instructions[pos + 1] = self.here() if target is None else target
+
+	def constant(self, value):
+		constants = self.code.constants
+		if isinstance(value, (int, float, str, tuple)) or value is None:
+			for i, c in enumerate(constants):
+				if type(c) is type(value) and c == value:
+					return i
+		constants.append(value)
+		return len(constants) - 1
+
+	def load(self, stmt):
+		name = stmt.name
+		places = self.res.resolve(name, stmt.line)
+		if len(places) > 1:
+			self.emit(LOAD_NAME, self.constant((name, tuple(places))))
+			return
+		depth, slot = places[0]
+		if depth == 0:
+			pos = self.emit(LOAD_LOCAL, slot)
+		else:
+			pos = self.emit(LOAD_OUTER, depth << DEPTH_SHIFT | slot)
+		self.code.names[pos] = name
+
+	def store(self, stmt):
+		name = stmt.name
+		places = self.res.resolve(name, stmt.line)
+		if len(places) > 1:
+			self.emit(STORE_NAME, self.constant((name, tuple(places))))
+			return
+		depth, slot = places[0]
+		if depth == 0:
+			pos = self.emit(STORE_LOCAL, slot)
+		else:
+			pos = self.emit(STORE_OUTER, depth << DEPTH_SHIFT | slot)
+		self.code.names[pos] = name
+
+	def store_local(self, name):
+		pos = self.emit(STORE_LOCAL, self.res.scope.names[name])
+		self.code.names[pos] = name
+
+	def load_local(self, name):
+		pos = self.emit(LOAD_LOCAL, self.res.scope.names[name])
+		self.code.names[pos] = name
+
+	''' Expressions '''
+	def expr(self, stmt):
+		if isinstance(stmt, Node) and stmt.line is not None:
+			self.line = stmt.line
+		if isinstance(stmt, list):
+			self.block(stmt)
+			self.emit(LOAD_CONST, self.constant(None))
+		elif is_self_evaluating(stmt):
+			self.emit(LOAD_CONST, self.constant(stmt))
+		elif not isinstance(stmt, Node):
+			raise EvalExeption('Unsupported expression')
+		elif stmt.kind == Kind.VAR:
+			self.load(stmt)
+		elif stmt.kind == Kind.APPLY:
+			self.apply(stmt)
+		elif stmt.kind == Kind.ASSIGN:
+			self.assign(stmt, True)
+		elif stmt.kind == Kind.VAR_DEF:
+			self.var_def(stmt, True)
+		elif stmt.kind == Kind.FUNC_DEF:
+			if stmt.is_class:
+				self.emit(MAKE_INSTANCE)
+			else:
+				self.emit(MAKE_FUNCTION, self.constant(self.function(stmt)))
+		else:
+			raise EvalExeption('Unsupported expression')
+
+	def function(self, stmt):
+		params = stmt.parameters
+		scope = self.res.enter(block_names(stmt.body), params, is_function=True)
+		code = Code(stmt.name, params, scope, stmt.line, stmt.memo)
+		saved = (self.code, self.targets, self.frames)
+		self.code, self.targets, self.frames = code, [], 0
+		if stmt.body:
+			self.block(stmt.body)
+		self.emit(RETURN_NONE)
+		self.code, self.targets, self.frames = saved
+		self.res.leave(scope)
+		return code
+
+	def var_def(self, stmt, keep):
+		if is_func_def(stmt.right):
+			# the body can only run once the function is stored
+			self.res.declare(stmt.left)
+			self.expr(stmt.right)
+		else:
+			self.expr(stmt.right)
+			self.res.declare(stmt.left)
+		if keep:
+			self.emit(DUP)
+		self.store_local(stmt.left)
+
+	def assign(self, stmt, keep):
+		left = stmt.left
+		return_left = stmt.return_left and keep
+		if return_left:
+			self.expr(left)
+		self.expr(stmt.right)
+		if keep and not return_left:
+			self.emit(DUP)
+		if left.kind == Kind.APPLY and left.operator.name == '[]':
+			self.expr(left.operands[0])
+			self.expr(left.operands[1])
+			self.emit(SET_INDEX)
+		elif left.kind == Kind.APPLY:
+			fun, member = left.operands
+			self.expr(fun)
+			self.emit(SET_MEMBER, self.constant(member.name))
+		else:
+			self.store(left)
+
+	def apply(self, stmt):
+		operator = stmt.operator
+		operands = stmt.operands
+		name = operator.name if operator.kind == Kind.VAR else None
+		if name == '&&' or name == '||':
+			self.load(operator)
+			self.expr(operands[0])
+			skip = self.emit(JUMP_UNLESS_TRUE if name == '&&' else JUMP_UNLESS_FALSE)
+			self.expr(operands[1])
+			done = self.emit(JUMP)
+			self.patch(skip)
+			self.emit(LOAD_CONST, self.constant(None))
+			self.patch(done)
+			self.emit(CALL, 2)
+		elif name == '.':
+			fun, member = operands
+			self.expr(fun)
+			if member.kind == Kind.APPLY:
+				self.emit(GET_MEMBER, self.constant(member.operator.name))
+				for arg in member.operands:
+					self.expr(arg)
+				self.emit(CALL, len(member.operands))
+			else:
+				self.emit(GET_MEMBER, self.constant(member.name))
+		else:
+			self.expr(operator)
+			for arg in operands:
+				self.expr(arg)
+			self.emit(CALL, len(operands))
+
+	''' Statements '''
+	def stmt(self, stmt):
+		if isinstance(stmt, Node) and stmt.line is not None:
+			self.line = stmt.line
+		if isinstance(stmt, list):
+			self.block(stmt)
+		elif not isinstance(stmt, Node):
+			self.expr(stmt)
+			self.emit(POP)
+		elif stmt.kind == Kind.VAR_DEF:
+			self.var_def(stmt, False)
+		elif stmt.kind == Kind.ASSIGN:
+			self.assign(stmt, False)
+		elif stmt.kind == Kind.IF:
+			self.if_stmt(stmt)
+		elif stmt.kind == Kind.WHILE:
+			self.while_stmt(stmt)
+		elif stmt.kind == Kind.FOR:
+			self.for_stmt(stmt)
+		elif stmt.kind == Kind.SWITCH:
+			self.switch_stmt(stmt)
+		elif stmt.kind == Kind.RETURN:
+			self.expr(stmt.expression)
+			self.emit(RETURN_VALUE)
+		elif stmt.kind == Kind.BREAK:
+			self.jump_out(lambda t: True, 'breaks')
+		elif stmt.kind == Kind.CONTINUE:
+			self.jump_out(lambda t: t.is_loop, 'continues')
+		elif stmt.kind == Kind.FALLTHROUGH:
+			self.jump_out(lambda t: True, 'fallthroughs')
+		else:
+			self.expr(stmt)
+			self.emit(POP)
+
+	def block(self, stmt):
+		if isinstance(stmt, list):
+			for s in stmt:
+				self.stmt(s)
+		else:
+			self.stmt(stmt)
+
+	def scoped(self, stmt):
+		# a block that runs in a fresh frame of its own
+		scope = self.res.enter(block_names(stmt))
+		if scope is not None:
+			self.emit(PUSH_FRAME, self.constant(scope))
+			self.frames += 1
+		self.block(stmt)
+		if scope is not None:
+			self.emit(POP_FRAME)
+			self.frames -= 1
+		self.res.leave(scope)
+
+	def jump_out(self, accepts, kind):
+		target = None
+		for t in reversed(self.targets):
+			if accepts(t):
+				target = t
+				break
+		if target is None or (kind == 'fallthroughs' and target.is_loop):
+			# nothing to leave to inside this function, the body ends here
+			self.emit(RETURN_NONE)
+			return
+		for _ in range(self.frames - target.frames):
+			self.emit(POP_FRAME)
+		getattr(target, kind).append(self.emit(JUMP))
+
+	def if_stmt(self, stmt):
+		self.expr(stmt.predicate)
+		skip = self.emit(POP_JUMP_IF_FALSE)
+		self.scoped(stmt.consequent)
+		if stmt.alternative:
+			done = self.emit(JUMP)
+			self.patch(skip)
+			self.scoped(stmt.alternative)
+			self.patch(done)
+		else:
+			self.patch(skip)
+
+	def while_stmt(self, stmt):
+		start = self.here()
+		self.expr(stmt.predicate)
+		self.line = stmt.line
+		done = self.emit(LOOP_TEST)
+		target = Target(True, self.frames)
+		self.targets.append(target)
+		self.scoped(stmt.consequent)
+		self.targets.pop()
+		self.emit(JUMP, start)
+		self.patch(done)
+		for pos in target.breaks:
+			self.patch(pos)
+		for pos in target.continues:
+			self.patch(pos, start)
+
+	def for_stmt(self, stmt):
+		for_range = stmt.range
+		name = stmt.variable.name
+		names = block_names(stmt.consequent)
+		if isinstance(for_range, Node) and for_range.kind == Kind.RANGE:
+			self.expr(for_range.start)
+			self.expr(for_range.end)
+			self.expr(1 if stmt.increment is None else stmt.increment)
+			scope = self.res.enter(names + ['.to', '.step', '.cur'], (name,), is_loop=True)
+			self.emit(PUSH_FRAME, self.constant(scope))
+			self.frames += 1
+			self.store_local('.step')
+			self.store_local('.to')
+			self.store_local(name)
+			start = self.here()
+			self.load_local(name)
+			self.emit(DUP)
+			self.store_local('.cur')
+			self.load_local('.to')
+			self.load_local('.step')
+			self.emit(RANGE_TEST, 1 if for_range.closed else 0)
+			self.line = stmt.line
+			done = self.emit(LOOP_TEST)
+			target = self.loop_body(stmt)
+			step = self.here()
+			self.load_local('.cur')
+			self.load_local('.step')
+			self.emit(BINARY_ADD)
+			self.store_local(name)
+		else:
+			self.expr(for_range)
+			self.emit(GET_ITER)
+			scope = self.res.enter(names + ['.it'], (name,), is_loop=True)
+			self.emit(PUSH_FRAME, self.constant(scope))
+			self.frames += 1
+			self.store_local('.it')
+			start = self.here()
+			self.load_local('.it')
+			self.line = stmt.line
+			done = self.emit(FOR_ITER)
+			self.store_local(name)
+			self.store_local('.it')
+			target = self.loop_body(stmt)
+			step = start
+		self.emit(JUMP, start)
+		self.patch(done)
+		for pos in target.breaks:
+			self.patch(pos)
+		for pos in target.continues:
+			self.patch(pos, step)
+		self.emit(POP_FRAME)
+		self.frames -= 1
+		self.res.leave(scope)
+
+	def loop_body(self, stmt):
+		target = Target(True, self.frames)
+		self.targets.append(target)
+		self.block(stmt.consequent)
+		self.targets.pop()
+		return target
+
+	def switch_stmt(self, stmt):
+		self.expr(stmt.variable)
+		entries = []
+		for case in stmt.cases:
+			self.emit(DUP)
+			self.emit(LOAD_CONST, self.constant(case.value))
+			self.emit(CONTAINS)
+			entries.append(self.emit(POP_JUMP_IF_TRUE))
+		self.emit(POP)
+		no_match = self.emit(JUMP)
+		target = Target(False, self.frames)
+		self.targets.append(target)
+		for case, entry in zip(stmt.cases, entries):
+			self.patch(entry)
+			self.emit(POP)
+			self.fall_into(target)
+			self.scoped(case.stmt)
+			target.breaks.append(self.emit(JUMP))
+		self.targets.pop()
+		self.patch(no_match)
+		self.fall_into(target)
+		if stmt.default:
+			self.scoped(stmt.default)
+		for pos in target.breaks:
+			self.patch(pos)
+
+	def fall_into(self, target):
+		for pos in target.fallthroughs:
+			self.patch(pos)
+		target.fallthroughs = []
+
+	''' Program '''
+	def program(self, ast):
+		scope = self.res.enter(block_names(ast) if ast else [])
+		self.code = Code('<program>', (), scope)
+		if ast:
+			self.block(ast)
+		self.emit(RETURN_NONE)
+		self.res.leave(scope)
+		return Program(self.code, scope, self.res.builtins)
+
+def compile_program(ast, builtins=None):
+	if builtins is None:
+		builtins = list(init_env()[1])
+	return Compiler(builtins).program(ast)
+
+## DISASSEMBLER
+
+def describe(code, pos):
+	op = code.instructions[pos]
+	arg = code.instructions[pos + 1]
+	if op in (LOAD_CONST, MAKE_FUNCTION, GET_MEMBER, SET_MEMBER, PUSH_FRAME):
+		value = code.constants[arg]
+		if isinstance(value, Code):
+			return '{0} (<code {1}>)'.format(arg, value.name)
+		if op == PUSH_FRAME:
+			return '{0} ({1})'.format(arg, ', '.join(value.names))
+		return '{0} ({1!r})'.format(arg, value)
+	if op in (LOAD_NAME, STORE_NAME):
+		name, places = code.constants[arg]
+		return '{0} ({1} at {2})'.format(arg, name, ' or '.join('{0}:{1}'.format(*place) for place in places if place is not None))
+	if op in (LOAD_LOCAL, STORE_LOCAL):
+		return '{0} ({1})'.format(arg, code.names.get(pos, '?'))
+	if op in (LOAD_OUTER, STORE_OUTER):
+		return '{0}:{1} ({2})'.format(arg >> DEPTH_SHIFT, arg & SLOT_MASK, code.names.get(pos, '?'))
+	if op in JUMPS:
+		return 'to {0}'.format(arg)
+	if op in (CALL, RANGE_TEST):
+		return str(arg)
+	return ''
+
+def disassemble(code):
+	lines = ['Disassembly of {0}{1}{2}:'.format('memo ' if code.memo else '', code.name or '<anonymous>',
+		'(' + ', '.join(code.parameters) + ')' if code.parameters else '')]
+	last_line = None
+	for pos in range(0, len(code.instructions), 2):
+		line = code.lines[pos // 2]
+		lines.append('{0:>5} {1:>6} {2:<18} {3}'.format(
+			line if line != last_line else '', pos,
+			OPNAMES[code.instructions[pos]], describe(code, pos)).rstrip())
+		last_line = line
+	for value in code.constants:
+		if isinstance(value, Code):
+			lines.append('')
+			lines.append(disassemble(value))
+	return '\n'.join(lines)
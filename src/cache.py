@@ -0,0 +1,145 @@
+import hashlib
+import os
+import pickle
+import sys
+
+# On-disk program cache. A parsed AST (or a compiled vm.Program) is pickled
+# into a file named after a hash of the source, the kind of entry and the
+# interpreter it was built by, so editing either the script or any module in
+# src/ simply misses. Reads touch the file's mtime and writes evict the
+# least recently used entries once the directory grows past max_bytes.
+#
+# Entries are unpickled as trusted data, so the directory is created private
+# to the user; don't point it at a location others can write to. For that
+# reason nothing is cached unless asked: evaluator.py takes --cache or
+# --cache-dir, and it and main.py cache when $YJLO_CACHE_DIR is set.
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+SUFFIX = '.pickle'
+
+_fingerprint = None
+
+def requested():
+	# the directory the environment asks to cache in, None for no caching
+	return os.environ.get('YJLO_CACHE_DIR') or None
+
+def default_directory():
+	directory = os.environ.get('YJLO_CACHE_DIR')
+	if directory:
+		return directory
+	base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+	return os.path.join(base, 'yjlo-script')
+
+def interpreter_fingerprint():
+	# the Python bytecode tag plus the size and mtime of every module here,
+	# computed once per process
+	global _fingerprint
+	if _fingerprint is None:
+		h = hashlib.blake2b(sys.implementation.cache_tag.encode(), digest_size=16)
+		h.update(str(pickle.HIGHEST_PROTOCOL).encode())
+		src = os.path.dirname(os.path.abspath(__file__))
+		for name in sorted(os.listdir(src)):
+			if name.endswith('.py'):
+				st = os.stat(os.path.join(src, name))
+				h.update('{0}:{1}:{2};'.format(name, st.st_size, st.st_mtime_ns).encode())
+		_fingerprint = h.hexdigest()
+	return _fingerprint
+
+class ProgramCache(object):
+	def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+		self.directory = directory or default_directory()
+		self.max_bytes = max_bytes
+		self.hits = 0
+		self.misses = 0
+
+	def key(self, source, kind):
+		if isinstance(source, str):
+			source = source.encode('utf-8')
+		h = hashlib.blake2b(digest_size=20)
+		h.update(interpreter_fingerprint().encode())
+		h.update(b'\0' + kind.encode() + b'\0')
+		h.update(source)
+		return h.hexdigest()
+
+	def path(self, key):
+		return os.path.join(self.directory, key + SUFFIX)
+
+	def get(self, source, kind):
+		path = self.path(self.key(source, kind))
+		try:
+			with open(path, 'rb') as f:
+				value = pickle.load(f)
+		except FileNotFoundError:
+			self.misses += 1
+			return None
+		except Exception:
+			# truncated or from an incompatible build, drop it
+			self.misses += 1
+			self._remove(path)
+			return None
+		try:
+			os.utime(path)
+		except OSError:
+			pass
+		self.hits += 1
+		return value
+
+	def put(self, source, kind, value):
+		# a cache that can't be written is only slower, never an error
+		path = self.path(self.key(source, kind))
+		temp = '{0}.{1}.tmp'.format(path, os.getpid())
+		try:
+			os.makedirs(self.directory, mode=0o700, exist_ok=True)
+			with open(temp, 'wb') as f:
+				pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+			os.replace(temp, path)
+		except (OSError, pickle.PicklingError, RecursionError):
+			self._remove(temp)
+			return False
+		self.evict()
+		return True
+
+	def load(self, source, kind, build):
+		# the cached value for source, or build() stored for next time
+		value = self.get(source, kind)
+		if value is None:
+			value = build()
+			self.put(source, kind, value)
+		return value
+
+	def entries(self):
+		# (mtime, size, path) of every entry, least recently used first
+		entries = []
+		try:
+			names = os.listdir(self.directory)
+		except OSError:
+			return entries
+		for name in names:
+			if name.endswith(SUFFIX):
+				path = os.path.join(self.directory, name)
+				try:
+					st = os.stat(path)
+				except OSError:
+					continue
+				entries.append((st.st_mtime_ns, st.st_size, path))
+		entries.sort()
+		return entries
+
+	def evict(self):
+		entries = self.entries()
+		total = sum(size for _, size, _ in entries)
+		for _, size, path in entries:
+			if total <= self.max_bytes:
+				break
+			self._remove(path)
+			total -= size
+
+	def clear(self):
+		for _, _, path in self.entries():
+			self._remove(path)
+
+	def _remove(self, path):
+		try:
+			os.remove(path)
+		except OSError:
+			pass
@@ -0,0 +1,417 @@
+import lst
+from evaluator import (FunctionType, EvalExeption, Instance, MISSING, data_member, for_items, is_self_evaluating,
+	lst_method, memo_cache, missing_variable, range_step, running, set_index)
+from nodes import Kind, Node
+
+# Continuation evaluator: a CEK-style machine that keeps its continuation on
+# the heap instead of the Python stack, so the recursion depth of a script is
+# bounded by memory rather than sys.getrecursionlimit().
+#
+# The machine runs a stack of tasks, each a tuple (handler, env, data).
+# Expression tasks push exactly one result onto the value stack, statement
+# tasks leave it balanced. A user call pushes a call boundary that records
+# the value stack height; `return` unwinds to it. `break` and `continue`
+# unwind to the nearest loop task, `fallthrough` to the enclosing switch.
+
+STMT_KINDS = (
+	Kind.VAR_DEF, Kind.IF, Kind.WHILE, Kind.SWITCH, Kind.FOR,
+	Kind.BREAK, Kind.CONTINUE, Kind.FALLTHROUGH, Kind.RETURN,
+)
+
+## ENVIRONMENT
+
+def lookup(name, env, line=None):
+	while env:
+		frame = env[1]
+		if name in frame:
+			return frame[name]
+		env = env[0]
+	raise missing_variable(name, line)
+
+def assign(name, val, env, line=None):
+	while env:
+		frame = env[1]
+		if name in frame:
+			frame[name] = val
+			return
+		env = env[0]
+	raise missing_variable(name, line)
+
+## SCHEDULING
+
+def push_stmt(stmt, env, tasks):
+	if isinstance(stmt, list):
+		for s in reversed(stmt):
+			push_stmt(s, env, tasks)
+	elif isinstance(stmt, Node) and stmt.kind in STMT_KINDS:
+		tasks.append((eval_stmt, env, stmt))
+	else:
+		# expression statement, discard its value
+		tasks.append((drop_value, env, None))
+		tasks.append((eval_expr, env, stmt))
+
+def push_expr(stmt, env, tasks):
+	tasks.append((eval_expr, env, stmt))
+
+def drop_value(env, data, tasks, values):
+	values.pop()
+
+## EXPRESSIONS
+
+def eval_expr(env, stmt, tasks, values):
+	if is_self_evaluating(stmt):
+		values.append(stmt)
+		return
+	kind = stmt.kind if isinstance(stmt, Node) else None
+	if kind == Kind.VAR:
+		values.append(lookup(stmt.name, env, stmt.line))
+	elif kind == Kind.APPLY:
+		eval_apply(env, stmt, tasks, values)
+	elif kind == Kind.FUNC_DEF and stmt.is_class:
+		values.append(Instance(env))
+	elif kind == Kind.FUNC_DEF:
+		func = {
+			'tag': 'function_value',
+			'name': stmt.name,
+			'parameters': stmt.parameters,
+			'body': stmt.body,
+			'env': env,
+			'line': stmt.line,
+		}
+		if stmt.memo:
+			func['memo'] = memo_cache(stmt.name, stmt.line, stmt.memo)
+		values.append((FunctionType.FUNCTION, func))
+	elif kind == Kind.ASSIGN:
+		left = stmt.left
+		tasks.append((assign_k, env, stmt))
+		if left.kind == Kind.APPLY and left.operator.name == '[]':
+			push_expr(left.operands[1], env, tasks)
+			push_expr(left.operands[0], env, tasks)
+		elif left.kind == Kind.APPLY:
+			tasks.append((member_env_k, env, None))
+			push_expr(left.operands[0], env, tasks)
+		if stmt.return_left:
+			push_expr(left, env, tasks)
+		push_expr(stmt.right, env, tasks)
+	elif kind == Kind.VAR_DEF:
+		tasks.append((define_k, env, stmt))
+		push_expr(stmt.right, env, tasks)
+	else:
+		raise EvalExeption('Unsupported statement')
+
+def eval_apply(env, stmt, tasks, values):
+	operator = stmt.operator
+	operands = stmt.operands
+	name = operator.name if operator.kind == Kind.VAR else None
+	if name == '&&' or name == '||':
+		tasks.append((logic_k, env, stmt))
+		push_expr(operands[0], env, tasks)
+	elif name == '.':
+		fun, member = operands
+		if member.kind == Kind.APPLY:
+			args = member.operands
+			tasks.append((call_k, env, len(args)))
+			for arg in reversed(args):
+				push_expr(arg, env, tasks)
+			tasks.append((refer_k, env, member.operator.name))
+		else:
+			tasks.append((refer_k, env, member.name))
+		push_expr(fun, env, tasks)
+	else:
+		tasks.append((call_k, env, len(operands)))
+		for arg in reversed(operands):
+			push_expr(arg, env, tasks)
+		push_expr(operator, env, tasks)
+
+def define_k(env, stmt, tasks, values):
+	val = values.pop()
+	env[1][stmt.left] = val
+	values.append(val)
+
+def assign_k(env, stmt, tasks, values):
+	left = stmt.left
+	if left.kind == Kind.APPLY and left.operator.name == '[]':
+		i = values.pop()
+		xs = values.pop()
+		old = values.pop() if stmt.return_left else None
+		val = values.pop()
+		set_index(xs, i, val)
+		values.append(old if stmt.return_left else val)
+		return
+	if left.kind == Kind.APPLY:
+		obj_env = values.pop()
+		name = left.operands[1].name
+		line = None
+	else:
+		obj_env = env
+		name = left.name
+		line = left.line
+	old = values.pop() if stmt.return_left else None
+	val = values.pop()
+	assign(name, val, obj_env, line)
+	values.append(old if stmt.return_left else val)
+
+def logic_k(env, stmt, tasks, values):
+	operand_1 = values[-1]
+	is_and = stmt.operator.name == '&&'
+	if (is_and and operand_1 == True) or (not is_and and operand_1 == False):
+		tasks.append((logic_finish_k, env, stmt))
+		push_expr(stmt.operands[1], env, tasks)
+	else:
+		values.append(None)
+		logic_finish_k(env, stmt, tasks, values)
+
+def logic_finish_k(env, stmt, tasks, values):
+	operand_2 = values.pop()
+	operand_1 = values.pop()
+	fun = lookup(stmt.operator.name, env)
+	values.append(fun[1](operand_1, operand_2))
+
+def is_namespace(fun):
+	return isinstance(fun, tuple) and len(fun) > 1 and fun[0] in FunctionType.VALUES
+
+def push_member_env(fun, env, tasks, values):
+	# leaves the env that holds the members of fun on the value stack
+	if isinstance(fun, Instance):
+		values.append(fun.env)
+	elif not is_namespace(fun):
+		raise EvalExeption('Unknown reference')
+	elif 'instance' in fun[1]:
+		values.append(fun[1]['instance'])
+	else:
+		# a function used as a namespace runs its body once, on first access
+		func = fun[1]
+		func_env = (func['env'], {})
+		tasks.append((namespace_k, func_env, func))
+		if func['body']:
+			tasks.append((drop_value, env, None))
+			tasks.append((call_boundary, env, len(values)))
+			push_stmt(func['body'], func_env, tasks)
+
+def namespace_k(env, func, tasks, values):
+	func['instance'] = env
+	values.append(env)
+
+def member_env_k(env, data, tasks, values):
+	push_member_env(values.pop(), env, tasks, values)
+
+def refer_k(env, member, tasks, values):
+	fun = values.pop()
+	if isinstance(fun, Instance) and member in fun.env[1]:
+		values.append(fun.env[1][member])
+	elif isinstance(fun, Instance) or is_namespace(fun):
+		tasks.append((refer_lookup_k, env, member))
+		push_member_env(fun, env, tasks, values)
+	elif isinstance(fun, lst.Cons):
+		values.append(lst_method(fun, member))
+	else:
+		values.append(data_member(fun, member))
+
+def refer_lookup_k(env, member, tasks, values):
+	values.append(lookup(member, values.pop()))
+
+def call_k(env, nargs, tasks, values):
+	if nargs:
+		args = values[-nargs:]
+		del values[-nargs:]
+	else:
+		args = []
+	fun = values.pop()
+	if fun[0] == FunctionType.PRIMITIVE:
+		values.append(fun[1](*args))
+	elif fun[0] == FunctionType.FUNCTION:
+		func = fun[1]
+		params = func['parameters']
+		if len(params) != len(args):
+			raise EvalExeption('error, make frames')
+		memo = func.get('memo')
+		if memo is not None:
+			key, value = memo.lookup(args)
+			if value is not MISSING:
+				values.append(value)
+				return
+			if key is not None:
+				# runs once the call has left its value, and keeps the call
+				# from being a tail call
+				tasks.append((memo_store_k, env, (memo, key, args)))
+		governor = running.governor
+		if governor is not None:
+			governor.step(func['line'])
+		if not func['body']:
+			values.append(None)
+			return
+		func_env = (func['env'], dict(zip(params, args)))
+		if tasks and tasks[-1][0] is return_k:
+			# tail call: reuse the caller's boundary instead of stacking a new one
+			while tasks and tasks[-1][0] is not call_boundary:
+				tasks.pop()
+		else:
+			tasks.append((call_boundary, env, len(values)))
+		push_stmt(func['body'], func_env, tasks)
+	else:
+		raise EvalExeption('Unknown application')
+
+def memo_store_k(env, data, tasks, values):
+	memo, key, args = data
+	memo.store(key, args, values[-1])
+
+def call_boundary(env, height, tasks, values):
+	# reached when a body finishes without `return`
+	del values[height:]
+	values.append(None)
+
+## STATEMENTS
+
+def eval_stmt(env, stmt, tasks, values):
+	kind = stmt.kind
+	if kind == Kind.VAR_DEF:
+		tasks.append((drop_value, env, None))
+		tasks.append((define_k, env, stmt))
+		push_expr(stmt.right, env, tasks)
+	elif kind == Kind.IF:
+		tasks.append((if_k, env, stmt))
+		push_expr(stmt.predicate, env, tasks)
+	elif kind == Kind.WHILE:
+		tasks.append((while_test, env, stmt))
+	elif kind == Kind.FOR:
+		eval_for_stmt(env, stmt, tasks, values)
+	elif kind == Kind.SWITCH:
+		tasks.append((switch_k, env, stmt))
+		push_expr(stmt.variable, env, tasks)
+	elif kind == Kind.RETURN:
+		tasks.append((return_k, env, None))
+		push_expr(stmt.expression, env, tasks)
+	elif kind == Kind.BREAK:
+		unwind(tasks, BREAK_TARGETS)
+	elif kind == Kind.CONTINUE:
+		target = unwind(tasks, LOOP_TASKS)
+		if target is not None:
+			tasks.append(target)
+	elif kind == Kind.FALLTHROUGH:
+		target = unwind(tasks, (switch_end,))
+		if target is not None:
+			switch_next(target[1], target[2], tasks)
+
+def unwind(tasks, targets):
+	# pop tasks up to a target; a call boundary stops the search and is kept
+	while tasks:
+		task = tasks[-1]
+		if task[0] is call_boundary:
+			return None
+		tasks.pop()
+		if task[0] in targets:
+			return task
+	return None
+
+def return_k(env, data, tasks, values):
+	val = values.pop()
+	while tasks:
+		task = tasks.pop()
+		if task[0] is call_boundary:
+			del values[task[2]:]
+			break
+	values.append(val)
+
+def if_k(env, stmt, tasks, values):
+	if values.pop():
+		push_stmt(stmt.consequent, (env, {}), tasks)
+	elif stmt.alternative:
+		push_stmt(stmt.alternative, (env, {}), tasks)
+
+def while_test(env, stmt, tasks, values):
+	tasks.append((while_k, env, stmt))
+	push_expr(stmt.predicate, env, tasks)
+
+def while_k(env, stmt, tasks, values):
+	if values.pop():
+		governor = running.governor
+		if governor is not None:
+			governor.step(stmt.line)
+		tasks.append((while_test, env, stmt))
+		push_stmt(stmt.consequent, (env, {}), tasks)
+
+def eval_for_stmt(env, stmt, tasks, values):
+	for_range = stmt.range
+	if isinstance(for_range, Node) and for_range.kind == Kind.RANGE:
+		tasks.append((for_range_init, env, stmt))
+		push_expr(1 if stmt.increment is None else stmt.increment, env, tasks)
+		push_expr(for_range.end, env, tasks)
+		push_expr(for_range.start, env, tasks)
+	else:
+		tasks.append((for_each_init, env, stmt))
+		push_expr(for_range, env, tasks)
+
+def for_range_init(env, stmt, tasks, values):
+	increment = range_step(values.pop())
+	range_to = values.pop()
+	range_from = values.pop()
+	name = stmt.variable.name
+	for_env = (env, {name: range_from})
+	state = (stmt, name, range_to, stmt.range.closed, increment)
+	for_range_test(for_env, state, tasks, values)
+
+def for_range_test(env, state, tasks, values):
+	stmt, name, range_to, closed, increment = state
+	var_val = env[1][name]
+	if (increment > 0 and (var_val < range_to or (closed and var_val == range_to))) or (
+			increment < 0 and (var_val > range_to or (closed and var_val == range_to))):
+		governor = running.governor
+		if governor is not None:
+			governor.step(stmt.line)
+		tasks.append((for_range_step, env, state + (var_val,)))
+		push_stmt(stmt.consequent, env, tasks)
+
+def for_range_step(env, state, tasks, values):
+	env[1][state[1]] = state[5] + state[4]
+	for_range_test(env, state[:5], tasks, values)
+
+def for_each_init(env, stmt, tasks, values):
+	items = for_items(values.pop())
+	for_env = (env, {stmt.variable.name: None})
+	for_each_step(for_env, (stmt, items), tasks, values)
+
+def for_each_step(env, state, tasks, values):
+	stmt, items = state
+	item = next(items, MISSING)
+	if item is not MISSING:
+		governor = running.governor
+		if governor is not None:
+			governor.step(stmt.line)
+		env[1][stmt.variable.name] = item
+		tasks.append((for_each_step, env, state))
+		push_stmt(stmt.consequent, env, tasks)
+
+def switch_k(env, stmt, tasks, values):
+	val = values.pop()
+	for i, case in enumerate(stmt.cases):
+		if val in case.value:
+			switch_next(env, (stmt, i), tasks)
+			return
+	if stmt.default:
+		push_stmt(stmt.default, (env, {}), tasks)
+
+def switch_next(env, state, tasks):
+	stmt, i = state
+	cases = stmt.cases
+	if i < len(cases):
+		tasks.append((switch_end, env, (stmt, i + 1)))
+		push_stmt(cases[i].stmt, (env, {}), tasks)
+	elif stmt.default:
+		push_stmt(stmt.default, (env, {}), tasks)
+
+def switch_end(env, state, tasks, values):
+	pass
+
+LOOP_TASKS = (while_test, for_range_step, for_each_step)
+BREAK_TARGETS = LOOP_TASKS + (switch_end,)
+
+## RUN
+
+def execute(ast, env):
+	tasks = []
+	values = []
+	push_stmt(ast, env, tasks)
+	while tasks:
+		handler, task_env, data = tasks.pop()
+		handler(task_env, data, tasks, values)
+	return values[-1] if values else None
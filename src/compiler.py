@@ -0,0 +1,527 @@
+import lst
+from evaluator import (FunctionType, EvalExeption, Instance, MISSING, data_member, for_items, is_self_evaluating, init_env,
+	loopup_var, lst_method, memo_cache, range_step, running, set_index)
+from nodes import Kind, Node
+from resolver import Resolver, FRAME_HEADER, UNSET, block_names, find_place, is_func_def
+
+# Closure compiler: turns the AST into a tree of Python closures once, so
+# running a node is a single call instead of a walk through the tag checks
+# in evaluator.evaluate(). Statement closures return None or a Signal,
+# expression closures return the value. Variables are resolved to
+# (depth, slot) pairs at compile time, see resolver.py.
+
+class Signal(object):
+	__slots__ = ('tag', 'content')
+
+	def __init__(self, tag, content=None):
+		self.tag = tag
+		self.content = content
+
+BREAK = Signal('break_value')
+CONTINUE = Signal('continue_value')
+FALLTHROUGH = Signal('fallthrough_value')
+RETURN = 'return_value'
+
+class Program(object):
+	__slots__ = ('code', 'scope', 'builtins')
+
+	def __init__(self, code, scope, builtins):
+		self.code = code
+		self.scope = scope
+		self.builtins = builtins
+
+## RUNTIME
+
+def lookup(name, env):
+	while env:
+		slot = env[1].names.get(name)
+		if slot is not None and env[slot] is not UNSET:
+			return env[slot]
+		env = env[0]
+	raise EvalExeption('Cannot find variable: ' + name)
+
+def assign(name, val, env):
+	while env:
+		slot = env[1].names.get(name)
+		if slot is not None and env[slot] is not UNSET:
+			env[slot] = val
+			return
+		env = env[0]
+	raise EvalExeption('Cannot find variable: ' + name)
+
+def apply(fun, args):
+	if fun[0] == FunctionType.PRIMITIVE:
+		return fun[1](*args)
+	elif fun[0] == FunctionType.FUNCTION:
+		func = fun[1]
+		if len(func['parameters']) != len(args):
+			raise EvalExeption('error, make frames')
+		memo = func.get('memo')
+		if memo is not None:
+			key, value = memo.lookup(args)
+			if value is not MISSING:
+				return value
+		governor = running.governor
+		if governor is not None:
+			governor.step(func['line'])
+		body = func['body']
+		value = None
+		if body is not None:
+			frame = func['scope'].new_frame(func['env'])
+			frame[FRAME_HEADER:FRAME_HEADER + len(args)] = args
+			signal = body(frame)
+			if signal is not None and signal.tag == RETURN:
+				value = signal.content
+		if memo is not None and key is not None:
+			memo.store(key, args, value)
+		return value
+	else:
+		raise EvalExeption('Unknown application')
+
+def refer_env(fun):
+	if isinstance(fun, Instance):
+		return fun.env
+	if isinstance(fun, tuple) and len(fun) > 1 and fun[0] in FunctionType.VALUES:
+		# a function used as a namespace runs its body once, on first access
+		func = fun[1]
+		if 'instance' not in func:
+			func_env = func['scope'].new_frame(func['env'])
+			if func['body'] is not None:
+				func['body'](func_env)
+			func['instance'] = func_env
+		return func['instance']
+	raise EvalExeption('Unknown reference')
+
+def refer(fun, member):
+	if isinstance(fun, Instance) or (isinstance(fun, tuple) and len(fun) > 1 and fun[0] in FunctionType.VALUES):
+		return lookup(member, refer_env(fun))
+	if isinstance(fun, lst.Cons):
+		return lst_method(fun, member)
+	return data_member(fun, member)
+
+## EXPRESSIONS
+
+def compile_constant(value):
+	return lambda env: value
+
+def compile_variable(stmt, res):
+	places = res.resolve(stmt.name, stmt.line)
+	if len(places) > 1:
+		name, line = stmt.name, stmt.line
+		def run(env):
+			frame, slot = find_place(env, places, name, line)
+			return frame[slot]
+		return run
+	depth, slot = places[0]
+	if depth == 0:
+		return lambda env: env[slot]
+	elif depth == 1:
+		return lambda env: env[0][slot]
+	elif depth == 2:
+		return lambda env: env[0][0][slot]
+	def run(env):
+		for _ in range(depth):
+			env = env[0]
+		return env[slot]
+	return run
+
+def compile_store(stmt, res):
+	places = res.resolve(stmt.name, stmt.line)
+	if len(places) > 1:
+		name, line = stmt.name, stmt.line
+		def store(env, val):
+			frame, slot = find_place(env, places, name, line)
+			frame[slot] = val
+		return store
+	depth, slot = places[0]
+	if depth == 0:
+		def store(env, val):
+			env[slot] = val
+	elif depth == 1:
+		def store(env, val):
+			env[0][slot] = val
+	else:
+		def store(env, val):
+			for _ in range(depth):
+				env = env[0]
+			env[slot] = val
+	return store
+
+def compile_var_def(stmt, res):
+	if is_func_def(stmt.right):
+		# the body can only run once the function is stored, so it sees
+		# its own name
+		slot = res.declare(stmt.left)
+		right = compile_expr(stmt.right, res)
+	else:
+		right = compile_expr(stmt.right, res)
+		slot = res.declare(stmt.left)
+	def run(env):
+		val = right(env)
+		env[slot] = val
+		return val
+	return run
+
+def compile_func_def(stmt, res):
+	if stmt.is_class:
+		return lambda env: Instance(env)
+	name = stmt.name
+	params = stmt.parameters
+	scope = res.enter(block_names(stmt.body), params, is_function=True)
+	body = compile_block(stmt.body, res) if stmt.body else None
+	res.leave(scope)
+	line = stmt.line
+	memo = stmt.memo
+	def run(env):
+		func = {
+			'tag': 'function_value',
+			'name': name,
+			'parameters': params,
+			'body': body,
+			'scope': scope,
+			'env': env,
+			'line': line,
+		}
+		if memo:
+			func['memo'] = memo_cache(name, line, memo)
+		return (FunctionType.FUNCTION, func)
+	return run
+
+def compile_assign(stmt, res):
+	right = compile_expr(stmt.right, res)
+	left = stmt.left
+	return_left = stmt.return_left
+	left_value = compile_expr(left, res) if return_left else None
+	if left.kind == Kind.APPLY and left.operator.name == '[]':
+		xs, i = [compile_expr(s, res) for s in left.operands]
+		def run(env):
+			val = right(env)
+			old = left_value(env) if return_left else None
+			set_index(xs(env), i(env), val)
+			return old if return_left else val
+	elif left.kind == Kind.APPLY:
+		fun, member = left.operands
+		fun = compile_expr(fun, res)
+		member_env = compile_member(member.name)
+		def run(env):
+			val = right(env)
+			old = left_value(env) if return_left else None
+			frame, slot = member_env(fun(env))
+			frame[slot] = val
+			return old if return_left else val
+	else:
+		store = compile_store(left, res)
+		def run(env):
+			val = right(env)
+			old = left_value(env) if return_left else None
+			store(env, val)
+			return old if return_left else val
+	return run
+
+def compile_logic(stmt, res):
+	operator = compile_variable(stmt.operator, res)
+	is_and = stmt.operator.name == '&&'
+	left, right = [compile_expr(s, res) for s in stmt.operands]
+	def run(env):
+		operand_1 = left(env)
+		operand_2 = None
+		if (is_and and operand_1 == True) or (not is_and and operand_1 == False):
+			operand_2 = right(env)
+		return operator(env)[1](operand_1, operand_2)
+	return run
+
+def compile_member(name):
+	# member lookup with an inline cache: instances of the same class share
+	# the Scope of their frame, so the slot found for one is valid for all
+	cache = [None, 0]
+	def member_env(obj):
+		frame = refer_env(obj)
+		scope = frame[1]
+		if scope is cache[0]:
+			return frame, cache[1]
+		slot = scope.names.get(name)
+		if slot is None or frame[slot] is UNSET:
+			env = frame[0]
+			while env:
+				slot = env[1].names.get(name)
+				if slot is not None and env[slot] is not UNSET:
+					return env, slot
+				env = env[0]
+			raise EvalExeption('Cannot find variable: ' + name)
+		if slot not in scope.unset:
+			cache[0] = scope
+			cache[1] = slot
+		return frame, slot
+	return member_env
+
+def compile_refer(stmt, res):
+	fun, member = stmt.operands
+	fun = compile_expr(fun, res)
+	if member.kind == Kind.APPLY:
+		name = member.operator.name
+		args = [compile_expr(s, res) for s in member.operands]
+	else:
+		name = member.name
+		args = None
+	member_env = compile_member(name)
+	def get(obj):
+		if isinstance(obj, Instance) or (isinstance(obj, tuple) and len(obj) > 1 and obj[0] in FunctionType.VALUES):
+			frame, slot = member_env(obj)
+			return frame[slot]
+		return refer(obj, name)
+	if args is None:
+		return lambda env: get(fun(env))
+	def run(env):
+		method = get(fun(env))
+		return apply(method, [arg(env) for arg in args])
+	return run
+
+def compile_apply(stmt, res):
+	name = stmt.operator.name if stmt.operator.kind == Kind.VAR else None
+	if name == '&&' or name == '||':
+		return compile_logic(stmt, res)
+	elif name == '.':
+		return compile_refer(stmt, res)
+	operator = compile_expr(stmt.operator, res)
+	args = [compile_expr(s, res) for s in stmt.operands]
+	if len(args) == 1:
+		arg_1, = args
+		def run(env):
+			fun = operator(env)
+			if fun[0] == FunctionType.PRIMITIVE:
+				return fun[1](arg_1(env))
+			return apply(fun, [arg_1(env)])
+	elif len(args) == 2:
+		arg_1, arg_2 = args
+		def run(env):
+			fun = operator(env)
+			if fun[0] == FunctionType.PRIMITIVE:
+				return fun[1](arg_1(env), arg_2(env))
+			return apply(fun, [arg_1(env), arg_2(env)])
+	else:
+		def run(env):
+			return apply(operator(env), [arg(env) for arg in args])
+	return run
+
+## STATEMENTS
+
+def compile_sequence(stmts, res):
+	body = [compile_stmt(s, res) for s in stmts]
+	if len(body) == 1:
+		return body[0]
+	def run(env):
+		for s in body:
+			signal = s(env)
+			if signal is not None:
+				return signal
+	return run
+
+def compile_block(stmt, res):
+	if isinstance(stmt, list):
+		return compile_sequence(stmt, res)
+	return compile_stmt(stmt, res)
+
+def compile_scoped(stmt, res):
+	# a block that runs in a fresh frame of its own
+	scope = res.enter(block_names(stmt))
+	code = compile_block(stmt, res)
+	res.leave(scope)
+	if scope is None:
+		return code
+	pad = scope.blank
+	def run(env):
+		return code([env, scope] + pad)
+	return run
+
+def compile_if(stmt, res):
+	predicate = compile_expr(stmt.predicate, res)
+	consequent = compile_scoped(stmt.consequent, res)
+	alternative = compile_scoped(stmt.alternative, res) if stmt.alternative else None
+	def run(env):
+		if predicate(env):
+			return consequent(env)
+		elif alternative is not None:
+			return alternative(env)
+	return run
+
+def compile_switch(stmt, res):
+	variable = compile_expr(stmt.variable, res)
+	cases = [(case.value, compile_scoped(case.stmt, res)) for case in stmt.cases]
+	default = compile_scoped(stmt.default, res) if stmt.default else None
+	def run(env):
+		val = variable(env)
+		falling = False
+		for values, body in cases:
+			if falling or val in values:
+				signal = body(env)
+				if signal is FALLTHROUGH:
+					falling = True
+					continue
+				if signal is BREAK:
+					return None
+				return signal
+		if default is not None:
+			return default(env)
+	return run
+
+def compile_while(stmt, res):
+	predicate = compile_expr(stmt.predicate, res)
+	consequent = compile_scoped(stmt.consequent, res)
+	line = stmt.line
+	def run(env):
+		governor = running.governor
+		while predicate(env):
+			if governor is not None:
+				governor.step(line)
+			signal = consequent(env)
+			if signal is not None:
+				if signal is BREAK:
+					break
+				if signal is CONTINUE:
+					continue
+				return signal
+	return run
+
+def compile_for(stmt, res):
+	for_range = stmt.range
+	name = stmt.variable.name
+	is_range = isinstance(for_range, Node) and for_range.kind == Kind.RANGE
+	if is_range:
+		range_from = compile_expr(for_range.start, res)
+		range_to = compile_expr(for_range.end, res)
+		closed = for_range.closed
+		increment = compile_expr(1 if stmt.increment is None else stmt.increment, res)
+	else:
+		range_items = compile_expr(for_range, res)
+	scope = res.enter(block_names(stmt.consequent), (name,), is_loop=True)
+	consequent = compile_block(stmt.consequent, res)
+	res.leave(scope)
+	slot = scope.names[name]
+	pad = scope.blank
+	line = stmt.line
+	if is_range:
+		def run(env):
+			governor = running.governor
+			frame = [env, scope] + pad
+			frame[slot] = range_from(env)
+			to_val = range_to(env)
+			step = range_step(increment(env))
+			while True:
+				var_val = frame[slot]
+				if step > 0:
+					if var_val > to_val or (not closed and var_val == to_val):
+						break
+				elif var_val < to_val or (not closed and var_val == to_val):
+					break
+				if governor is not None:
+					governor.step(line)
+				signal = consequent(frame)
+				if signal is not None:
+					if signal is BREAK:
+						break
+					if signal is not CONTINUE:
+						return signal
+				frame[slot] = var_val + step
+	else:
+		def run(env):
+			items = for_items(range_items(env))
+			governor = running.governor
+			frame = [env, scope] + pad
+			for item in items:
+				if governor is not None:
+					governor.step(line)
+				frame[slot] = item
+				signal = consequent(frame)
+				if signal is not None:
+					if signal is BREAK:
+						break
+					if signal is not CONTINUE:
+						return signal
+	return run
+
+def compile_return(stmt, res):
+	expression = compile_expr(stmt.expression, res)
+	return lambda env: Signal(RETURN, expression(env))
+
+def compile_signal(signal):
+	return lambda stmt, res: lambda env: signal
+
+## COMPILE
+
+EXPR_COMPILERS = {
+	Kind.VAR: compile_variable,
+	Kind.VAR_DEF: compile_var_def,
+	Kind.FUNC_DEF: compile_func_def,
+	Kind.ASSIGN: compile_assign,
+	Kind.APPLY: compile_apply,
+}
+
+STMT_COMPILERS = {
+	Kind.IF: compile_if,
+	Kind.SWITCH: compile_switch,
+	Kind.WHILE: compile_while,
+	Kind.FOR: compile_for,
+	Kind.RETURN: compile_return,
+	Kind.BREAK: compile_signal(BREAK),
+	Kind.CONTINUE: compile_signal(CONTINUE),
+	Kind.FALLTHROUGH: compile_signal(FALLTHROUGH),
+}
+
+def compile_expr(stmt, res):
+	if isinstance(stmt, list):
+		return compile_sequence(stmt, res)
+	elif is_self_evaluating(stmt):
+		return compile_constant(stmt)
+	elif isinstance(stmt, Node) and stmt.kind in EXPR_COMPILERS:
+		return EXPR_COMPILERS[stmt.kind](stmt, res)
+	raise EvalExeption('Unsupported expression')
+
+def compile_stmt(stmt, res):
+	if isinstance(stmt, list):
+		return compile_sequence(stmt, res)
+	elif isinstance(stmt, Node) and stmt.kind in STMT_COMPILERS:
+		return STMT_COMPILERS[stmt.kind](stmt, res)
+	expr = compile_expr(stmt, res)
+	def run(env):
+		expr(env)
+	return run
+
+def compile_program(ast, builtins=None):
+	if builtins is None:
+		builtins = list(init_env()[1])
+	res = Resolver(builtins)
+	scope = res.enter(block_names(ast) if ast else [])
+	code = compile_block(ast, res) if ast else (lambda env: None)
+	res.leave(scope)
+	return Program(code, scope, res.builtins)
+
+def global_frame(program, env):
+	# env is an evaluator environment that supplies the builtin frame
+	frame = program.builtins.new_frame(None)
+	for name, slot in program.builtins.names.items():
+		frame[slot] = loopup_var(None, name, env)
+	if program.scope is not None:
+		frame = program.scope.new_frame(frame)
+	return frame
+
+def export_globals(program, frame, env):
+	# hand the program's globals back to env once the run is over, with
+	# those of env it assigned to; the builtins behind env stay as they were
+	top = env[1]
+	builtins = frame if program.scope is None else frame[0]
+	for name, slot in program.builtins.names.items():
+		if name in top:
+			top[name] = builtins[slot]
+	if program.scope is not None:
+		for name, slot in program.scope.names.items():
+			if frame[slot] is not UNSET:
+				top[name] = frame[slot]
+
+def execute(program, env):
+	frame = global_frame(program, env)
+	try:
+		signal = program.code(frame)
+	finally:
+		export_globals(program, frame, env)
+	if signal is not None and signal.tag == RETURN:
+		return signal.content
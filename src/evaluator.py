@@ -1,21 +1,20 @@
+import itertools
 import json
+import operator as ops
+import os
 import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+import files
 import lst
-
-class Tag:
-	VAR = 'variable'
-	VAR_DEF = 'var_definition'
-	FUNC_DEF = 'function_definition'
-	ASSIGN = 'assignment'
-	APPLY = 'application'
-	IF = 'if'
-	WHILE = 'while'
-	SWITCH = 'switch'
-	FOR = 'for'
-	BREAK = 'break'
-	CONTINUE = 'continue'
-	FALLTHROUGH = 'fallthrough'
-	RETURN = 'return'
+import output
+import seq
+import text
+import vec
+import binast
+from nodes import Kind, Node, from_json, to_json
 
 class FunctionType:
 	FUNCTION = 'function'
@@ -26,6 +25,26 @@ class FunctionType:
 class EvalExeption(Exception):
 	pass
 
+class ResourceExceeded(EvalExeption):
+	# a Governor limit ran out; resource is 'steps', 'memory' or 'time'
+	def __init__(self, message, line=None, resource=None):
+		if line is not None:
+			message = '{0} (line {1})'.format(message, line)
+		EvalExeption.__init__(self, message)
+		self.line = line
+		self.resource = resource
+
+class Instance(object):
+	# value of `this` in a class body, its members live in the frame of
+	# the class call
+	__slots__ = ('env',)
+
+	def __init__(self, env):
+		self.env = env
+
+	def __repr__(self):
+		return '<instance>'
+
 primitive_const = {
 	'null': None,
 	'undefined': None,
@@ -35,36 +54,297 @@ primitive_const = {
 
 ## OS
 def _output(*xs):
-	for x in xs:
-		if lst.is_lst(x):
-			print(lst.lst2arr(x))
-		else:
-			print(x)
+	current_output().print(*xs)
+
+def _input(prompt=''):
+	flush_printed()
+	stream = running.input
+	if stream is None:
+		return input(prompt)
+	current_output().write(str(prompt))
+	line = stream.readline()
+	if not line:
+		raise EOFError('no more input')
+	return files.strip_newline(line)
 
 def _string_to_char_list(s):
-	return lst.lst(*list(s))
+	if len(s) > LARGE_ALLOCATION // CONS_SIZE:
+		allocate(len(s) * CONS_SIZE)
+	return lst.from_sequence(s)
 
 def _throw(msg):
 	raise EvalExeption(msg)
 ## PRIMITIVE FUNC
 
+def concat(x, y):
+	if len(x) + len(y) > LARGE_ALLOCATION:
+		allocate(len(x) + len(y))
+	return x + y
+
 def plus(x, y):
-	if isinstance(x, str) and isinstance(y, str):
-		return x + y
-	elif isinstance(x, str) or isinstance(y, str):
-		return str(x) + str(y)
+	# type() rather than isinstance: no str subclass ever reaches here
+	tx, ty = type(x), type(y)
+	if tx is str and ty is str:
+		return concat(x, y)
+	elif tx is str or ty is str:
+		return concat(str(x), str(y))
 	else:
 		return x + y
 
+def times(x, y):
+	if isinstance(x, (str, vec.Array)) and isinstance(y, int):
+		size = len(x) * y * (1 if isinstance(x, str) else SLOT_SIZE)
+		if size > LARGE_ALLOCATION:
+			allocate(size)
+	elif isinstance(y, (str, vec.Array)) and isinstance(x, int):
+		size = len(y) * x * (1 if isinstance(y, str) else SLOT_SIZE)
+		if size > LARGE_ALLOCATION:
+			allocate(size)
+	return x * y
+
+# a[i] reads any of arrays, lists and strings, a list walking to its cell,
+# a[i] = x only changes arrays; indexes are from 0, none negative
+def index(xs, i):
+	if type(i) is not int:
+		raise EvalExeption('Index must be an integer: {0!r}'.format(i))
+	t = type(xs)
+	if t is vec.Array or t is str:
+		if 0 <= i < len(xs):
+			return xs[i]
+	elif t is lst.Cons:
+		cell = vec.nth(xs, i) if i >= 0 else None
+		if cell is not None:
+			return cell.head
+	elif t is text.CharView:
+		if 0 <= i < len(xs):
+			return xs.string[xs.pos + i]
+	elif t is files.FileView:
+		if 0 <= i < len(open_view(xs)):
+			return xs.byte(i)
+	else:
+		raise EvalExeption('Only arrays, lists and strings can be indexed')
+	raise EvalExeption('Index out of range: {0}'.format(i))
+
+def set_index(xs, i, val):
+	if type(xs) is not vec.Array:
+		raise EvalExeption('Only array elements can be assigned')
+	if type(i) is not int:
+		raise EvalExeption('Index must be an integer: {0!r}'.format(i))
+	if not 0 <= i < len(xs):
+		raise EvalExeption('Index out of range: {0}'.format(i))
+	xs[i] = val
+
+def slice_of(xs, start, end):
+	# a[start:end], either bound may be null
+	for bound in (start, end):
+		if bound is not None and (type(bound) is not int or bound < 0):
+			raise EvalExeption('Slice bounds must be integers from 0: {0!r}'.format(bound))
+	t = type(xs)
+	if t is vec.Array:
+		return vec.Array(xs[start:end])
+	elif t is str:
+		return xs[start:end]
+	elif t is lst.Cons:
+		return lst.from_sequence(list(itertools.islice(lst.iterate(xs), start, end)))
+	elif t is files.FileView:
+		return view_text(xs, start, end)
+	raise EvalExeption('Only arrays, lists and strings can be sliced')
+
+## BULK PRIMITIVES
+# Single loops over an array, list or string; map and filter call a script
+# function per element through call_function, the rest never leave C.
+
+def sequence(xs):
+	seq = vec.items(xs)
+	if seq is None:
+		raise EvalExeption('Not an array, list or string: {0!r}'.format(xs))
+	if type(xs) is files.FileView:
+		open_view(xs)
+	return seq
+
+def _array(xs, fill=None):
+	# array(n, fill) has n elements, array(xs) those of xs
+	if type(xs) is int:
+		if xs * SLOT_SIZE > LARGE_ALLOCATION:
+			allocate(xs * SLOT_SIZE)
+		return vec.Array([fill]) * xs
+	return vec.Array(sequence(xs))
+
+def _map(f, xs):
+	return vec.Array([call_function(f, (x,)) for x in sequence(xs)])
+
+def _filter(f, xs):
+	return vec.Array([x for x in sequence(xs) if call_function(f, (x,))])
+
+def _sum(xs):
+	return sum(sequence(xs))
+
+def _sort(xs, key=None):
+	# a new sorted array, by key(x) if given
+	if key is None:
+		return vec.sort(xs if type(xs) is vec.Array else list(sequence(xs)))
+	return vec.Array(sorted(sequence(xs), key=lambda x: call_function(key, (x,))))
+
+## STRINGS
+# chars(s) walks a string like $string_to_char_list(s) without building the
+# list, builder() joins its pieces once when read; see text.py. A string
+# itself has a length and isEmpty.
+
+def _chars(s):
+	if type(s) is not str:
+		raise EvalExeption('Not a string: {0!r}'.format(s))
+	return text.chars(s)
+
+def builder_text(b):
+	if b.length > LARGE_ALLOCATION:
+		allocate(b.length)
+	return b.text()
+
+## SEQUENCES
+# a...b, a..<b and a..>b with a step are Ranges, and a function with yield
+# returns a Generator, see seq.py; `for` walks those and everything else
+# with elements one at a time through for_items.
+
+NUMBER_TYPES = (int, float)
+
+def _range(start, end, closed, step=1):
+	for bound in (start, end, step):
+		if type(bound) not in NUMBER_TYPES:
+			raise EvalExeption('Range bounds and step must be numbers: {0!r}'.format(bound))
+	return seq.Range(start, end, range_step(step), closed)
+
+def range_step(step):
+	# the step of a Range or of a `for` over a range literal
+	if step == 0:
+		raise EvalExeption('Range step cannot be 0')
+	return step
+
+def _generator(f):
+	def start():
+		# the generator's thread runs under the governor of the loop,
+		# prints where it prints and reads what it reads
+		governor = running.governor
+		sink = current_output()
+		stream = running.input
+		inline_caches = running.inline_caches
+		memo_registry = running.memo_registry
+		def run():
+			running.governor = governor
+			running.output = sink
+			running.input = stream
+			running.inline_caches = inline_caches
+			running.memo_registry = memo_registry
+			call_function(f, ())
+		return run
+	return seq.Generator(start)
+
+def _yield(x):
+	if not seq.emit(x):
+		raise EvalExeption('yield outside a generator')
+
+def for_items(xs):
+	# an iterator over what `for x in xs` walks
+	if type(xs) is lst.Cons:
+		if not xs.proper:
+			raise EvalExeption('Unsupported for range')
+		return lst.iterate(xs)
+	items = vec.items(xs)
+	if items is None:
+		raise EvalExeption('Unsupported for range')
+	if type(xs) is files.FileView:
+		open_view(xs)
+	return iter(items)
+
+## FILES
+# read() and lines() take stdin, or the input of the run, read(path) and
+# lines(path) a file; mmap(path) maps one, see files.py. Lines go through
+# `for` and the bulk primitives one at a time, a file read whole is
+# checked with the governor first.
+
+def current_input():
+	stream = running.input
+	return sys.stdin if stream is None else stream
+
+@contextmanager
+def reading(stream):
+	# input(), read() and lines() read stream in this thread
+	previous = running.input
+	running.input = stream
+	try:
+		yield stream
+	finally:
+		running.input = previous
+
+def file_error(path, e):
+	return EvalExeption('Cannot read {0}: {1}'.format(path, e.strerror or e))
+
+def check_path(path):
+	if type(path) is not str:
+		raise EvalExeption('Not a file name: {0!r}'.format(path))
+
+def _read(path=None):
+	if path is None:
+		flush_printed()
+		return current_input().read()
+	check_path(path)
+	try:
+		size = os.path.getsize(path)
+		if size > LARGE_ALLOCATION:
+			allocate(size)
+		with open(path, encoding='utf-8') as f:
+			return f.read()
+	except OSError as e:
+		raise file_error(path, e)
+
+def _lines(path=None):
+	if path is None:
+		flush_printed()
+		return files.stream_lines(current_input())
+	check_path(path)
+	try:
+		# fails here rather than in the loop
+		open(path, 'rb').close()
+	except OSError as e:
+		raise file_error(path, e)
+	return files.file_lines(path)
+
+def _mmap(path):
+	check_path(path)
+	try:
+		return files.FileView(path)
+	except OSError as e:
+		raise file_error(path, e)
+
+def open_view(v):
+	if v.closed:
+		raise EvalExeption('The file view of {0} is closed'.format(v.path))
+	return v
+
+def view_text(v, start=None, end=None):
+	size = len(open_view(v))
+	end = size if end is None else min(end, size)
+	if end - (start or 0) > LARGE_ALLOCATION:
+		allocate(end - (start or 0))
+	return v.text(start, end)
+
+def view_find(v, s, start=0):
+	if type(s) is not str or type(start) is not int:
+		raise EvalExeption('find takes a string and an offset: {0!r}, {1!r}'.format(s, start))
+	return open_view(v).find(s, start)
+
 primitive_func = {
 	'$list': lst.lst,
+	'$array': vec.array,
 	'$string_to_char_list': _string_to_char_list,
+	'$range': _range,
+	'$generator': _generator,
+	'$yield': _yield,
 	'$char_code': ord,
 
 	'_-': lambda x: -x,
 	'+': plus,
 	'-': lambda x, y: x - y,
-	'*': lambda x, y: x * y,
+	'*': times,
 	'/': lambda x, y: x // y,
 	'/.': lambda x, y: x / y,
 	'%': lambda x, y: x % y,
@@ -80,16 +360,363 @@ primitive_func = {
 	'&&': lambda x, y: x and y,
 	'||': lambda x, y: x or y,
 
-	',': lambda x, y: [x, y],
+	',': lst.pair,
+	'[]': index,
+	'[:]': slice_of,
 
 	'int': lambda x: int(x),
 	'round': lambda v, n: round(v, n),
 
-	'input': input,
+	'array': _array,
+	'map': _map,
+	'filter': _filter,
+	'sum': _sum,
+	'sort': _sort,
+	'chars': _chars,
+	'builder': text.StringBuilder,
+
+	'input': _input,
+	'read': _read,
+	'lines': _lines,
+	'mmap': _mmap,
 	'print': _output,
 	'throw': _throw,
 }
 
+## INLINE CACHES
+# An operator application in the tree walker binds once to the function
+# below instead of looking its operator up and going through eval_apply on
+# every run; each behaves exactly like its primitive_func entry. '+' and
+# '*' are further specialized on the operand types they first see.
+OPERATORS = {
+	'_-': ops.neg,
+	'_!': ops.not_,
+	'+': plus,
+	'-': ops.sub,
+	'*': times,
+	'/': ops.floordiv,
+	'/.': ops.truediv,
+	'%': ops.mod,
+	'**': ops.pow,
+	'==': ops.eq,
+	'!=': ops.ne,
+	'>': ops.gt,
+	'>=': ops.ge,
+	'<': ops.lt,
+	'<=': ops.le,
+	'[]': index,
+}
+UNARY_OPERATORS = ('_-', '_!')
+NUMBER_PAIRS = ((int, int), (float, float), (int, float), (float, int))
+# operand types -> the plain operation a generic function comes down to
+SPECIALIZED = {
+	plus: dict([(pair, ops.add) for pair in NUMBER_PAIRS] + [((str, str), concat)]),
+	times: dict((pair, ops.mul) for pair in NUMBER_PAIRS),
+}
+MAX_CACHE_MISSES = 8
+
+# A site is never changed once made: a miss puts a new one in the node, so
+# threads running the same Program never see one half updated.
+class OperatorSite(object):
+	__slots__ = ('fun', 'generic', 'guarded', 'left', 'right', 'misses')
+
+	def __init__(self, generic, fun=None, left=None, right=None, misses=0):
+		self.generic = generic
+		self.fun = generic if fun is None else fun
+		self.left = left
+		self.right = right
+		self.misses = misses
+		# specialized, or yet to be; a miss before that goes generic
+		self.guarded = generic in SPECIALIZED and (left is not None or misses == 0)
+
+	def miss(self, stmt, x, y):
+		# the guard failed: specialize on the first types seen, go generic
+		# after too many misses
+		generic = self.generic
+		misses = self.misses + 1
+		if self.left is None:
+			fast = SPECIALIZED[generic].get((type(x), type(y)))
+			if fast is not None:
+				stmt.cache = OperatorSite(generic, fast, type(x), type(y), self.misses)
+				return fast(x, y)
+			stmt.cache = OperatorSite(generic, misses=misses)
+		elif misses < MAX_CACHE_MISSES:
+			stmt.cache = OperatorSite(generic, self.fun, self.left, self.right, misses)
+		else:
+			stmt.cache = OperatorSite(generic, misses=misses)
+		return generic(x, y)
+
+def bind_operator(stmt):
+	# the OperatorSite of an application, or False if it isn't an operator
+	operator = stmt.operator
+	if operator.kind != Kind.VAR or operator.type != 'operator':
+		return False
+	fun = OPERATORS.get(operator.name)
+	if fun is None or len(stmt.operands) != (1 if operator.name in UNARY_OPERATORS else 2):
+		return False
+	return OperatorSite(fun)
+
+# A run that binds an operator name, in the script or in the globals a host
+# gives it, looks operators up from then on; other runs keep their caches.
+def check_binding(var):
+	if var in OPERATORS:
+		running.inline_caches = False
+
+def binds_operator(frame):
+	# whether a global frame gives an operator name another value
+	for name, fun in OPERATORS.items():
+		if name in frame and frame[name] != (FunctionType.PRIMITIVE, primitive_func[name]):
+			return True
+	return False
+
+@contextmanager
+def caching(frame):
+	# runs the tree walker with inline caches unless frame binds an operator
+	previous = running.inline_caches
+	running.inline_caches = not binds_operator(frame)
+	try:
+		yield
+	finally:
+		running.inline_caches = previous
+
+## RESOURCE GOVERNOR
+# Every engine counts a step per loop iteration and per call of a script
+# function, which no endless run can avoid, and hands it to the Governor of
+# the running thread, if any. Time and memory are looked at every
+# CHECK_EVERY steps, and before any string or list that takes more than
+# LARGE_ALLOCATION bytes is built, since one step can build a huge one.
+#
+#   with Governor(max_steps=10**6, max_memory=256 << 20, timeout=5):
+#       run_ast(ast, env, engine)
+
+CHECK_EVERY = 1024
+LARGE_ALLOCATION = 1 << 16
+CONS_SIZE = 72		# bytes per lst.Cons cell
+SLOT_SIZE = 8		# bytes per vec.Array element, not counting the element
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+class Running(threading.local):
+	governor = None
+	output = None	# the output.Sink print writes to, see current_output
+	input = None	# the stream input reads, None for stdin, see current_input
+	inline_caches = True	# see check_binding
+	memo_registry = None	# where memo functions count, see memo_counting
+
+running = Running()
+
+## OUTPUT
+# print writes to the sink of the running thread, by default one of its own
+# on stdout; a host picks another for a run with printing(sink). The sink is
+# flushed when a run ends, so what the run printed is out by then.
+
+def current_output():
+	sink = running.output
+	if sink is None:
+		sink = running.output = output.stdout_sink()
+	return sink
+
+def flush_printed():
+	# before input is read, so a prompt comes after what was printed
+	sink = running.output
+	if sink is not None:
+		sink.flush()
+
+@contextmanager
+def printing(sink):
+	previous = running.output
+	running.output = sink
+	try:
+		yield sink
+	finally:
+		running.output = previous
+		sink.flush()
+
+def memory_in_use():
+	# resident set size in bytes: the current one where /proc has it, else
+	# the peak, else 0 and memory is not limited
+	try:
+		with open('/proc/self/statm') as f:
+			return int(f.read().split()[1]) * PAGE_SIZE
+	except (OSError, ValueError, IndexError):
+		pass
+	try:
+		import resource
+	except ImportError:
+		return 0
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return peak if sys.platform == 'darwin' else peak * 1024
+
+def allocate(size):
+	# about to build a value of size bytes
+	governor = running.governor
+	if governor is not None and governor.max_memory is not None:
+		governor.check_memory(size)
+
+class Governor(object):
+	def __init__(self, max_steps=None, max_memory=None, timeout=None, check_every=CHECK_EVERY):
+		self.max_steps = max_steps
+		self.max_memory = max_memory	# bytes on top of what the process used at start
+		self.timeout = timeout			# seconds
+		self.check_every = check_every
+		self.steps = 0
+		self.line = None
+		self.next_check = 0
+		self.deadline = None
+		self.base_memory = 0
+
+	''' Accounting '''
+	def step(self, line):
+		self.steps += 1
+		if line is not None:
+			self.line = line
+		if self.steps >= self.next_check:
+			self.check()
+
+	def check(self):
+		if self.max_steps is not None and self.steps > self.max_steps:
+			raise ResourceExceeded('Step limit of {0:,} exceeded'.format(self.max_steps), self.line, 'steps')
+		if self.deadline is not None and time.monotonic() > self.deadline:
+			raise ResourceExceeded('Time limit of {0} s exceeded'.format(self.timeout), self.line, 'time')
+		if self.max_memory is not None:
+			self.check_memory()
+		self.next_check = self.steps + self.check_every
+		if self.max_steps is not None:
+			self.next_check = min(self.next_check, self.max_steps + 1)
+
+	def check_memory(self, size=0):
+		if memory_in_use() - self.base_memory + size > self.max_memory:
+			raise ResourceExceeded('Memory limit of {0:,} bytes exceeded'.format(self.max_memory), self.line, 'memory')
+
+	''' Activation '''
+	def start(self):
+		if running.governor is not None:
+			raise RuntimeError('a governor is already active in this thread')
+		self.steps = 0
+		self.next_check = 0
+		if self.timeout is not None:
+			self.deadline = time.monotonic() + self.timeout
+		if self.max_memory is not None:
+			self.base_memory = memory_in_use()
+		running.governor = self
+
+	def stop(self):
+		if running.governor is self:
+			running.governor = None
+
+	def __enter__(self):
+		self.start()
+		return self
+
+	def __exit__(self, *exc):
+		self.stop()
+
+## MEMOIZATION
+# A `memo func` keeps a MemoCache per function value: the results of its
+# calls by their arguments, the least recently used dropped once there are
+# more than its size. Numbers, strings, booleans and null are keyed by value,
+# lists by identity, which is enough since a list never changes; a call with
+# any other argument, a function or an instance, is not cached. Whether a
+# function may be memoized at all is for purity.py to say. Counts are kept
+# per definition in the registry of the run, a dict a host passes to
+# memo_counting(); interpreter.py keeps one per Interpreter, the profiler
+# one of its own. Without a registry nothing is counted.
+
+DEFAULT_MEMO_SIZE = 1024
+MISSING = object()
+KEY_TYPES = frozenset((int, float, str, bool, type(None)))
+
+class MemoStats(object):
+	__slots__ = ('name', 'line', 'size', 'hits', 'misses', 'evictions', 'skipped')
+
+	def __init__(self, name, line, size):
+		self.name = name
+		self.line = line
+		self.size = size
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.skipped = 0	# calls with an argument that can't be a key
+
+	def counts(self):
+		return (self.hits, self.misses, self.evictions, self.skipped)
+
+def memo_stats(registry):
+	# the MemoStats of a registry, (name, line) -> MemoStats, by line
+	return sorted(registry.values(), key=lambda stats: (stats.line is None, stats.line, stats.name))
+
+@contextmanager
+def memo_counting(registry):
+	previous = running.memo_registry
+	running.memo_registry = registry
+	try:
+		yield registry
+	finally:
+		running.memo_registry = previous
+
+def memo_key(args):
+	# 1, 1.0 and true are different arguments, so every key has its type
+	key = []
+	for arg in args:
+		t = type(arg)
+		if t in KEY_TYPES:
+			key.append((t, arg))
+		elif t is lst.Cons:
+			# keyed by identity, so only a list of values that can't change
+			if not arg.frozen:
+				return None
+			key.append((t, id(arg)))
+		elif t is text.CharView:
+			# immutable, so equal views are the same argument
+			key.append((t, arg.string, arg.pos))
+		elif t is seq.Range:
+			key.append((t, arg.start, arg.end, arg.step, arg.closed))
+		else:
+			return None
+	return tuple(key)
+
+class MemoCache(object):
+	__slots__ = ('entries', 'size', 'stats')
+
+	def __init__(self, stats):
+		self.entries = OrderedDict()
+		self.size = stats.size
+		self.stats = stats
+
+	def lookup(self, args):
+		# -> (key, value), value is MISSING unless cached and key None if
+		# the arguments can't be one
+		key = memo_key(args)
+		if key is None:
+			self.stats.skipped += 1
+			return None, MISSING
+		entry = self.entries.get(key)
+		if entry is None:
+			self.stats.misses += 1
+			return key, MISSING
+		self.entries.move_to_end(key)
+		self.stats.hits += 1
+		return key, entry[1]
+
+	def store(self, key, args, value):
+		# the arguments stay with the value, an id in a key is only unique
+		# while its list is alive
+		entries = self.entries
+		entries[key] = (tuple(args), value)
+		if len(entries) > self.size:
+			entries.popitem(last=False)
+			self.stats.evictions += 1
+
+def memo_cache(name, line, memo):
+	# a cache for a new value of a memo function, memo is FuncDef.memo
+	registry = running.memo_registry
+	stats = None if registry is None else registry.get((name, line))
+	if stats is None:
+		stats = MemoStats(name, line, DEFAULT_MEMO_SIZE if memo is True else memo)
+		if registry is not None:
+			# runs in other threads may define it too, one stats wins
+			stats = registry.setdefault((name, line), stats)
+	return MemoCache(stats)
+
 ## ENVIRONMENT
 def init_env():
 	env = ((), {})
@@ -99,6 +726,15 @@ def init_env():
 		env[1][key] = (FunctionType.PRIMITIVE, item)
 	return env
 
+class FrozenFrame(dict):
+	# a frame no script can change, for builtins shared between runs (see
+	# interpreter.py); reads are those of a plain dict
+	def _frozen(self, *args, **kwargs):
+		raise EvalExeption('Cannot assign to builtin: ' + str(args[0] if args else ''))
+
+	__setitem__ = __delitem__ = _frozen
+	pop = popitem = clear = update = setdefault = _frozen
+
 def add_frame(env):
 	return (env, {})
 
@@ -107,38 +743,52 @@ def make_frame(vars, vals):
 		raise EvalExeption('error, make frames')
 	frame = {}
 	for i in range(0, len(vars)):
+		check_binding(vars[i])
 		frame[vars[i]] = vals[i]
 	return frame
 
 def extend_env(env, vars, vals):
 	return (env, make_frame(vars, vals))
 
+def missing_variable(var, line=None):
+	if line is None:
+		return EvalExeption('Cannot find variable: ' + var)
+	return EvalExeption('Cannot find variable: {0} (line {1})'.format(var, line))
+
+# stmt is the node naming the variable, for the line of the error; None
+# for members, whose errors have no line on any engine
 def loopup_var(stmt, var, env):
-	def env_loop(env):
-		if len(env) == 0:
-			raise EvalExeption("Cannot find variable: " + var)
-		elif var in env[1]:
-			return env[1][var]
-		else:
-			return env_loop(env[0])
-	return env_loop(env)
+	while env:
+		frame = env[1]
+		if var in frame:
+			return frame[var]
+		env = env[0]
+	raise missing_variable(var, stmt.line if stmt is not None else None)
 
 def set_var_val(stmt, var, val, env):
-	def env_loop(env):
-		if len(env) == 0:
-			raise EvalExeption("Cannot find variable: " + var)
-			return False
-		elif var in env[1]:
-			env[1][var] = val
-			return True
-		else:
-			env_loop(env[0])
-	return env_loop(env)
+	while env:
+		frame = env[1]
+		if var in frame:
+			check_binding(var)
+			frame[var] = val
+			return
+		env = env[0]
+	raise missing_variable(var, stmt.line if stmt is not None else None)
 
 def add_var_val(stmt, var, val, env):
+	check_binding(var)
 	env[1][var] = val
 
+def env_names(env):
+	names = []
+	while len(env) > 0:
+		names.extend(name for name in env[1] if name not in names)
+		env = env[0]
+	return names
+
 ## UTIL
+SIGNALS = ('return_value', 'break_value', 'continue_value', 'fallthrough_value')
+
 def is_tagged_value(val, tag):
 	return isinstance(val, dict) and val.get('tag') == tag
 
@@ -151,132 +801,170 @@ def apply_primitive_func(fun, args):
 def is_func_tuple(x):
 	return isinstance(x, tuple) and len(x) > 1 and x[0] in FunctionType.VALUES
 
+def call_function(fun, args):
+	# calls a function value from Python, e.g. from the map primitive, on the
+	# engine that made it: tree and cek functions are alike, closure ones
+	# have a callable body and vm ones a Code
+	if not is_func_tuple(fun):
+		raise EvalExeption('Not a function: {0!r}'.format(fun))
+	if fun[0] == FunctionType.PRIMITIVE:
+		return fun[1](*args)
+	func = fun[1]
+	if 'scope' not in func:
+		return eval_apply(fun, args, None)
+	if func['body'] is None or callable(func['body']):
+		import compiler
+		return compiler.apply(fun, args)
+	import vm
+	return vm.call(fun, args)
+
 def list_of_values(lst, env):
 	return list(map(lambda v: evaluate(v, env), lst))
 
 ## STATEMENT EVALUATION
 
+def is_signal(val):
+	return isinstance(val, dict) and val.get('tag') in SIGNALS
+
 def eval_sequence(stmt, env):
 	last_value = None
 	for s in stmt:
 		val = evaluate(s, env)
-		if is_tagged_value(val, 'return_value'):
+		if is_signal(val):
 			return val
 		last_value = val
 	return last_value
 
 def eval_var_def(stmt, env):
-	var_value = evaluate(stmt['right'], env)
-	add_var_val(stmt, stmt['left'], var_value, env)
+	var_value = evaluate(stmt.right, env)
+	add_var_val(stmt, stmt.left, var_value, env)
 	return var_value
 
 def eval_func_def(stmt, env):
-	return (FunctionType.FUNCTION, {
-			'tag': 'function_value',
-			'name': stmt['name'],
-			'parameters': stmt['parameters'],
-			'body': stmt['body'],
-			'env': env,
-		})
+	if stmt.is_class:
+		return Instance(env)
+	func = {
+		'tag': 'function_value',
+		'name': stmt.name,
+		'parameters': stmt.parameters,
+		'body': stmt.body,
+		'env': env,
+		'line': stmt.line,
+	}
+	if stmt.memo:
+		func['memo'] = memo_cache(stmt.name, stmt.line, stmt.memo)
+	return (FunctionType.FUNCTION, func)
 
 def eval_assign(stmt, env):
-	val = evaluate(stmt['right'], env)
-	left_val = evaluate(stmt['left'], env) if stmt['returnLeft'] else None
-	# TODO func ref, array indexing
-	if is_tagged_value(stmt['left'], Tag.APPLY):
-		# TODO array indexing
-		fun, member = stmt['left']['operands']
-		set_var_val(stmt, member['name'], val, evaluate(fun, env)[1]['env'])
+	val = evaluate(stmt.right, env)
+	left_val = evaluate(stmt.left, env) if stmt.return_left else None
+	# TODO func ref
+	if stmt.left.kind == Kind.APPLY:
+		if stmt.left.operator.name == '[]':
+			xs, i = stmt.left.operands
+			set_index(evaluate(xs, env), evaluate(i, env), val)
+		else:
+			fun, member = stmt.left.operands
+			set_var_val(None, member.name, val, refer_env(evaluate(fun, env)))
 	else:
-		set_var_val(stmt, stmt['left']['name'], val, env)
-	return left_val if stmt['returnLeft'] else val
+		set_var_val(stmt.left, stmt.left.name, val, env)
+	return left_val if stmt.return_left else val
 
 def eval_if_stmt(stmt, env):
-	if evaluate(stmt['predicate'], env):
-		return evaluate(stmt['consequent'], extend_env(env, [], []))
-	elif stmt.get('alternative'):
-		return evaluate(stmt['alternative'], extend_env(env, [], []))
+	if evaluate(stmt.predicate, env):
+		return evaluate(stmt.consequent, extend_env(env, [], []))
+	elif stmt.alternative:
+		return evaluate(stmt.alternative, extend_env(env, [], []))
 
 def eval_switch_stmt(stmt, env):
-	found_case = False
-	for case in stmt['cases']:
-		if found_case:
-			break
-		result = None
-		if evaluate(stmt['variable'], env) in case['value']:
-			found_case = True
-			result = evaluate(case['stmt'], extend_env(env, [], []))
-		if is_tagged_value(result, 'return_value'):
-			return result
-		elif is_tagged_value(result, 'break_value'):
+	val = evaluate(stmt.variable, env)
+	falling = False
+	for case in stmt.cases:
+		if falling or val in case.value:
+			result = evaluate(case.stmt, extend_env(env, [], []))
+			if is_tagged_value(result, 'fallthrough_value'):
+				# run the next case whatever its value
+				falling = True
+				continue
+			if is_tagged_value(result, 'return_value') or is_tagged_value(result, 'continue_value'):
+				return result
 			return None
-		elif is_tagged_value(result, 'fallthrough_value'):
-			found_case = False
-	if not found_case and stmt['default']:
-		return evaluate(stmt['default'], extend_env(env, [], []))
+	if stmt.default:
+		return evaluate(stmt.default, extend_env(env, [], []))
 
 def eval_while_stmt(stmt, env):
-	if evaluate(stmt['predicate'], env):
-		result = evaluate(stmt['consequent'], extend_env(env, [], []))
+	predicate = stmt.predicate
+	consequent = stmt.consequent
+	governor = running.governor
+	while evaluate(predicate, env):
+		if governor is not None:
+			governor.step(stmt.line)
+		result = evaluate(consequent, extend_env(env, [], []))
 		if is_tagged_value(result, 'return_value'):
 			return result
 		if is_tagged_value(result, 'break_value'):
-			return None
-		return eval_while_stmt(stmt, env)
+			break
+	return None
 
 def eval_for_stmt(stmt, env):
-	for_range = stmt['range']
+	for_range = stmt.range
 	for_env = extend_env(env, [], [])
-	for_var = stmt['variable']
-	if is_tagged_value(for_range, 'range'):
+	for_var = stmt.variable
+	if isinstance(for_range, Node) and for_range.kind == Kind.RANGE:
 		# value range
-		range_from_val = evaluate(for_range['from'], env)
-		add_var_val(None, for_var['name'], range_from_val, for_env)
-		return eval_for_range(stmt, 
-			evaluate(for_range['to']),
-			range['closed'],
-			evaluate(stmt['increment'] or 1, env),
+		range_from_val = evaluate(for_range.start, env)
+		add_var_val(None, for_var.name, range_from_val, for_env)
+		return eval_for_range(stmt,
+			evaluate(for_range.end, env),
+			for_range.closed,
+			range_step(evaluate(1 if stmt.increment is None else stmt.increment, env)),
 			for_env)
-	elif is_tagged_value(for_range, 'variable') or is_tagged_value(for_range, 'application'):
-		range_val = evaluate(for_range, env)
-		add_var_val(stmt, for_var['name'], None, for_env)
-		if lst.is_lst(range_val):
-			return eval_for_lst(stmt, range_val, for_env)
-		else:
-			raise EvalExeption('Unsupported for range')
-	else:
-		raise EvalExeption('Unsupported for range')
+	items = for_items(evaluate(for_range, env))
+	add_var_val(stmt, for_var.name, None, for_env)
+	return eval_for_each(stmt, items, for_env)
 
 def eval_for_range(stmt, range_to_val, range_closed, increment, env):
-	var_val = evaluate(stmt['variable'], env)
-	if (increment > 0 and (
-			(not range_closed and var_val < range_to_val) or (range_closed and var_val <= range_to_val)
-		)) or (increment < 0 and (
-			(not range_closed and var_val > range_to_val) or (range_closed and var_val >= range_to_val)
-		)):
-		result = evaluate(stmt['consequent'], env)
+	var_name = stmt.variable.name
+	consequent = stmt.consequent
+	frame = env[1]
+	governor = running.governor
+	while True:
+		var_val = frame[var_name]
+		if not ((increment > 0 and (
+				(not range_closed and var_val < range_to_val) or (range_closed and var_val <= range_to_val)
+			)) or (increment < 0 and (
+				(not range_closed and var_val > range_to_val) or (range_closed and var_val >= range_to_val)
+			))):
+			return None
+		if governor is not None:
+			governor.step(stmt.line)
+		result = evaluate(consequent, env)
+		if is_tagged_value(result, 'return_value'):
+			return result
+		elif is_tagged_value(result, 'break_value'):
+			return None
+		frame[var_name] = var_val + increment
+
+def eval_for_each(stmt, items, env):
+	var_name = stmt.variable.name
+	consequent = stmt.consequent
+	frame = env[1]
+	governor = running.governor
+	for item in items:
+		if governor is not None:
+			governor.step(stmt.line)
+		frame[var_name] = item
+		result = evaluate(consequent, env)
 		if is_tagged_value(result, 'return_value'):
 			return result
 		elif is_tagged_value(result, 'break_value'):
 			return None
-		set_var_val(stmt, stmt['variable']['name'], var_val+increment, env)
-		return eval_for_range(stmt, range_to_val, range_closed, increment, env)
-
-def eval_for_lst(stmt, range_lst, env):
-	if (lst.is_empty(range_lst)):
-		return None
-	set_var_val(stmt, stmt['variable']['name'], lst.head(range_lst), env)
-	result = evaluate(stmt['consequent'], env)
-	if is_tagged_value(result, 'return_value'):
-		return result
-	elif is_tagged_value(result, 'break_value'):
-		return None
-	return eval_for_lst(stmt, lst.tail(range_lst), env)
+	return None
 
 def eval_return(stmt, env):
 	return {
 		'tag': 'return_value',
-		'content': evaluate(stmt['expression'], env),
+		'content': evaluate(stmt.expression, env),
 	}
 
 def eval_apply(fun, args, env):
@@ -284,16 +972,25 @@ def eval_apply(fun, args, env):
 		return apply_primitive_func(fun[1], args)
 	elif fun[0] == FunctionType.FUNCTION:
 		func = fun[1]
+		memo = func.get('memo')
+		if memo is not None:
+			key, value = memo.lookup(args)
+			if value is not MISSING:
+				return value
+		governor = running.governor
+		if governor is not None:
+			governor.step(func['line'])
 		func_env = extend_env(func['env'], func['parameters'], args)
 		result = evaluate(func['body'], func_env)
-		if is_tagged_value(result, 'return_value'):
-			return result['content']
-		return None
+		value = result['content'] if is_tagged_value(result, 'return_value') else None
+		if memo is not None and key is not None:
+			memo.store(key, args, value)
+		return value
 	else:
 		raise EvalExeption('Unknown application')
 
 def eval_logic(fun_raw, args, env):
-	fun_name = fun_raw['name']
+	fun_name = fun_raw.name
 	operand_1 = evaluate(args[0], env)
 	operand_2 = None
 	if (fun_name == '&&' and operand_1 == True) or (fun_name == '||' and operand_1 == False):
@@ -302,17 +999,32 @@ def eval_logic(fun_raw, args, env):
 	arg_list = [operand_1, operand_2]
 	return apply_primitive_func(fun[1], arg_list)
 
-def eval_refer(fun, member, env):
+def refer_env(fun):
+	if isinstance(fun, Instance):
+		return fun.env
 	if is_func_tuple(fun):
+		# a function used as a namespace runs its body once, on first access
 		func = fun[1]
-		func_env = extend_env(func['env'], [], [])
-		if func['body']:
-			evaluate(func['body'], func_env)
-		return loopup_var(None, member, func_env)
-	if lst.is_lst(fun) or lst.is_pair(fun):
-		return lst_method(fun, member)
+		if 'instance' not in func:
+			func_env = extend_env(func['env'], [], [])
+			if func['body']:
+				evaluate(func['body'], func_env)
+			func['instance'] = func_env
+		return func['instance']
 	raise EvalExeption('Unknown reference')
 
+def eval_refer(fun, member, env):
+	if isinstance(fun, Instance):
+		members = fun.env[1]
+		if member in members:
+			return members[member]
+		return loopup_var(None, member, fun.env)
+	if is_func_tuple(fun):
+		return loopup_var(None, member, refer_env(fun))
+	if isinstance(fun, lst.Cons):
+		return lst_method(fun, member)
+	return data_member(fun, member)
+
 ## DS
 def lst_method(xs, method):
 	if method == 'head':
@@ -321,88 +1033,331 @@ def lst_method(xs, method):
 		return lst.tail(xs)
 	elif method == 'isEmpty':
 		return lst.is_empty(xs)
+	elif method == 'length':
+		return lst.length(xs)
+	else:
+		raise EvalExeption('Unknown list method')
+
+def array_member(xs, member):
+	if member == 'length':
+		return len(xs)
+	elif member == 'isEmpty':
+		return not xs
+	elif member == 'push':
+		return (FunctionType.PRIMITIVE, xs.append)
+	elif member == 'pop':
+		return (FunctionType.PRIMITIVE, lambda: array_pop(xs))
+	else:
+		raise EvalExeption('Unknown array member')
+
+def view_member(xs, member):
+	if member == 'head':
+		return xs.head
+	elif member == 'tail':
+		return xs.tail
+	elif member == 'isEmpty':
+		return False
+	elif member == 'length':
+		return len(xs)
 	else:
 		raise EvalExeption('Unknown list method')
 
+def string_member(s, member):
+	if member == 'length':
+		return len(s)
+	elif member == 'isEmpty':
+		return not s
+	else:
+		raise EvalExeption('Unknown string member')
+
+def builder_member(b, member):
+	if member == 'add':
+		return (FunctionType.PRIMITIVE, b.add)
+	elif member == 'toString':
+		return (FunctionType.PRIMITIVE, lambda: builder_text(b))
+	elif member == 'length':
+		return b.length
+	elif member == 'clear':
+		return (FunctionType.PRIMITIVE, b.clear)
+	else:
+		raise EvalExeption('Unknown builder member')
+
+def range_member(r, member):
+	if member == 'length':
+		return len(r)
+	elif member == 'isEmpty':
+		return not any(True for _ in r)
+	else:
+		raise EvalExeption('Unknown range member')
+
+def file_view_member(v, member):
+	if member == 'length':
+		return len(v)
+	elif member == 'isEmpty':
+		return not len(v)
+	elif member == 'find':
+		return (FunctionType.PRIMITIVE, lambda s, start=0: view_find(v, s, start))
+	elif member == 'lines':
+		return files.Lines(v.lines, v.path)
+	elif member == 'close':
+		return (FunctionType.PRIMITIVE, v.close)
+	else:
+		raise EvalExeption('Unknown file view member')
+
+def data_member(obj, member):
+	# members of the values that aren't lists, instances or functions
+	t = type(obj)
+	if t is vec.Array:
+		return array_member(obj, member)
+	if t is str:
+		return string_member(obj, member)
+	if t is text.CharView:
+		return view_member(obj, member)
+	if t is text.StringBuilder:
+		return builder_member(obj, member)
+	if t is seq.Range:
+		return range_member(obj, member)
+	if t is files.FileView:
+		if member == 'close':
+			return file_view_member(obj, member)
+		return file_view_member(open_view(obj), member)
+	raise EvalExeption('Unknown reference')
+
+def array_pop(xs):
+	if not xs:
+		raise EvalExeption('Pop from an empty array')
+	return xs.pop()
+
 
 ## EVALUATE
 
 def evaluate(stmt, env):
-	if isinstance(stmt, dict):
-		#print('EVAL ' + str(stmt.get('tag')) + ' ' + str(stmt.get('name')))
-		#print(stmt.get('line'))
-		pass
 	if isinstance(stmt, list):
 		return eval_sequence(stmt, env)
-	elif is_self_evaluating(stmt):
-		return stmt
-	elif is_tagged_value(stmt, Tag.VAR):
+	elif not isinstance(stmt, Node):
+		if is_self_evaluating(stmt):
+			return stmt
+		raise EvalExeption('Unsupported statement')
+	kind = stmt.kind
+	if kind == Kind.VAR:
 		# variable
-		return loopup_var(stmt, stmt['name'], env)
-	elif is_tagged_value(stmt, Tag.VAR_DEF):
-		# variable definition
-		return eval_var_def(stmt, env)
-	elif is_tagged_value(stmt, Tag.FUNC_DEF):
-		# function definition
-		return eval_func_def(stmt, env)
-	elif is_tagged_value(stmt, Tag.ASSIGN):
+		return loopup_var(stmt, stmt.name, env)
+	elif kind == Kind.APPLY:
+		# application
+		site = stmt.cache
+		if site is None:
+			site = stmt.cache = bind_operator(stmt)
+		if site and running.inline_caches:
+			operands = stmt.operands
+			if len(operands) == 1:
+				return site.fun(evaluate(operands[0], env))
+			x = evaluate(operands[0], env)
+			y = evaluate(operands[1], env)
+			if site.guarded and (type(x) is not site.left or type(y) is not site.right):
+				return site.miss(stmt, x, y)
+			return site.fun(x, y)
+		operator = stmt.operator
+		operands = stmt.operands
+		name = operator.name if operator.kind == Kind.VAR else None
+		if name == '&&' or name == '||':
+			return eval_logic(operator, operands, env)
+		elif name == '.':
+			# reference
+			fun, member = operands
+			if member.kind == Kind.APPLY:
+				member_func_name = member.operator.name
+				return eval_apply(eval_refer(evaluate(fun, env), member_func_name, env), list_of_values(member.operands, env), env)
+			else:
+				return eval_refer(evaluate(fun, env), member.name, env)
+		return eval_apply(evaluate(operator, env), list_of_values(operands, env), env)
+	elif kind == Kind.ASSIGN:
 		# assignment
 		return eval_assign(stmt, env)
-	elif is_tagged_value(stmt, Tag.IF):
+	elif kind == Kind.VAR_DEF:
+		# variable definition
+		return eval_var_def(stmt, env)
+	elif kind == Kind.IF:
 		# if
 		return eval_if_stmt(stmt, env)
-	elif is_tagged_value(stmt, Tag.SWITCH):
-		# switch
-		return eval_switch_stmt(stmt, env)
-	elif is_tagged_value(stmt, Tag.WHILE):
+	elif kind == Kind.RETURN:
+		# return
+		return eval_return(stmt, env)
+	elif kind == Kind.FUNC_DEF:
+		# function definition
+		return eval_func_def(stmt, env)
+	elif kind == Kind.WHILE:
 		# while
 		return eval_while_stmt(stmt, env)
-	elif is_tagged_value(stmt, Tag.FOR):
+	elif kind == Kind.FOR:
 		# for
 		return eval_for_stmt(stmt, env)
-	elif is_tagged_value(stmt, Tag.APPLY):
-		# application
-		operator = stmt['operator']
-		operands = stmt['operands']
-		if operator['name'] == '&&' or operator['name'] == '||':
-			return eval_logic(operator, operands, env)
-		elif operator['name'] == '.':
-			# reference
-			fun, member = operands
-			if is_tagged_value(member, Tag.APPLY):
-				member_func_name = member['operator']['name']
-				return eval_apply(eval_refer(evaluate(fun, env), member_func_name, env), list_of_values(member['operands'], env), env)
-			else:
-				return eval_refer(evaluate(fun, env), member['name'], env)
-		return eval_apply(evaluate(operator, env), list_of_values(operands, env), env)
-	elif is_tagged_value(stmt, Tag.BREAK):
+	elif kind == Kind.SWITCH:
+		# switch
+		return eval_switch_stmt(stmt, env)
+	elif kind == Kind.BREAK:
 		# break
 		return {'tag': 'break_value'}
-	elif is_tagged_value(stmt, Tag.CONTINUE):
+	elif kind == Kind.CONTINUE:
 		# continue
 		return {'tag': 'continue_value'}
-	elif is_tagged_value(stmt, Tag.FALLTHROUGH):
+	elif kind == Kind.FALLTHROUGH:
 		# fallthrough
 		return {'tag': 'fallthrough_value'}
-	elif is_tagged_value(stmt, Tag.RETURN):
-		# return
-		return eval_return(stmt, env)
 	else:
 		raise EvalExeption('Unsupported statement')
 
-def main(ast_str):
+ENGINES = ('tree', 'closure', 'cek', 'vm')
+
+def run_ast(ast, env, engine='tree'):
+	with printing(current_output()), caching(env[1]):
+		return run_engine(ast, env, engine)
+
+def run_engine(ast, env, engine):
+	if engine == 'closure':
+		import compiler
+		return compiler.execute(compiler.compile_program(ast, env_names(env)), env)
+	elif engine == 'cek':
+		import cek
+		return cek.execute(ast, env)
+	elif engine == 'vm':
+		import bytecode, vm
+		return vm.execute(bytecode.compile_program(ast, env_names(env)), env)
+	return evaluate(ast, env)
+
+def read_ast(ast_str, cache=None, optimize=False):
+	# ast_str is JSON text or a binast.AstFile
+	if optimize:
+		import optimizer
+		build = lambda: optimizer.optimize(read_ast(ast_str, cache))
+		kind = 'ast-O'
+	elif isinstance(ast_str, binast.AstFile):
+		return ast_str.program()
+	else:
+		build = lambda: from_json(json.loads(ast_str))
+		kind = 'ast'
+	if cache is None:
+		return build()
+	if isinstance(ast_str, binast.AstFile):
+		return cache.load(ast_str.data, kind, build)
+	return cache.load(ast_str, kind, build)
+
+def load_ast(ast_str, cache=None, optimize=False, memo=False):
+	# the AST with its memo functions checked, memo also memoizes the pure
+	# recursive ones, see purity.py
+	import purity
+	ast = read_ast(ast_str, cache, optimize)
+	purity.memoize(ast, memo)
+	return ast
+
+def load_program(ast_str, env, cache=None, optimize=False, memo=False):
+	# bytecode for the vm; cached whole since a compiled Program pickles,
+	# unlike the closures of the closure engine
+	import bytecode
+	build = lambda: bytecode.compile_program(load_ast(ast_str, cache, optimize, memo), env_names(env))
+	if cache is None:
+		return build()
+	kind = 'vm' + ('-O' if optimize else '') + ('-M' if memo else '')
+	if isinstance(ast_str, binast.AstFile):
+		return cache.load(ast_str.data, kind, build)
+	return cache.load(ast_str, kind, build)
+
+def main(ast_str, engine='tree', dis=False, cache=None, optimize=False, dump_optimized=False, profiler=None, governor=None, memo=False,
+		sink=None):
 	try:
-		ast = json.loads(ast_str)
-		evaluate(ast, init_env())
+		if dump_optimized:
+			print(json.dumps(to_json(load_ast(ast_str, cache, True, memo)), indent=2))
+			return
+		if dis:
+			import bytecode
+			print(bytecode.disassemble(load_program(ast_str, init_env(), cache, optimize, memo).code))
+			return
+		env = init_env()
+		if engine == 'vm':
+			import vm
+			program = load_program(ast_str, env, cache, optimize, memo)
+			run = lambda: vm.execute(program, env)
+		else:
+			ast = load_ast(ast_str, cache, optimize, memo)
+			run = lambda: run_ast(ast, env, engine)
+		if governor is not None:
+			governor.start()
+		try:
+			with printing(sink or current_output()):
+				if profiler is not None:
+					with profiler:
+						run()
+				else:
+					run()
+		finally:
+			if governor is not None:
+				governor.stop()
 	except EvalExeption as e:
 		print('[ERROR]' + str(e))
 	except KeyboardInterrupt:
 		print('\nInterrupted')
 
 if __name__ == '__main__':
-	file_name = 'ast.json'
-	if len(sys.argv) > 1:
-		file_name = sys.argv[1]
-	with open(file_name) as f:
-		source = f.read()
-		main(source)
+	import argparse
+	arg_parser = argparse.ArgumentParser(description='Evaluate a YJLO Script AST, JSON or binary (see binast.py).')
+	arg_parser.add_argument('file', nargs='?', default='ast.json')
+	arg_parser.add_argument('--engine', choices=ENGINES, default='tree')
+	arg_parser.add_argument('--dis', action='store_true', help='print the bytecode instead of running')
+	arg_parser.add_argument('-O', '--optimize', action='store_true', help='fold constants and drop dead branches first')
+	arg_parser.add_argument('--dump-optimized', action='store_true', help='print the optimized AST as JSON instead of running')
+	arg_parser.add_argument('--memo', action='store_true', help='also memoize the recursive functions proven pure')
+	arg_parser.add_argument('--profile', action='store_true', help='time functions and lines (tree engine), report on stderr')
+	arg_parser.add_argument('--profile-top', type=int, default=10, metavar='N', help='rows per profile table')
+	arg_parser.add_argument('--profile-out', metavar='FILE', help='write collapsed stacks for flamegraph tools')
+	arg_parser.add_argument('--max-steps', type=int, help='stop after this many loop iterations and calls')
+	arg_parser.add_argument('--max-memory', type=float, metavar='MIB', help='stop when the run has added this much memory, in MiB')
+	arg_parser.add_argument('--timeout', type=float, help='stop after this many seconds')
+	arg_parser.add_argument('--cache-dir', help='cache, in this directory (default: $YJLO_CACHE_DIR or ~/.cache/yjlo-script)')
+	arg_parser.add_argument('--cache', action='store_true', help='keep the parsed program on disk for the next run')
+	arg_parser.add_argument('--no-cache', action='store_true', help='always parse the AST file, also with $YJLO_CACHE_DIR set')
+	arg_parser.add_argument('--output', metavar='FILE', help='print to this file instead of stdout')
+	arg_parser.add_argument('--buffer-size', type=int, metavar='BYTES', help='print output held before it is written (default: 8192)')
+	arg_parser.add_argument('--flush', choices=output.FLUSH_POLICIES,
+		help='write the output when the buffer is full, or after every print (default: full, line on a terminal)')
+	args = arg_parser.parse_args()
+	if (args.profile or args.profile_out) and args.engine != 'tree':
+		arg_parser.error('the profiler runs on the tree engine')
+	# go through the importable module so every engine raises the same EvalExeption
+	import evaluator
+	with open(args.file, 'rb') as f:
+		binary = binast.is_binary(f.read(len(binast.MAGIC)))
+	if binary:
+		source = binast.open_file(args.file)
+	else:
+		with open(args.file) as f:
+			source = f.read()
+	program_cache = None
+	# caching is opt-in, entries are unpickled
+	import cache
+	if not args.no_cache and (args.cache or args.cache_dir or cache.requested()):
+		program_cache = cache.ProgramCache(args.cache_dir)
+	governor = None
+	if args.max_steps is not None or args.max_memory is not None or args.timeout is not None:
+		governor = evaluator.Governor(args.max_steps,
+			None if args.max_memory is None else int(args.max_memory * (1 << 20)), args.timeout)
+	profiler = None
+	if args.profile or args.profile_out:
+		from profiler import Profiler
+		profiler = Profiler()
+	sink = None
+	if args.output or args.buffer_size is not None or args.flush:
+		flush = args.flush or ('line' if not args.output and sys.stdout.isatty() else 'full')
+		writer = output.FileWriter(args.output) if args.output else output.StdoutWriter()
+		sink = output.Sink(writer, output.BUFFER_SIZE if args.buffer_size is None else args.buffer_size, flush)
+	try:
+		evaluator.main(source, args.engine, args.dis, program_cache, args.optimize, args.dump_optimized, profiler, governor, args.memo,
+			sink)
+	finally:
+		if sink is not None:
+			sink.close()
+		# also when the script dies, that's often why it is profiled
+		if profiler is not None:
+			if args.profile:
+				profiler.report(args.profile_top, sys.stderr)
+			if args.profile_out:
+				with open(args.profile_out, 'w') as f:
+					profiler.write_collapsed(f)
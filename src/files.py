@@ -0,0 +1,105 @@
+import mmap
+import os
+
+# Input in bulk. read(path) and read() take a whole file or all of stdin as
+# one string; lines(path) and lines() are Lines, which `for` and the bulk
+# primitives walk one line at a time without holding more than the line, so
+# a script streams through a file of any size in constant memory. Every
+# iteration of the lines of a file reads it afresh, those of stdin go on
+# where the last one stopped.
+#
+# A FileView is a file mapped into memory with mmap: the pages are read by
+# the operating system as they are touched and never copied as a whole. v[i]
+# is the byte at offset i, as a number, and v[start:end] the text of the
+# bytes in between; its elements are its bytes and v.lines its lines. A view
+# holds the file open until it is closed or goes away.
+
+CHUNK = 1 << 16
+
+def strip_newline(line):
+	return line[:-1] if line.endswith('\n') else line
+
+class Lines(object):
+	__slots__ = ('source', 'name')
+
+	def __init__(self, source, name):
+		# source() is called where an iteration begins and returns the
+		# lines, each with its newline, if it has one
+		self.source = source
+		self.name = name
+
+	def __iter__(self):
+		for line in self.source():
+			yield strip_newline(line)
+
+	def __repr__(self):
+		return '<lines of {0}>'.format(self.name)
+
+def file_lines(path):
+	def source():
+		with open(path, encoding='utf-8') as f:
+			yield from f
+	return Lines(source, path)
+
+def stream_lines(stream, name='stdin'):
+	return Lines(lambda: stream, name)
+
+class FileView(object):
+	__slots__ = ('path', 'data', 'size')
+
+	def __init__(self, path):
+		with open(path, 'rb') as f:
+			self.size = os.fstat(f.fileno()).st_size
+			# an empty file cannot be mapped, and needs no mapping
+			self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+		self.path = path
+
+	@property
+	def closed(self):
+		return self.data is None
+
+	def mapped(self):
+		if self.data is None:
+			raise ValueError('I/O operation on a closed file view')
+		return self.data
+
+	def byte(self, i):
+		return self.mapped()[i]
+
+	def text(self, start=None, end=None):
+		return self.mapped()[start:end].decode('utf-8', 'replace')
+
+	def find(self, s, start=0):
+		# the offset of the first s at or after start, -1 if there is none
+		return self.mapped().find(s.encode('utf-8'), start)
+
+	def lines(self):
+		# as a file's lines, the newline and a \r before it dropped
+		data, pos, size = self.mapped(), 0, self.size
+		while pos < size:
+			end = data.find(b'\n', pos)
+			if end < 0:
+				end = size
+			line = data[pos:end]
+			pos = end + 1
+			if line.endswith(b'\r'):
+				line = line[:-1]
+			yield line.decode('utf-8', 'replace')
+
+	def close(self):
+		if self.data is not None:
+			if self.size:
+				self.data.close()
+			self.data = None
+
+	def __len__(self):
+		return self.size
+
+	def __iter__(self):
+		# the bytes, a chunk copied at a time
+		data = self.mapped()
+		for pos in range(0, self.size, CHUNK):
+			yield from data[pos:pos + CHUNK]
+
+	def __repr__(self):
+		return '<file view of {0}, {1} bytes>'.format(self.path, self.size)
@@ -0,0 +1,170 @@
+import io
+from lexer import Lexer
+from parser import Parser
+from evaluator import (ENGINES, FrozenFrame, FunctionType, current_output, init_env, is_func_tuple, evaluate, memo_counting,
+	memo_stats, printing, reading, caching)
+from output import sink_for
+
+# Embedding API: compile a script once, run it many times.
+#
+#   interpreter = Interpreter(engine='vm')
+#   program = interpreter.compile(source)
+#   result = interpreter.run(program, globals={'limit': 10, 'log': log})
+#   result['total']
+#
+# The builtins live in one FrozenFrame shared by every run; each run layers
+# its own global frame on top, so runs don't see each other's variables. A
+# script can shadow a builtin with `var`; assigning to one fails on the tree
+# and cek engines and only changes the run's copy on closure and vm. A Program
+# holds no per-run state and may be run from several threads at once; a
+# Python callable passed in globals becomes a primitive function in the
+# run's copy of them, so one globals dict may serve many runs. The
+# profiler patches the evaluator module, so it is not for threaded use.
+#
+# An optimized program folds builtin operators into their values; a run
+# whose globals shadow one of them runs the program optimized again from
+# its source without folding those, so -O never changes what a run does.
+#
+# Memo functions (`memo func`, and with memo=True every pure recursive one)
+# get a new cache per run; memo_stats() has their counts, all runs of the
+# interpreter summed.
+#
+# print goes to stdout unless a run is given an output: an output.Sink, a
+# writer such as output.MemoryWriter(), or a function taking the text.
+#
+#   out = MemoryWriter()
+#   interpreter.run(program, output=out)
+#   out.getvalue()
+#
+# input, read() and lines() read stdin unless a run is given an input: an
+# open text file or a string, which is read as if it were one.
+#
+#   interpreter.run(program, input='70\n175\n')
+
+BUILTINS = FrozenFrame(init_env()[1])
+BUILTIN_ENV = ((), BUILTINS)
+
+def global_names(names):
+	# the names closure and vm code is compiled against: a run's globals,
+	# then the builtins they don't shadow
+	names = tuple(names)
+	return names + tuple(name for name in BUILTINS if name not in names)
+
+def parse(source, optimize=False, memo=False, shadowed=()):
+	# a Lexer and a Parser keep state while they run, so each call gets its own
+	import purity
+	ast = Parser().parse(list(Lexer().scan(source)))
+	if optimize:
+		import optimizer
+		ast = optimizer.optimize(ast, shadowed)
+	purity.memoize(ast, memo)
+	return ast
+
+class Program(object):
+	def __init__(self, ast, source=None, optimized=False, memo=False):
+		self.ast = ast or []
+		self.source = source
+		# the options the source was parsed with
+		self.optimized = optimized
+		self.memo = memo
+		# shadowed folded names -> the AST optimized without them
+		self._shadowed = {}
+		# (engine, global names) -> compiled code for closure and vm, these
+		# resolve names ahead of time so depend on the globals of a run
+		self._compiled = {}
+
+	def ast_for(self, globals):
+		# the AST for a run with these globals
+		if not self.optimized or self.source is None:
+			return self.ast
+		import optimizer
+		shadowed = optimizer.FOLDED_NAMES.intersection(globals)
+		if not shadowed:
+			return self.ast
+		ast = self._shadowed.get(shadowed)
+		if ast is None:
+			# two threads may both parse, either result will do
+			ast = parse(self.source, True, self.memo, shadowed)
+			self._shadowed[shadowed] = ast
+		return ast
+
+	def compiled(self, engine, globals):
+		names = global_names(globals)
+		key = (engine, names)
+		code = self._compiled.get(key)
+		if code is None:
+			# two threads may both compile, either result will do
+			if engine == 'closure':
+				import compiler
+				code = compiler.compile_program(self.ast_for(globals), list(names))
+			else:
+				import bytecode
+				code = bytecode.compile_program(self.ast_for(globals), list(names))
+			self._compiled[key] = code
+		return code
+
+class Interpreter(object):
+	def __init__(self, engine='tree', optimize=False, cache=None, memo=False):
+		if engine not in ENGINES:
+			raise ValueError('Unknown engine: ' + engine)
+		self.engine = engine
+		self.optimize = optimize
+		self.cache = cache
+		self.memo = memo
+		# (name, line) -> MemoStats of the memo functions its runs defined
+		self.memo_registry = {}
+
+	def parse(self, source):
+		return parse(source, self.optimize, self.memo)
+
+	def compile(self, source):
+		if self.cache is None:
+			ast = self.parse(source)
+		else:
+			kind = 'source' + ('-O' if self.optimize else '') + ('-M' if self.memo else '')
+			ast = self.cache.load(source, kind, lambda: self.parse(source))
+		return Program(ast, source, self.optimize, self.memo)
+
+	def memo_stats(self):
+		# {'name', 'line', 'size', 'hits', 'misses', 'evictions', 'skipped'}
+		# per memo function
+		return [dict((attr, getattr(stats, attr)) for attr in stats.__slots__) for stats in memo_stats(self.memo_registry)]
+
+	def run(self, program, globals=None, governor=None, output=None, input=None):
+		# runs in a copy of `globals` (an empty dict by default) and returns
+		# the copy with the variables the script defined at its top level,
+		# `globals` itself is left as it was; a Governor limits the run's
+		# steps, memory and time
+		if isinstance(program, str):
+			program = self.compile(program)
+		if governor is not None:
+			with governor:
+				return self.run(program, globals, None, output, input)
+		if input is not None:
+			with reading(io.StringIO(input) if isinstance(input, str) else input):
+				return self.run(program, globals, None, output)
+		with printing(current_output() if output is None else sink_for(output)), memo_counting(self.memo_registry):
+			return self._execute(program, globals)
+
+	def _execute(self, program, globals):
+		frame = {} if globals is None else dict(globals)
+		for name, value in frame.items():
+			if callable(value) and not is_func_tuple(value):
+				frame[name] = (FunctionType.PRIMITIVE, value)
+		env = (BUILTIN_ENV, frame)
+		engine = self.engine
+		if engine == 'tree':
+			with caching(frame):
+				evaluate(program.ast_for(frame), env)
+		elif engine == 'cek':
+			import cek
+			cek.execute(program.ast_for(frame), env)
+		else:
+			code = program.compiled(engine, frame)
+			if engine == 'closure':
+				import compiler
+				compiler.execute(code, env)
+			else:
+				import vm
+				vm.execute(code, env)
+		return frame
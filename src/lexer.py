@@ -1,3 +1,6 @@
+import codecs
+import mmap
+import re
 from enum import Enum
 
 class TokenType(Enum):
@@ -9,6 +12,8 @@ class TokenType(Enum):
 	OPERATOR = 'operator'
 
 class Token(object):
+	__slots__ = ('type', 'value', 'line')
+
 	def __init__(self, t, value=None, line=-1):
 		self.type = t
 		self.value = value
@@ -43,6 +48,8 @@ class Lexer(object):
 		'.': ['.', '..', '.<', '.>'],
 	}
 
+	CHUNK_SIZE = 1 << 16
+
 	def __init__(self):
 		self.tokens = []
 		self.line = 1
@@ -128,6 +135,7 @@ class Lexer(object):
 				self.advance()
 				if self.c in self.ESC_CHAR:
 					string += self.ESC_CHAR[self.c]
+					continue
 			string += self.c
 		self.add(TokenType.STRING, string)
 
@@ -152,12 +160,10 @@ class Lexer(object):
 					self.advance()
 					break
 		# single line comment
+		# the line break is left for tokenize() to turn into a NEWLINE
 		elif self.c == '/':
-			while self.has_next():
+			while self.has_next() and self.next not in '\r\n':
 				self.advance()
-				if self.c == '\n' or self.c == '\r' or not self.has_next():
-					self.line += 1
-					break
 		else:
 			# should never reach here
 			raise Exception('[Lexer] Lexing error')
@@ -170,6 +176,109 @@ class Lexer(object):
 	def _is_letter(char):
 		return (char >= 'a' and char <= 'z') or (char >= 'A' and char <= 'Z')
 
+	''' Master pattern '''
+
+	@staticmethod
+	def _operator_pattern(operators):
+		# every operator make_operator() can build: a prefix followed by a
+		# suffix whose own prefixes are all candidates too, longest first
+		ops = set()
+		for prefix, suffixes in operators.items():
+			ops.add(prefix)
+			for suffix in suffixes:
+				if all(suffix[:k] in suffixes for k in range(1, len(suffix))):
+					ops.add(prefix + suffix)
+		return '|'.join(re.escape(op) for op in sorted(ops, key=len, reverse=True))
+
+	def scan(self, source):
+		# generator over a source string, see _scan()
+		return self._scan([source])
+
+	def stream(self, f, chunk_size=None):
+		# generator over a file object or mmap, read chunk_size at a time;
+		# binary chunks are decoded as UTF-8
+		return self._scan(self._read_chunks(f, chunk_size or self.CHUNK_SIZE))
+
+	@staticmethod
+	def _read_chunks(f, chunk_size):
+		decoder = None
+		while True:
+			chunk = f.read(chunk_size)
+			if isinstance(chunk, bytes):
+				if decoder is None:
+					decoder = codecs.getincrementaldecoder('utf-8')()
+				text = decoder.decode(chunk, not chunk)
+			else:
+				text = chunk
+			if text:
+				yield text
+			if not chunk:
+				return
+
+	def _scan(self, chunks):
+		# Slices lexemes out of the source with MASTER instead of stepping
+		# through it a character at a time. A lexeme ending within two
+		# characters of the end of the buffer may continue in the next chunk
+		# (a number needs to see '.' and a digit), so it is rescanned once
+		# more input has arrived; only the unconsumed tail is kept.
+		match = self.MASTER.match
+		last = None
+		buf = ''
+		chunks = iter(chunks)
+		eof = False
+		while not eof:
+			chunk = next(chunks, None)
+			if chunk is None:
+				eof = True
+			else:
+				buf += chunk
+			pos = 0
+			n = len(buf)
+			while pos < n:
+				m = match(buf, pos)
+				kind = m.lastgroup
+				end = m.end()
+				if not eof and (end >= n - 1 or kind == 'quote'):
+					break
+				pos = end
+				if kind == 'space':
+					continue
+				elif kind == 'newline':
+					# keep only one new-line as a token
+					if last is not None and last is not TokenType.NEWLINE:
+						last = TokenType.NEWLINE
+						yield Token(last, None, self.line)
+					self.line += end - m.start()
+					continue
+				elif kind == 'comment':
+					self.line += m.group().count('\n')
+					continue
+				elif kind == 'name':
+					token = Token(TokenType.NAME, m.group(), self.line)
+				elif kind == 'number':
+					num = m.group().replace('_', '')
+					token = Token(TokenType.NUMBER, float(num) if '.' in num else int(num), self.line)
+				elif kind == 'string':
+					lexeme = m.group()
+					string = lexeme[1:-1]
+					if '\\' in string:
+						string = self.ESCAPE.sub(self._unescape, string)
+					token = Token(TokenType.STRING, string, self.line)
+					self.line += lexeme.count('\n')
+				elif kind == 'quote':
+					raise Exception('[Lexer] Unterminated string.')
+				else:
+					token = Token(TokenType.OPERATOR, m.group(), self.line)
+				last = token.type
+				yield token
+			buf = buf[pos:]
+		yield Token(TokenType.EOF, None, self.line)
+
+	@classmethod
+	def _unescape(cls, m):
+		c = m.group(1)
+		return cls.ESC_CHAR.get(c, c)
+
 	def tokenize(self, source):
 		self.init_source(source)
 		self.advance()
@@ -182,6 +291,8 @@ class Lexer(object):
 				while self.c == '\n':
 					self.line += 1
 					self.advance()
+				if self.c is None:
+					break
 			# ignore spaces
 			if self.c <= ' ':
 				self.advance()
@@ -209,6 +320,37 @@ class Lexer(object):
 		self.add(TokenType.EOF, None)
 		return self.tokens
 
+Lexer.MASTER = re.compile(r'''
+	(?P<newline>\n+)
+	|(?P<space>[\x00-\x09\x0b-\x20]+)
+	|(?P<comment>//[^\r\n]*|/\*[\s\S]*?(?:\*/|\Z))
+	|(?P<name>[A-Za-z_$@][A-Za-z0-9_]*)
+	|(?P<number>[0-9][0-9_]*(?:\.[0-9][0-9_]*)?)
+	|(?P<string>
+		'(?:[^'\\\x00-\x08\x0a-\x1f]|\\[\s\S])*'
+		|"(?:[^"\\\x00-\x08\x0a-\x1f]|\\[\s\S])*"
+		|`(?:[^`\\]|\\[\s\S])*`)
+	|(?P<quote>['"`])
+	|(?P<operator>''' + Lexer._operator_pattern(Lexer.OPERATORS) + r''')
+	|(?P<char>[\s\S])
+''', re.VERBOSE)
+Lexer.ESCAPE = re.compile(r'\\([\s\S])')
+
+def tokenize_file(path):
+	# lazily tokenizes a file through a read-only memory map
+	with open(path, 'rb') as f:
+		try:
+			source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		except ValueError:
+			# empty files can't be mapped
+			source = None
+		try:
+			for token in Lexer().stream(source or f):
+				yield token
+		finally:
+			if source is not None:
+				source.close()
+
 def main():
 	lexer = Lexer()
 	tokens = lexer.tokenize(
@@ -1,37 +1,115 @@
+# the types of values that can't change, other modules add theirs
+IMMUTABLE = {int, float, str, bool, type(None)}
+
+def is_frozen(value):
+	t = type(value)
+	if t is Cons:
+		return value.frozen
+	return t in IMMUTABLE
+
+class Cons(object):
+	# a cell caches the number of cells in its chain, whether the chain
+	# ends in the empty list and whether nothing in it can change, so
+	# is_lst, length and memo keys are O(1)
+	__slots__ = ('head', 'tail', 'length', 'proper', 'frozen')
+
+	def __init__(self, head, tail):
+		self.head = head
+		self.tail = tail
+		if type(tail) is Cons:
+			self.length = tail.length + 1
+			self.proper = tail.proper
+			self.frozen = tail.frozen and is_frozen(head)
+		else:
+			self.length = 1
+			self.proper = False
+			self.frozen = type(tail) in IMMUTABLE and is_frozen(head)
+
+	def __len__(self):
+		return self.length
+
+	def __iter__(self):
+		return iterate(self)
+
+	def __eq__(self, other):
+		if type(other) is not Cons:
+			return NotImplemented
+		xs, ys = self, other
+		while type(xs) is Cons and type(ys) is Cons:
+			if xs is ys:
+				return True
+			if xs is EMPTY or ys is EMPTY or xs.head != ys.head:
+				return False
+			xs, ys = xs.tail, ys.tail
+		# the chains end in a value other than a cell, equal or not, or
+		# one of them ends where the other goes on
+		if type(xs) is Cons or type(ys) is Cons:
+			return False
+		return xs == ys
+
+	def __ne__(self, other):
+		return not self == other
+
+	__hash__ = None
+
+	def __repr__(self):
+		if self.proper:
+			return repr(lst2arr(self))
+		# a pair chain prints nested, e.g. [1, [2, 3]]
+		items = []
+		xs = self
+		while type(xs) is Cons:
+			items.append(repr(xs.head))
+			xs = xs.tail
+		text = repr(xs)
+		for item in reversed(items):
+			text = '[' + item + ', ' + text + ']'
+		return text
+
+EMPTY = Cons.__new__(Cons)
+EMPTY.head = None
+EMPTY.tail = None
+EMPTY.length = 0
+EMPTY.proper = True
+EMPTY.frozen = True
+
 def lst(*args):
-	lst = []
-	for arg in reversed(args):
-		lst = [arg, lst]
-	return lst
+	return from_sequence(args)
+
+def from_sequence(seq):
+	xs = EMPTY
+	for arg in reversed(seq):
+		xs = Cons(arg, xs)
+	return xs
+
+def iterate(xs):
+	while xs is not EMPTY and type(xs) is Cons:
+		yield xs.head
+		xs = xs.tail
 
 def lst2arr(xs):
-	result = []
-	while not is_empty(xs):
-		result.append(head(xs))
-		xs = tail(xs)
-	return result
+	return list(iterate(xs))
+
+def length(xs):
+	return xs.length
 
 def is_empty(xs):
-	return xs == []
+	return xs is EMPTY
 
 def head(xs):
-	return xs[0]
+	return xs.head
 
 def tail(xs):
-	return xs[1]
+	return xs.tail
 
 def is_lst(xs):
-	if xs == []:
-		return True
-	elif is_pair(xs):
-		return is_lst(tail(xs))
-	return False
+	return type(xs) is Cons and xs.proper
 
 def pair(x, xs):
-	return [x, xs]
+	return Cons(x, xs)
 
 def is_pair(xs):
-	return isinstance(xs, list) and len(xs) == 2
+	return type(xs) is Cons and xs is not EMPTY
 
 if __name__ == "__main__":
 	pass
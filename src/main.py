@@ -1,15 +1,18 @@
-from lexer import Lexer
-from parser import Parser
-from evaluator import init_env, evaluate, EvalExeption
+import cache
+from evaluator import EvalExeption
+from interpreter import Interpreter
+
+source = 'print(9+2.2*2)'
 
 try:
-	lexer = Lexer()
-	tokens = lexer.tokenize('print(9+2.2*2)')
-	parser = Parser()
-	ast = parser.parse(tokens)
-	#print('==== AST ====\n%s' % ast)
-	result = evaluate(ast, init_env())
-	#print('==== RESULT ====\n%s' % result)
+	# with $YJLO_CACHE_DIR set, a warm start loads the optimized program and
+	# skips lexing and parsing
+	program_cache = cache.ProgramCache() if cache.requested() else None
+	interpreter = Interpreter(optimize=True, cache=program_cache)
+	program = interpreter.compile(source)
+	#print('==== AST ====\n%s' % program.ast)
+	result = interpreter.run(program)
+	#print('==== GLOBALS ====\n%s' % result)
 except EvalExeption as e:
 	print('[ERROR]' + str(e))
 except KeyboardInterrupt:
@@ -0,0 +1,278 @@
+import sys
+from sys import intern
+
+# Compact AST. Every node is a slotted object with an integer kind, and
+# identifier names are interned, so a dispatch is an int compare and a name
+# lookup hashes a string once. Constants stay plain Python values and a
+# statement sequence stays a list, as in the JSON format (example/*.json);
+# from_json() and to_json() convert between the two without loss.
+
+class Kind:
+	VAR = 1
+	VAR_DEF = 2
+	FUNC_DEF = 3
+	ASSIGN = 4
+	APPLY = 5
+	IF = 6
+	WHILE = 7
+	SWITCH = 8
+	CASE = 9
+	FOR = 10
+	RANGE = 11
+	BREAK = 12
+	CONTINUE = 13
+	FALLTHROUGH = 14
+	RETURN = 15
+
+class Node(object):
+	__slots__ = ('line',)
+	kind = None
+	tag = None
+	# (JSON key, attribute) pairs
+	FIELDS = ()
+
+	def __eq__(self, other):
+		return type(self) is type(other) and all(
+			getattr(self, attr) == getattr(other, attr) for _, attr in self.FIELDS)
+
+	def __ne__(self, other):
+		return not self == other
+
+	__hash__ = None
+
+	def __repr__(self):
+		return '{0}({1})'.format(type(self).__name__, ', '.join(
+			'{0}={1!r}'.format(attr, getattr(self, attr)) for _, attr in self.FIELDS))
+
+class Variable(Node):
+	__slots__ = ('name', 'type')
+	kind = Kind.VAR
+	tag = 'variable'
+	FIELDS = (('name', 'name'), ('type', 'type'), ('line', 'line'))
+
+	def __init__(self, name, type='variable', line=None):
+		self.name = intern(name)
+		self.type = type
+		self.line = line
+
+class VarDef(Node):
+	__slots__ = ('left', 'right')
+	kind = Kind.VAR_DEF
+	tag = 'var_definition'
+	FIELDS = (('left', 'left'), ('right', 'right'), ('line', 'line'))
+
+	def __init__(self, left, right, line=None):
+		self.left = intern(left)
+		self.right = right
+		self.line = line
+
+class FuncDef(Node):
+	# memo is None, True for a memoized function with the default cache
+	# size, or the size
+	__slots__ = ('name', 'parameters', 'body', 'is_class', 'parent', 'memo')
+	kind = Kind.FUNC_DEF
+	tag = 'function_definition'
+	FIELDS = (
+		('name', 'name'), ('parameters', 'parameters'), ('body', 'body'),
+		('is_class', 'is_class'), ('parent', 'parent'), ('memo', 'memo'), ('line', 'line'),
+	)
+
+	def __init__(self, name, parameters, body, is_class=False, parent=None, memo=None, line=None):
+		self.name = intern(name)
+		self.parameters = tuple(intern(p) for p in parameters)
+		self.body = body
+		self.is_class = is_class
+		self.parent = parent
+		self.memo = memo
+		self.line = line
+
+class Assign(Node):
+	__slots__ = ('left', 'right', 'return_left')
+	kind = Kind.ASSIGN
+	tag = 'assignment'
+	FIELDS = (('left', 'left'), ('right', 'right'), ('returnLeft', 'return_left'), ('line', 'line'))
+
+	def __init__(self, left, right, return_left=False, line=None):
+		self.left = left
+		self.right = right
+		self.return_left = return_left
+		self.line = line
+
+class Apply(Node):
+	# cache is the tree walker's inline cache, see evaluator.bind_operator
+	__slots__ = ('operator', 'operands', 'cache')
+	kind = Kind.APPLY
+	tag = 'application'
+	FIELDS = (('operator', 'operator'), ('operands', 'operands'), ('line', 'line'))
+
+	def __init__(self, operator, operands, line=None):
+		self.operator = operator
+		self.operands = operands
+		self.line = line
+		self.cache = None
+
+	def __getstate__(self):
+		# pickled without the cache, it is rebuilt on the next run
+		return None, {'operator': self.operator, 'operands': self.operands, 'line': self.line, 'cache': None}
+
+class If(Node):
+	__slots__ = ('predicate', 'consequent', 'alternative')
+	kind = Kind.IF
+	tag = 'if'
+	FIELDS = (('predicate', 'predicate'), ('consequent', 'consequent'), ('alternative', 'alternative'), ('line', 'line'))
+
+	def __init__(self, predicate, consequent, alternative=None, line=None):
+		self.predicate = predicate
+		self.consequent = consequent
+		self.alternative = alternative
+		self.line = line
+
+class While(Node):
+	__slots__ = ('predicate', 'consequent')
+	kind = Kind.WHILE
+	tag = 'while'
+	FIELDS = (('predicate', 'predicate'), ('consequent', 'consequent'), ('line', 'line'))
+
+	def __init__(self, predicate, consequent, line=None):
+		self.predicate = predicate
+		self.consequent = consequent
+		self.line = line
+
+class Switch(Node):
+	__slots__ = ('variable', 'cases', 'default')
+	kind = Kind.SWITCH
+	tag = 'switch'
+	FIELDS = (('variable', 'variable'), ('cases', 'cases'), ('default', 'default'), ('line', 'line'))
+
+	def __init__(self, variable, cases, default=None, line=None):
+		self.variable = variable
+		self.cases = cases
+		self.default = default
+		self.line = line
+
+class Case(Node):
+	__slots__ = ('value', 'stmt')
+	kind = Kind.CASE
+	tag = 'case'
+	FIELDS = (('value', 'value'), ('stmt', 'stmt'), ('line', 'line'))
+
+	def __init__(self, value, stmt, line=None):
+		self.value = tuple(value)
+		self.stmt = stmt
+		self.line = line
+
+class For(Node):
+	__slots__ = ('variable', 'range', 'increment', 'consequent')
+	kind = Kind.FOR
+	tag = 'for'
+	FIELDS = (
+		('variable', 'variable'), ('range', 'range'), ('increment', 'increment'),
+		('consequent', 'consequent'), ('line', 'line'),
+	)
+
+	def __init__(self, variable, range, increment, consequent, line=None):
+		self.variable = variable
+		self.range = range
+		self.increment = increment
+		self.consequent = consequent
+		self.line = line
+
+class Range(Node):
+	__slots__ = ('start', 'end', 'closed')
+	kind = Kind.RANGE
+	tag = 'range'
+	FIELDS = (('from', 'start'), ('to', 'end'), ('closed', 'closed'), ('line', 'line'))
+
+	def __init__(self, start, end, closed=None, line=None):
+		self.start = start
+		self.end = end
+		self.closed = closed
+		self.line = line
+
+class Break(Node):
+	__slots__ = ()
+	kind = Kind.BREAK
+	tag = 'break'
+	FIELDS = (('line', 'line'),)
+
+	def __init__(self, line=None):
+		self.line = line
+
+class Continue(Node):
+	__slots__ = ()
+	kind = Kind.CONTINUE
+	tag = 'continue'
+	FIELDS = (('line', 'line'),)
+
+	def __init__(self, line=None):
+		self.line = line
+
+class Fallthrough(Node):
+	__slots__ = ()
+	kind = Kind.FALLTHROUGH
+	tag = 'fallthrough'
+	FIELDS = (('line', 'line'),)
+
+	def __init__(self, line=None):
+		self.line = line
+
+class Return(Node):
+	__slots__ = ('expression',)
+	kind = Kind.RETURN
+	tag = 'return'
+	FIELDS = (('expression', 'expression'), ('line', 'line'))
+
+	def __init__(self, expression, line=None):
+		self.expression = expression
+		self.line = line
+
+NODE_CLASSES = {cls.tag: cls for cls in (
+	Variable, VarDef, FuncDef, Assign, Apply, If, While, Switch, Case,
+	For, Range, Break, Continue, Fallthrough, Return,
+)}
+
+# keys some producers leave out; a None value is written back as absent
+OPTIONAL = ('line', 'closed', 'memo')
+
+## CONVERTERS
+
+def from_json(obj):
+	if isinstance(obj, dict):
+		cls = NODE_CLASSES.get(obj.get('tag'))
+		if cls is None:
+			raise ValueError('Unknown AST tag: ' + str(obj.get('tag')))
+		# constructor parameters are named after the attributes
+		fields = {}
+		for key, attr in cls.FIELDS:
+			if key in obj:
+				fields[attr] = from_json(obj[key])
+			elif key not in OPTIONAL:
+				raise ValueError('Missing AST field: ' + obj['tag'] + '.' + key)
+		if len(obj) > len(fields) + 1:
+			known = set(key for key, _ in cls.FIELDS)
+			raise ValueError('Unknown AST field: ' + obj['tag'] + '.' + ', '.join(
+				key for key in obj if key != 'tag' and key not in known))
+		return cls(**fields)
+	elif isinstance(obj, list):
+		return [from_json(item) for item in obj]
+	return obj
+
+def to_json(node):
+	if isinstance(node, Node):
+		obj = {'tag': node.tag}
+		for key, attr in node.FIELDS:
+			value = getattr(node, attr)
+			if value is None and key in OPTIONAL:
+				continue
+			obj[key] = to_json(value)
+		return obj
+	elif isinstance(node, (list, tuple)):
+		return [to_json(item) for item in node]
+	return node
+
+if __name__ == '__main__':
+	import json
+	with open(sys.argv[1]) as f:
+		source = json.load(f)
+	ast = from_json(source)
+	print('lossless' if to_json(ast) == source else 'lossy')
@@ -0,0 +1,242 @@
+from evaluator import primitive_func
+from nodes import Kind, Node, Apply, Assign, Case, For, FuncDef, If, Range, Return, Switch, VarDef, Variable, While
+from resolver import block_names
+
+# Optional AST pass between parsing and evaluation, used by every engine:
+#   - applications of pure primitives to constants are folded, so is `true`
+#   - if/while with a constant predicate and switch on a constant lose the
+#     branches that can't run, as do statements after a break or return
+#   - x ** 2 becomes x * x
+# Operator names are variables, so nothing named by a definition, parameter,
+# loop variable or assignment anywhere in the program is touched, nor what
+# the globals of an embedding's run shadow (see interpreter.Program).
+
+FOLDABLE = {'_-', '+', '-', '*', '/', '/.', '%', '**', '==', '!=', '>', '>=', '<', '<=', '_!',
+	'&&', '||', 'int', 'round', '$char_code'}
+CONSTANT_NAMES = {'true': True, 'false': False}
+# the builtins the optimizer may replace by their values
+FOLDED_NAMES = frozenset(FOLDABLE) | frozenset(CONSTANT_NAMES)
+# folded strings and numbers stay about as small as the source they replace
+MAX_FOLDED_SIZE = 256
+MAX_FOLDED_POWER = 64
+JUMPS = (Kind.RETURN, Kind.BREAK, Kind.CONTINUE, Kind.FALLTHROUGH)
+STMT_KINDS = (Kind.IF, Kind.WHILE, Kind.SWITCH, Kind.FOR) + JUMPS
+
+NOT_CONSTANT = object()
+
+def is_constant(value):
+	return isinstance(value, (int, float, str))
+
+def is_small(value):
+	if isinstance(value, str):
+		return len(value) <= MAX_FOLDED_SIZE
+	if isinstance(value, int):
+		return value.bit_length() <= MAX_FOLDED_SIZE * 4
+	return True
+
+def fold(name, args):
+	# the value of a pure primitive applied to constants, or NOT_CONSTANT when
+	# it fails or would grow the program; errors are left for run time
+	if name == '**' and isinstance(args[1], int) and abs(args[1]) > MAX_FOLDED_POWER:
+		return NOT_CONSTANT
+	if name == '*' and (isinstance(args[0], str) or isinstance(args[1], str)):
+		count = args[1] if isinstance(args[0], str) else args[0]
+		if isinstance(count, int) and count > MAX_FOLDED_SIZE:
+			return NOT_CONSTANT
+	try:
+		value = primitive_func[name](*args)
+	except Exception:
+		return NOT_CONSTANT
+	if is_constant(value) and is_small(value):
+		return value
+	return NOT_CONSTANT
+
+## ANALYSIS
+
+def bound_names(ast):
+	# every name the program binds, any of them may shadow a primitive
+	names = set()
+	def walk(stmt):
+		if isinstance(stmt, (list, tuple)):
+			for s in stmt:
+				walk(s)
+		elif isinstance(stmt, Node):
+			if stmt.kind == Kind.VAR_DEF:
+				names.add(stmt.left)
+			elif stmt.kind == Kind.FUNC_DEF:
+				names.add(stmt.name)
+				names.update(stmt.parameters)
+			elif stmt.kind == Kind.FOR:
+				names.add(stmt.variable.name)
+			elif stmt.kind == Kind.ASSIGN and stmt.left.kind == Kind.VAR:
+				names.add(stmt.left.name)
+			for _, attr in stmt.FIELDS:
+				walk(getattr(stmt, attr))
+	walk(ast)
+	return names
+
+class Optimizer(object):
+	def __init__(self, ast, shadowed=()):
+		bound = bound_names(ast) | set(shadowed)
+		self.foldable = FOLDABLE - bound
+		self.constants = {k: v for k, v in CONSTANT_NAMES.items() if k not in bound}
+
+	''' Expressions '''
+	def expr(self, stmt):
+		if isinstance(stmt, list):
+			return self.block(stmt)
+		elif not isinstance(stmt, Node):
+			return stmt
+		kind = stmt.kind
+		if kind == Kind.VAR:
+			value = self.constants.get(stmt.name, NOT_CONSTANT)
+			return stmt if value is NOT_CONSTANT else value
+		elif kind == Kind.APPLY:
+			return self.apply(stmt)
+		elif kind == Kind.ASSIGN:
+			# the target stays as written
+			return Assign(stmt.left, self.expr(stmt.right), stmt.return_left, stmt.line)
+		elif kind == Kind.VAR_DEF:
+			return VarDef(stmt.left, self.expr(stmt.right), stmt.line)
+		elif kind == Kind.FUNC_DEF:
+			return FuncDef(stmt.name, stmt.parameters, self.body(stmt.body), stmt.is_class, stmt.parent, stmt.memo, stmt.line)
+		elif kind in STMT_KINDS:
+			return self.stmt(stmt)
+		return stmt
+
+	def apply(self, stmt):
+		operator = stmt.operator
+		name = operator.name if operator.kind == Kind.VAR else None
+		if name == '.':
+			# the member is looked up in the object, not in scope
+			obj, member = stmt.operands
+			if isinstance(member, Node) and member.kind == Kind.APPLY:
+				member = Apply(member.operator, [self.expr(x) for x in member.operands], member.line)
+			return Apply(operator, [self.expr(obj), member], stmt.line)
+		if name is None:
+			operator = self.expr(operator)
+		operands = [self.expr(x) for x in stmt.operands]
+		if name not in self.foldable:
+			return Apply(operator, operands, stmt.line)
+		if name == '&&' or name == '||':
+			return self.logic(stmt, name, operands)
+		if all(is_constant(x) for x in operands):
+			value = fold(name, operands)
+			if value is not NOT_CONSTANT:
+				return value
+		if (name == '**' and type(operands[1]) is int and operands[1] == 2 and '*' in self.foldable
+				and isinstance(operands[0], Node) and operands[0].kind == Kind.VAR):
+			# strength reduction, x * x looks x up twice but skips the power
+			return Apply(Variable('*', operator.type, operator.line), [operands[0], operands[0]], stmt.line)
+		return Apply(operator, operands, stmt.line)
+
+	def logic(self, stmt, name, operands):
+		# as evaluator.eval_logic: the right side is only evaluated when the
+		# left one == true for &&, == false for ||, else it counts as null
+		left, right = operands
+		if not is_constant(left):
+			return Apply(stmt.operator, operands, stmt.line)
+		if (name == '&&' and left == True) or (name == '||' and left == False):
+			if is_constant(right):
+				value = fold(name, [left, right])
+				if value is not NOT_CONSTANT:
+					return value
+			return right
+		value = fold(name, [left, None])
+		if value is not NOT_CONSTANT:
+			return value
+		return Apply(stmt.operator, operands, stmt.line)
+
+	''' Statements '''
+	def stmt(self, stmt):
+		# a statement, or a list of them to take its place in the block
+		if not isinstance(stmt, Node):
+			return self.expr(stmt)
+		kind = stmt.kind
+		if kind == Kind.IF:
+			return self.if_stmt(stmt)
+		elif kind == Kind.WHILE:
+			predicate = self.expr(stmt.predicate)
+			if is_constant(predicate) and not predicate:
+				return []
+			return While(predicate, self.body(stmt.consequent), stmt.line)
+		elif kind == Kind.SWITCH:
+			return self.switch_stmt(stmt)
+		elif kind == Kind.FOR:
+			return self.for_stmt(stmt)
+		elif kind == Kind.RETURN:
+			return Return(self.expr(stmt.expression), stmt.line)
+		elif kind in JUMPS:
+			return stmt
+		return self.expr(stmt)
+
+	def if_stmt(self, stmt):
+		predicate = self.expr(stmt.predicate)
+		if is_constant(predicate):
+			return self.inline(stmt.consequent if predicate else stmt.alternative, stmt.line)
+		alternative = stmt.alternative
+		if alternative:
+			alternative = self.body(alternative)
+		return If(predicate, self.body(stmt.consequent), alternative, stmt.line)
+
+	def switch_stmt(self, stmt):
+		variable = self.expr(stmt.variable)
+		cases = stmt.cases
+		if is_constant(variable) and all(is_constant(v) for case in cases for v in case.value):
+			# cases before the match can't run, the ones after only by falling through
+			for i, case in enumerate(cases):
+				if variable in case.value:
+					cases = cases[i:]
+					break
+			else:
+				return self.inline(stmt.default, stmt.line)
+		cases = [Case(case.value, self.body(case.stmt), case.line) for case in cases]
+		default = self.body(stmt.default) if stmt.default else stmt.default
+		return Switch(variable, cases, default, stmt.line)
+
+	def for_stmt(self, stmt):
+		for_range = stmt.range
+		if isinstance(for_range, Node) and for_range.kind == Kind.RANGE:
+			for_range = Range(self.expr(for_range.start), self.expr(for_range.end), for_range.closed, for_range.line)
+		else:
+			for_range = self.expr(for_range)
+		increment = stmt.increment
+		if increment is not None:
+			increment = self.expr(increment)
+		return For(stmt.variable, for_range, increment, self.body(stmt.consequent), stmt.line)
+
+	''' Blocks '''
+	def inline(self, stmt, line):
+		# the block that a constant if or switch always runs; it is spliced
+		# into the enclosing one unless it needs a frame of its own
+		if not stmt:
+			return []
+		if block_names(stmt):
+			return If(True, self.body(stmt), None, line)
+		result = self.stmt(stmt)
+		return result if isinstance(result, list) else [result]
+
+	def body(self, stmt):
+		if stmt is None:
+			return None
+		return self.stmt(stmt)
+
+	def block(self, stmts):
+		result = []
+		for s in stmts:
+			s = self.stmt(s)
+			if isinstance(s, list):
+				result.extend(s)
+			elif not is_constant(s):
+				# a constant statement does nothing
+				result.append(s)
+			if result and isinstance(result[-1], Node) and result[-1].kind in JUMPS:
+				# the rest of the block is unreachable
+				break
+		return result
+
+def optimize(ast, shadowed=()):
+	# shadowed: names the program runs with bound outside it
+	if not ast:
+		return ast
+	return Optimizer(ast, shadowed).body(ast)
@@ -0,0 +1,228 @@
+import atexit
+import itertools
+import sys
+import weakref
+import lst
+import vec
+
+# Where `print` goes. A Sink collects the text of print calls and hands it to
+# its writer in one piece when the buffer is full ('full'), or after every
+# print ('line', what a terminal wants); input flushes it first so a prompt
+# always follows what was printed before it. The writers:
+#
+#   StdoutWriter()          sys.stdout as it is at the time of the write
+#   FileWriter(path)        a file of its own, or FileWriter(file) for an open one
+#   MemoryWriter()          keeps the text, getvalue() returns it
+#   CallbackWriter(f)       f(text) per flush
+#
+# Each thread prints to its own sink, the default one writes to stdout;
+# Interpreter.run(..., output=...) and evaluator.printing(sink) choose
+# another for one run, see sink_for for what may be given. Lists and arrays
+# are written a piece at a time, nested ones included, so printing a long
+# list doesn't build its text first.
+
+BUFFER_SIZE = 1 << 13
+FLUSH_POLICIES = ('full', 'line')
+
+class StdoutWriter(object):
+	def write(self, text):
+		sys.stdout.write(text)
+
+	def flush(self):
+		sys.stdout.flush()
+
+	def close(self):
+		pass
+
+class FileWriter(object):
+	def __init__(self, file, encoding='utf-8'):
+		# a path is opened here and closed by close(), an open file is the caller's
+		self.owned = isinstance(file, str)
+		self.file = open(file, 'w', encoding=encoding) if self.owned else file
+
+	def write(self, text):
+		self.file.write(text)
+
+	def flush(self):
+		self.file.flush()
+
+	def close(self):
+		if self.owned:
+			self.file.close()
+
+class MemoryWriter(object):
+	def __init__(self):
+		self.parts = []
+
+	def write(self, text):
+		self.parts.append(text)
+
+	def flush(self):
+		pass
+
+	def close(self):
+		pass
+
+	def getvalue(self):
+		text = ''.join(self.parts)
+		self.parts = [text] if text else []
+		return text
+
+class CallbackWriter(object):
+	def __init__(self, callback):
+		self.callback = callback
+
+	def write(self, text):
+		self.callback(text)
+
+	def flush(self):
+		pass
+
+	def close(self):
+		pass
+
+class Sink(object):
+	__slots__ = ('writer', 'buffer_size', 'policy', 'parts', 'size', '__weakref__')
+
+	def __init__(self, writer, buffer_size=BUFFER_SIZE, flush='full'):
+		if flush not in FLUSH_POLICIES:
+			raise ValueError('Unknown flush policy: ' + flush)
+		self.writer = writer
+		self.buffer_size = buffer_size
+		self.policy = flush
+		self.parts = []
+		self.size = 0
+
+	def write(self, text):
+		self.parts.append(text)
+		self.size += len(text)
+		if self.size >= self.buffer_size:
+			self.flush()
+
+	def print(self, *xs):
+		# what `print` writes: each value on a line of its own
+		for x in xs:
+			t = type(x)
+			if t is lst.Cons or t is vec.Array:
+				write_repr(x, self.write)
+				text = '\n'
+			else:
+				text = (x if t is str else str(x)) + '\n'
+			self.parts.append(text)
+			self.size += len(text)
+		if self.size >= self.buffer_size or self.policy == 'line':
+			self.flush()
+
+	def flush(self):
+		if self.parts:
+			text = ''.join(self.parts)
+			self.parts = []
+			self.size = 0
+			self.writer.write(text)
+		self.writer.flush()
+
+	def close(self):
+		self.flush()
+		self.writer.close()
+
+class Text(str):
+	# written as it is by write_repr, where a str is written as its repr
+	__slots__ = ()
+
+OPEN, CLOSE, ARRAY_OPEN, SEPARATOR = Text('['), Text(']'), Text('#['), Text(', ')
+CHUNK = 256
+NESTED = (lst.Cons, vec.Array)
+
+def sequence_pieces(items, opening):
+	# opening, the items separated by ', ', then ']'; a chunk of items with
+	# no list or array among them goes as one repr of a Python list
+	yield opening
+	items = iter(items)
+	first = True
+	while True:
+		chunk = list(itertools.islice(items, CHUNK))
+		if not chunk:
+			break
+		if not first:
+			yield SEPARATOR
+		first = False
+		if set(map(type, chunk)).isdisjoint(NESTED):
+			yield Text(repr(chunk)[1:-1])
+		else:
+			for i, x in enumerate(chunk):
+				if i:
+					yield SEPARATOR
+				yield x
+	yield CLOSE
+
+def list_pieces(xs):
+	# as Cons.__repr__: a list is [a, b], a pair chain nests, [a, [b, c]]
+	if xs.proper:
+		yield from sequence_pieces(lst.iterate(xs), OPEN)
+		return
+	depth = 0
+	while type(xs) is lst.Cons:
+		yield OPEN
+		yield xs.head
+		yield SEPARATOR
+		depth += 1
+		xs = xs.tail
+	yield xs
+	for _ in range(depth):
+		yield CLOSE
+
+def write_repr(x, write):
+	# repr(x) a piece at a time, without recursion; an array inside itself
+	# is #[...] as in its repr
+	stack = [iter((x,))]
+	arrays = [None]		# per stack entry the id of its array, None for the others
+	while stack:
+		x = next(stack[-1], stack)
+		if x is stack:
+			stack.pop()
+			arrays.pop()
+			continue
+		t = type(x)
+		if t is Text:
+			write(x)
+		elif t is lst.Cons:
+			stack.append(list_pieces(x))
+			arrays.append(None)
+		elif t is vec.Array:
+			if id(x) in arrays:
+				write('#[...]')
+			else:
+				stack.append(sequence_pieces(x, ARRAY_OPEN))
+				arrays.append(id(x))
+		else:
+			write(repr(x))
+
+def stdout_sink():
+	# the default sink of a thread, line flushed on a terminal
+	stream = sys.stdout
+	tty = hasattr(stream, 'isatty') and stream.isatty()
+	sink = Sink(StdoutWriter(), flush='line' if tty else 'full')
+	stdout_sinks.add(sink)
+	return sink
+
+stdout_sinks = weakref.WeakSet()
+
+def flush_stdout():
+	# at exit, whatever the default sinks still hold
+	for sink in list(stdout_sinks):
+		try:
+			sink.flush()
+		except (OSError, ValueError):
+			pass
+
+atexit.register(flush_stdout)
+
+def sink_for(target):
+	# a Sink, a writer or a callable taking the text
+	if isinstance(target, Sink):
+		return target
+	if hasattr(target, 'write'):
+		return Sink(target)
+	if callable(target):
+		return Sink(CallbackWriter(target))
+	raise TypeError('Not an output: {0!r}'.format(target))
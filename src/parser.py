@@ -1,4 +1,14 @@
 from lexer import Lexer, TokenType
+from nodes import (Variable, Apply, Assign, VarDef, FuncDef, If, While, Switch, Case, For, Range,
+	Break, Continue, Fallthrough, Return)
+
+# bound once for expression(), attribute lookups on an Enum are slow
+NEWLINE = TokenType.NEWLINE
+EOF = TokenType.EOF
+NAME = TokenType.NAME
+NUMBER = TokenType.NUMBER
+STRING = TokenType.STRING
+OPERATOR = TokenType.OPERATOR
 
 class Parser(object):
 	PRECEDENCE = {
@@ -8,7 +18,7 @@ class Parser(object):
 		12: ['*','/','/.','%'],
 		11: ['+','-'],
 		10: ['<<','>>','>>>'],
-		9: ['<','<=','>','>+'],
+		9: ['<','<=','>','>=','...','..<','..>'],
 		8: ['==','!='],
 		7: ['&'],
 		6: ['^'],
@@ -20,12 +30,32 @@ class Parser(object):
 		0: ['=',':='],
 	}
 
+	# binding powers for expression(): infix operator -> (left, right). They
+	# are PRECEDENCE + 1, leaving 0 for 'any expression'; a right binding
+	# power one below the left one makes the operator right-assoc
+	RIGHT_ASSOC = ['**', ',', '=', ':=', '+=', '-=', '*=', '/=', '%=']
+	INFIX = {}
+	for _power, _ops in PRECEDENCE.items():
+		for _op in _ops:
+			if _op[0] != '_' and _op not in ['++', '--', '?', ':', '[']:
+				INFIX[_op] = (_power + 1, _power if _op in RIGHT_ASSOC else _power + 1)
+	for _op in ['+=', '-=', '*=', '/=', '%=']:
+		INFIX[_op] = INFIX['=']
+	INFIX['('] = INFIX['['] = INFIX['++'] = INFIX['--'] = (16, 16)
+	del _power, _ops, _op
+
+	PREFIX = {'-': '_-', '!': '_!', '~': '_~'}
+	UNARY_POWER = 14
+	ARG_POWER = 2	# call arguments and list items stop at ','
+
 	def __init__(self):
 		self.tokens = []
 		self.len = 0	# num of tokens
 		self.i = -1		# index
 		self.t = None	# current token
 		self.n = None	# next token
+		self.nesting = 0	# open brackets in expression()
+		self.generators = []	# per function being parsed: has it a yield, None where yield can't be
 
 	def init_tokens(self, tokens):
 		self.tokens = tokens
@@ -33,10 +63,8 @@ class Parser(object):
 		self.skip()
 
 	def get_precedence(self, operator):
-		for key, value in self.PRECEDENCE.items():
-			if operator in value:
-				return key
-		return -1
+		power = self.INFIX.get(operator)
+		return power[0] - 1 if power else -1
 
 	''' Advance Token '''
 	def advance(self, token_type=None, value=None):
@@ -47,7 +75,7 @@ class Parser(object):
 
 	def advance_optional(self, token_type, value):
 		if self.check(token_type, value):
-			advance(token_type, value)
+			self.advance(token_type, value)
 
 	def check(self, token_type, value=None):
 		self.ignore_newline()
@@ -82,160 +110,449 @@ class Parser(object):
 		else:
 			self.n = self.tokens[self.i+1]
 
-	''' AST '''
-	def expr(self):
-		prev = None
-		node = None
-		infix = []
-		paren_count = 0
-		while not self.reach_eof():
-			if self.t.type == TokenType.NEWLINE:
-				self.skip()
-				# TODO
-				break
-			prev = self.t
-			# TODO check expr terminator
-			if self.check_operator(')') and paren_count == 0:
-				break
-			# TODO bracket
-			if self.check_operator('('):
-				paren_count += 1
-			if self.check_operator(')'):
-				paren_count -= 1
-
-			# process tokens
-			if self.check_name('func'):
-				# TODO
-				pass
-			elif self.check(TokenType.STRING) or self.check(TokenType.NUMBER):
-				# constant
-				node = {
-					'tag': 'constant',
-					'value': self.t.value,
-					'line': self.t.line,
-				}
-				self.advance()
-			elif self.check_name() and self.check_next(TokenType.OPERATOR, '('):
-				# func call
-				node = self.func_call()
-			elif self.check_name():
-				# variable
-				node = {
-					'tag': 'variable',
-					'name': self.t.value,
-					'type': 'variable',
-					'line': self.t.line,
-				}
-				self.advance()
-			elif self.check_operator():
-				# operator
-				node = {
-					'tag': 'variable',
-					'name': self.t.value,
-					'type': 'operator',
-					'line': self.t.line,
-				}
-				self.advance()
-			else:
-				raise Exception('[Parser] Unsupported expression token')
-			infix.append(node)
-		# print(infix)
-		
-		# in-fix to post-fix
-		postfix = []
-		temp_stack = []
-		for node in infix:
-			if node['tag'] == 'variable' and node['type'] == 'variable':
-				postfix.append(node)
-			elif node['tag'] == 'constant':
-				postfix.append(node['value'])
-			else:
-				# operator
-				# TODO unary & increment/decrement
-				while len(temp_stack) > 0 and self.get_precedence(node['name']) <= self.get_precedence(temp_stack[-1]['name']):
-					postfix.append(temp_stack.pop())
-				temp_stack.append(node)
-		while len(temp_stack) > 0:
-			postfix.append(temp_stack.pop())
-		if len(postfix) == 1:
-			return postfix[0]
-
-		# print(postfix)
-		# build AST
-		ast_stack = []
-		for node in postfix:
-			if isinstance(node, dict) and node['tag'] == 'variable' and node['type'] == 'operator':
-				operands = []
-				operands = [ast_stack.pop()] + operands
-				operands = [ast_stack.pop()] + operands
-				apply_node = {
-					'tag': 'application',
-					'operator': node,
-					'operands': operands,
-					'line': node['line'],
-				}
-				ast_stack.append(apply_node)
+	''' Pratt expression parser '''
+	def expression(self, rbp=0):
+		# single pass: nodes (see nodes.py) are built as the operators are
+		# met, with the binding powers looked up in INFIX
+		ast = self._expression(rbp)
+		self.n = None if self.t.type is EOF else self.tokens[self.i + 1]
+		return ast
+
+	def _next(self):
+		self.i += 1
+		self.t = self.tokens[self.i]
+		# inside brackets a line break doesn't end the expression
+		while self.nesting and self.t.type is NEWLINE:
+			self.i += 1
+			self.t = self.tokens[self.i]
+
+	def _expect(self, value):
+		if self.t.type is not OPERATOR or self.t.value != value:
+			raise Exception('[Parser] token error')
+		self._next()
+
+	def _expression(self, rbp):
+		while self.t.type is NEWLINE:
+			self._next()
+		left = self._prefix()
+		infix = self.INFIX
+		while True:
+			t = self.t
+			if t.type is not OPERATOR:
+				return left
+			power = infix.get(t.value)
+			if power is None or power[0] <= rbp:
+				return left
+			op = t.value
+			if op == '(':
+				left = self._call(left, t.line)
+				continue
+			elif op == '[':
+				left = self._index(left, t.line)
+				continue
+			self._next()
+			if op in self.RANGES:
+				left = self._range(left, op, power[1], t.line)
+			elif op == '.':
+				left = Apply(Variable('.', 'operator', t.line), [left, self._member()], t.line)
+			elif op == '++' or op == '--':
+				left = self._increment(left, op, True, t.line)
+			elif op == '=':
+				left = Assign(left, self._expression(power[1]), False, t.line)
+			elif op == ':=':
+				if not isinstance(left, Variable):
+					raise Exception('[Parser] Invalid definition')
+				left = VarDef(left.name, self._expression(power[1]), t.line)
+			elif op[-1] == '=' and op in self.RIGHT_ASSOC:
+				# compound assignment, a += b is a = a + b
+				right = self._expression(power[1])
+				left = Assign(left, Apply(Variable(op[:-1], 'operator', t.line), [left, right], t.line), False, t.line)
 			else:
-				ast_stack.append(node)
-		return ast_stack[0]
-
-	def func_call(self):
-		apply_node = {
-			'tag': 'application',
-			'line': self.t.line,
-		}
-		apply_node['operator'] = {
-			'tag': 'variable',
-			'line': self.t.line,
-			'name': self.t.value,
-			'type': 'variable',
-		}
+				left = Apply(Variable(op, 'operator', t.line), [left, self._expression(power[1])], t.line)
+
+	def _prefix(self):
+		t = self.t
+		if t.type is NUMBER or t.type is STRING:
+			self._next()
+			return t.value
+		elif t.type is NAME:
+			self._next()
+			return Variable(t.value, 'variable', t.line)
+		elif t.type is OPERATOR:
+			if t.value == '(':
+				self.nesting += 1
+				self._next()
+				ast = self._expression(0)
+				self.nesting -= 1
+				self._expect(')')
+				return ast
+			elif t.value == '[':
+				# list literal
+				return self._call(Variable('$list', 'variable', t.line), t.line, ']')
+			elif t.value == '#':
+				# array literal #[...]
+				self._next()
+				if not self._at('['):
+					raise Exception('[Parser] Expected [ after # (line {0})'.format(t.line))
+				return self._call(Variable('$array', 'variable', t.line), t.line, ']')
+			elif t.value in self.PREFIX:
+				self._next()
+				operand = self._expression(self.UNARY_POWER)
+				return Apply(Variable(self.PREFIX[t.value], 'operator', t.line), [operand], t.line)
+			elif t.value == '++' or t.value == '--':
+				self._next()
+				return self._increment(self._expression(self.UNARY_POWER), t.value, False, t.line)
+		elif t.type is EOF:
+			raise Exception('[Parser] Unexpected end of input')
+		raise Exception('[Parser] Unsupported expression token')
+
+	def _member(self):
+		# the right side of '.', a name or a call looked up in the object
+		t = self.t
+		if t.type is not NAME:
+			raise Exception('[Parser] Invalid member')
+		self._next()
+		member = Variable(t.value, 'variable', t.line)
+		if self.t.type is OPERATOR and self.t.value == '(':
+			return self._call(member, t.line)
+		return member
+
+	def _call(self, operator, line, close=')'):
+		# self.t is the opening bracket
+		self.nesting += 1
+		self._next()
 		operands = []
-		self.advance() # var name
-		self.advance('(')
-		self.ignore_newline()
-		while not self.check_operator(')'):
-			operands.append(self.expr())
-			if self.check_operator(')'):
-				break
-			self.advance(',')
-			self.ignore_newline()
-		self.advance(')')
-		apply_node['operands'] = operands
-		return apply_node
+		while not (self.t.type is OPERATOR and self.t.value == close):
+			operands.append(self._expression(self.ARG_POWER))
+			if self.t.type is OPERATOR and self.t.value == ',':
+				self._next()
+			elif not (self.t.type is OPERATOR and self.t.value == close):
+				raise Exception('[Parser] token error')
+		self.nesting -= 1
+		self._next()
+		return Apply(operator, operands, line)
 
-	def stmt(self):
-		ast = None
-		if self.check_operator(';'):
-			self.advance()
-		elif self.check_name('var'):
-			self.advance()
-			pass
+	def _range(self, start, op, power, line):
+		# a...b closed, a..<b up, a..>b down, each with an optional `step s`:
+		# $range(start, end, closed, step) with the step negated going down
+		end = self._expression(power)
+		step = 1
+		if self._at_name('step'):
+			self._next()
+			step = self._expression(power)
+			if isinstance(step, (int, float)) and step == 0:
+				raise Exception('[Parser] Range step cannot be 0 (line {0})'.format(line))
+		if op == '..>':
+			step = -step if isinstance(step, (int, float)) else Apply(Variable('_-', 'operator', line), [step], line)
+		return Apply(Variable('$range', 'variable', line), [start, end, op == '...', step], line)
+
+	def _index(self, target, line):
+		# a[i] and a[i:j], a bound of a slice left out is null
+		self.nesting += 1
+		self._next()
+		start = Variable('null', 'variable', line) if self._at(':') else self._expression(0)
+		if self._at(':'):
+			self._next()
+			end = Variable('null', 'variable', line) if self._at(']') else self._expression(0)
+			operator, operands = '[:]', [target, start, end]
 		else:
-			ast = self.expr()
-		self.advance_optional(TokenType.OPERATOR, ';')
-		return ast
+			operator, operands = '[]', [target, start]
+		self.nesting -= 1
+		self._expect(']')
+		return Apply(Variable(operator, 'operator', line), operands, line)
+
+	def _increment(self, target, op, return_left, line):
+		return Assign(target, Apply(Variable(op[0], 'operator', line), [target, 1], line), return_left, line)
+
+	''' Statements '''
+	# built in the shape of the JSON ASTs in example/: a var statement is a
+	# list of definitions, func and class bind a function definition to its
+	# name, and a class body defines `this`, runs its members, returns `this`
+	JUMPS = {'break': Break, 'continue': Continue, 'fallthrough': Fallthrough}
+	RANGES = ('...', '..<', '..>')
+
+	def stmt(self):
+		t = self.t
+		if t.type is NAME:
+			if t.value == 'var':
+				return self.var_stmt()
+			elif t.value == 'func':
+				return self.func_stmt()
+			elif t.value == 'memo' and self._at_memo():
+				return self.memo_stmt()
+			elif t.value == 'class':
+				return self.class_stmt()
+			elif t.value == 'if':
+				return self.if_stmt()
+			elif t.value == 'while':
+				return self.while_stmt()
+			elif t.value == 'for':
+				return self.for_stmt()
+			elif t.value == 'switch':
+				return self.switch_stmt()
+			elif t.value == 'return':
+				return self.return_stmt()
+			elif t.value == 'yield':
+				return self.yield_stmt()
+			elif t.value in self.JUMPS:
+				self._next()
+				return self.JUMPS[t.value](t.line)
+		return self.expression()
 
 	def stmt_list(self):
 		stmts = []
 		while True:
-			self.ignore_newline()
-			if (self.reach_eof()
-				or self.check_operator('}')
-				or self.check_name('case')
-				or self.check_name('default')):
+			self._skip_separators()
+			t = self.t
+			if (t.type is EOF
+				or (t.type is OPERATOR and t.value == '}')
+				or (t.type is NAME and (t.value == 'case' or t.value == 'default'))):
 				break
 			stmt = self.stmt()
-			if stmt:
+			if stmt is not None:
 				stmts.append(stmt)
+			self._end_stmt()
 		return stmts or None
 
+	def _skip_separators(self):
+		while self.t.type is NEWLINE or (self.t.type is OPERATOR and self.t.value == ';'):
+			self._next()
+
+	def _end_stmt(self):
+		# a statement ends at a line break, ';' or the end of its block
+		t = self.t
+		if not (t.type is NEWLINE or t.type is EOF or (t.type is OPERATOR and (t.value == ';' or t.value == '}'))):
+			raise Exception('[Parser] Unexpected token {0!r} (line {1})'.format(t.value, t.line))
+
+	def _at(self, value):
+		return self.t.type is OPERATOR and self.t.value == value
+
+	def _at_name(self, value):
+		return self.t.type is NAME and self.t.value == value
+
+	def _name(self):
+		t = self.t
+		if t.type is not NAME:
+			raise Exception('[Parser] Expected a name (line {0})'.format(t.line))
+		self._next()
+		return t
+
+	def _peek_name(self, value):
+		# whether the next token past any line breaks is the name, without moving
+		i = self.i
+		while self.tokens[i].type is NEWLINE:
+			i += 1
+		return self.tokens[i].type is NAME and self.tokens[i].value == value
+
+	def block(self):
+		self._skip_separators()
+		self._expect('{')
+		# an empty block runs as an empty sequence
+		stmts = self.stmt_list() or []
+		self._expect('}')
+		return stmts
+
+	def parameters(self):
+		self.nesting += 1
+		self._expect('(')
+		params = []
+		while not self._at(')'):
+			params.append(self._name().value)
+			if not self._at(')'):
+				self._expect(',')
+		self.nesting -= 1
+		self._next()
+		return params
+
+	def var_stmt(self):
+		# var a = 1, b  ->  [a := 1, b := null]
+		self._next()
+		defs = []
+		while True:
+			t = self._name()
+			if self._at('='):
+				self._next()
+				right = self.expression(self.ARG_POWER)
+			else:
+				right = Variable('null', 'variable', t.line)
+			defs.append(VarDef(t.value, right, t.line))
+			if not self._at(','):
+				return defs
+			self._next()
+
+	def func_stmt(self, memo=None):
+		line = self.t.line
+		self._next()
+		name = self._name().value
+		params = self.parameters()
+		return VarDef(name, FuncDef(name, params, self.func_body(name, line), False, [], memo, line), line)
+
+	def func_body(self, name, line, generator=False):
+		# a function with yield returns a generator over a function of no
+		# arguments with its body, see evaluator._generator
+		self.generators.append(generator)
+		body = self.block()
+		if not self.generators.pop():
+			return body
+		inner = FuncDef(name, [], body, False, [], None, line)
+		return [Return(Apply(Variable('$generator', 'variable', line), [inner], line), line)]
+
+	def _at_memo(self):
+		# `memo func` or `memo(size) func`, anything else is a name `memo`
+		tokens, i = self.tokens, self.i + 1
+		if tokens[i].type is OPERATOR and tokens[i].value == '(':
+			if not (tokens[i + 1].type is NUMBER and tokens[i + 2].type is OPERATOR and tokens[i + 2].value == ')'):
+				return False
+			i += 3
+		return tokens[i].type is NAME and tokens[i].value == 'func'
+
+	def memo_stmt(self):
+		# calls of the function are cached by their arguments, `memo` for
+		# the default cache size, see purity.py for what may be memoized
+		self._next()
+		memo = True
+		if self._at('('):
+			self._next()
+			t = self.t
+			if not isinstance(t.value, int) or t.value < 1:
+				raise Exception('[Parser] Memo size must be a positive integer (line {0})'.format(t.line))
+			memo = t.value
+			self._next()
+			self._expect(')')
+		return self.func_stmt(memo)
+
+	def class_stmt(self):
+		# the constructor @(a, b) {...} is a member function `@`; the class
+		# takes @a, @b and calls it after the other members are defined
+		line = self.t.line
+		self._next()
+		name = self._name().value
+		self._skip_separators()
+		self._expect('{')
+		body = [VarDef('this', FuncDef('', [], None, True, [], None, line), line)]
+		params = None
+		params_line = line
+		self.generators.append(None)
+		while True:
+			self._skip_separators()
+			if self._at('}'):
+				break
+			if self.t.type is EOF:
+				raise Exception('[Parser] Unexpected end of input in class ' + name)
+			if self._at_name('@'):
+				t = self.t
+				self._next()
+				constructor = self.parameters()
+				body.append(VarDef('@', FuncDef('@', constructor, self.func_body('@', t.line, None), False, [], None, t.line), t.line))
+				params = ['@' + p for p in constructor]
+				params_line = t.line
+			else:
+				stmt = self.stmt()
+				if stmt is not None:
+					body.append(stmt)
+			self._end_stmt()
+		self.generators.pop()
+		end = self.t.line
+		self._next()
+		if params is not None:
+			body.append(Apply(Variable('@', 'variable', end), [Variable(p, 'variable', params_line) for p in params], end))
+		body.append(Return(Variable('this', 'variable', end), end))
+		return VarDef(name, FuncDef(name, params or [], body, False, [], None, line), line)
+
+	def if_stmt(self):
+		line = self.t.line
+		self._next()
+		predicate = self.expression()
+		consequent = self.block()
+		alternative = None
+		if self._peek_name('else'):
+			self._skip_separators()
+			self._next()
+			if self._at_name('if'):
+				alternative = self.if_stmt()
+			else:
+				alternative = self.block()
+		return If(predicate, consequent, alternative, line)
+
+	def while_stmt(self):
+		line = self.t.line
+		self._next()
+		predicate = self.expression()
+		return While(predicate, self.block(), line)
+
+	def for_stmt(self):
+		# for x in anything with elements; over a range literal the loop
+		# counts itself instead of making a Range, see seq.py
+		line = self.t.line
+		self._next()
+		t = self._name()
+		variable = Variable(t.value, 'variable', t.line)
+		if not self._at_name('in'):
+			raise Exception('[Parser] Expected in (line {0})'.format(self.t.line))
+		self._next()
+		for_range = self.expression()
+		increment = None
+		if (isinstance(for_range, Apply) and isinstance(for_range.operator, Variable) and for_range.operator.name == '$range'
+				and len(for_range.operands) == 4 and type(for_range.operands[2]) is bool):
+			# a range literal, a script's own $range call stays a call
+			start, end, closed, step = for_range.operands
+			for_range = Range(start, end, closed, line)
+			if not (type(step) is int and step == 1):
+				increment = step
+		return For(variable, for_range, increment, self.block(), line)
+
+	def switch_stmt(self):
+		line = self.t.line
+		self._next()
+		variable = self.expression()
+		self._skip_separators()
+		self._expect('{')
+		cases = []
+		default = None
+		while True:
+			self._skip_separators()
+			t = self.t
+			if self._at_name('case'):
+				self._next()
+				values = [self.expression(self.ARG_POWER)]
+				while self._at(','):
+					self._next()
+					values.append(self.expression(self.ARG_POWER))
+				self._expect(':')
+				cases.append(Case(values, self.stmt_list() or [], t.line))
+			elif self._at_name('default'):
+				self._next()
+				self._expect(':')
+				default = self.stmt_list() or []
+			elif self._at('}'):
+				self._next()
+				return Switch(variable, cases, default, line)
+			else:
+				raise Exception('[Parser] Unexpected token {0!r} in switch (line {1})'.format(t.value, t.line))
+
+	def yield_stmt(self):
+		line = self.t.line
+		if not self.generators or self.generators[-1] is None:
+			raise Exception('[Parser] yield outside a function (line {0})'.format(line))
+		self.generators[-1] = True
+		self._next()
+		return Apply(Variable('$yield', 'variable', line), [self.expression()], line)
+
+	def return_stmt(self):
+		line = self.t.line
+		self._next()
+		t = self.t
+		if t.type is NEWLINE or t.type is EOF or (t.type is OPERATOR and (t.value == '}' or t.value == ';')):
+			return Return(Variable('null', 'variable', line), line)
+		return Return(self.expression(), line)
+
 	def parse(self, tokens):
 		self.init_tokens(tokens)
-		# print('==== TOKENS ====')
-		# for t in self.tokens:
-		# 	print(t)
-		return self.stmt_list()
+		self.generators = []
+		ast = self.stmt_list()
+		if self.t.type is not EOF:
+			raise Exception('[Parser] Unexpected token {0!r} (line {1})'.format(self.t.value, self.t.line))
+		return ast
 
 def main():
 	lexer = Lexer()
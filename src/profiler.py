@@ -0,0 +1,239 @@
+import sys
+import time
+
+import evaluator
+from evaluator import FunctionType
+from nodes import Kind, Node
+
+# Deterministic profiler for the tree walker. While active it replaces
+# evaluator.evaluate and evaluator.eval_apply with wrappers that note every
+# change of source line and every call of a script function; time between
+# two such events goes to the current line and stack. A line is hit once
+# per statement run on it, the statements of a block and the tests of `if`
+# and `while`, and counted per function. Nothing is wrapped while it is
+# inactive, so a normal run pays nothing for it. The wrappers add Python
+# frames to every nested evaluation, so the recursion limit is doubled
+# while the profiler is active, for scripts to recurse as deep as without.
+#
+#   profiler = Profiler()
+#   with profiler:
+#       run_ast(ast, env)
+#   profiler.report()                  top functions and lines
+#   profiler.write_collapsed(f)        input for flamegraph.pl / speedscope
+#
+# The report also has the hits and misses of memo functions while active,
+# counted in the memo registry of the run or, without one, its own.
+
+PROGRAM = '<program>'
+ANONYMOUS = '<anonymous>'
+
+class FunctionStats(object):
+	__slots__ = ('calls', 'self_time', 'total_time', 'active')
+
+	def __init__(self):
+		self.calls = 0
+		self.self_time = 0.0
+		self.total_time = 0.0
+		self.active = 0		# recursive calls in progress, total counts the outermost
+
+# the statements that pass their hit on to their test
+TESTED = (Kind.IF, Kind.WHILE)
+
+class LineStats(object):
+	__slots__ = ('function', 'hits', 'time')
+
+	def __init__(self, function):
+		self.function = function
+		self.hits = 0
+		self.time = 0.0
+
+class Profiler(object):
+	def __init__(self, clock=time.perf_counter):
+		self.clock = clock
+		self.functions = {}
+		self.lines = {}		# (function, line) -> LineStats
+		self.stacks = {}
+		self.stack = [PROGRAM]
+		self.line = None
+		self.statement = True	# whether what is evaluated next is a statement
+		self.last = None
+		self.started = None
+		self.elapsed = 0.0
+		self.memo = {}		# (name, line) -> [hits, misses, evictions, skipped]
+		self._saved = None
+		self._memo_start = None
+		self._memo_registry = None	# the registry before start()
+		self._recursion_limit = None
+
+	''' Events '''
+	def charge(self):
+		# the time since the last event goes to where the program was
+		now = self.clock()
+		spent = now - self.last
+		self.last = now
+		name = self.stack[-1]
+		self.function(name).self_time += spent
+		if self.line is not None:
+			self.line_stats(name, self.line).time += spent
+		key = (tuple(self.stack), self.line)
+		self.stacks[key] = self.stacks.get(key, 0.0) + spent
+
+	def function(self, name):
+		stats = self.functions.get(name)
+		if stats is None:
+			stats = self.functions[name] = FunctionStats()
+		return stats
+
+	def line_stats(self, function, line):
+		stats = self.lines.get((function, line))
+		if stats is None:
+			stats = self.lines[(function, line)] = LineStats(function)
+		return stats
+
+	def wrap_evaluate(self, evaluate):
+		def profiled_evaluate(stmt, env):
+			# self.statement is what the caller evaluates, set for the
+			# elements of a block and the test of an if or while
+			statement = self.statement
+			if isinstance(stmt, list):
+				self.statement = True
+				try:
+					return evaluate(stmt, env)
+				finally:
+					self.statement = statement
+			if not isinstance(stmt, Node):
+				return evaluate(stmt, env)
+			line = stmt.line
+			tested = stmt.kind in TESTED
+			self.statement = tested
+			try:
+				if line is None:
+					return evaluate(stmt, env)
+				if statement and not tested:
+					self.line_stats(self.stack[-1], line).hits += 1
+				if line == self.line:
+					return evaluate(stmt, env)
+				outer = self.line
+				self.charge()
+				self.line = line
+				try:
+					return evaluate(stmt, env)
+				finally:
+					self.charge()
+					self.line = outer
+			finally:
+				self.statement = statement
+		return profiled_evaluate
+
+	def wrap_eval_apply(self, eval_apply):
+		def profiled_eval_apply(fun, args, env):
+			if fun[0] != FunctionType.FUNCTION:
+				return eval_apply(fun, args, env)
+			name = fun[1].get('name') or ANONYMOUS
+			stats = self.function(name)
+			stats.calls += 1
+			stats.active += 1
+			self.charge()
+			self.stack.append(name)
+			# the callee's lines are its own, the caller's come back after
+			outer = self.line
+			self.line = None
+			start = self.last
+			try:
+				return eval_apply(fun, args, env)
+			finally:
+				self.charge()
+				self.stack.pop()
+				self.line = outer
+				stats.active -= 1
+				if not stats.active:
+					stats.total_time += self.last - start
+		return profiled_eval_apply
+
+	''' Activation '''
+	def start(self):
+		if self._saved is not None:
+			raise RuntimeError('profiler already active')
+		self._saved = (evaluator.evaluate, evaluator.eval_apply)
+		self._recursion_limit = sys.getrecursionlimit()
+		sys.setrecursionlimit(2 * self._recursion_limit)
+		evaluator.evaluate = self.wrap_evaluate(evaluator.evaluate)
+		evaluator.eval_apply = self.wrap_eval_apply(evaluator.eval_apply)
+		self.function(PROGRAM).calls += 1
+		self._memo_registry = evaluator.running.memo_registry
+		if self._memo_registry is None:
+			evaluator.running.memo_registry = {}
+		self._memo_start = self.memo_counts()
+		self.started = self.last = self.clock()
+
+	def stop(self):
+		if self._saved is None:
+			return
+		self.charge()
+		evaluator.evaluate, evaluator.eval_apply = self._saved
+		self._saved = None
+		sys.setrecursionlimit(self._recursion_limit)
+		run = self.last - self.started
+		self.elapsed += run
+		self.function(PROGRAM).total_time += run
+		for key, counts in self.memo_counts().items():
+			before = self._memo_start.get(key, (0, 0, 0, 0))
+			total = self.memo.setdefault(key, [0, 0, 0, 0])
+			for i, count in enumerate(counts):
+				total[i] += count - before[i]
+		evaluator.running.memo_registry = self._memo_registry
+		self._memo_registry = None
+
+	def memo_counts(self):
+		return dict(((stats.name, stats.line), stats.counts()) for stats in evaluator.memo_stats(evaluator.running.memo_registry))
+
+	def __enter__(self):
+		self.start()
+		return self
+
+	def __exit__(self, *exc):
+		self.stop()
+
+	''' Output '''
+	def collapsed(self):
+		# 'frame;frame;leaf:line value' lines, values in microseconds
+		lines = []
+		for (stack, line), spent in sorted(self.stacks.items(), key=lambda item: item[0][0]):
+			frames = list(stack)
+			if line is not None:
+				frames[-1] = '{0}:{1}'.format(frames[-1], line)
+			micros = int(round(spent * 1e6))
+			if micros:
+				lines.append('{0} {1}'.format(';'.join(frames), micros))
+		return lines
+
+	def write_collapsed(self, f):
+		for line in self.collapsed():
+			f.write(line + '\n')
+
+	def report(self, top=10, file=None):
+		file = file or sys.stdout
+		total = self.elapsed or 1e-9
+		write = lambda s='': file.write(s + '\n')
+		write('{0:.3f} s profiled'.format(self.elapsed))
+		write()
+		write('{0:<24}{1:>10}{2:>12}{3:>8}{4:>12}{5:>8}'.format('function', 'calls', 'self s', '%', 'total s', '%'))
+		functions = sorted(self.functions.items(), key=lambda item: -item[1].self_time)
+		for name, stats in functions[:top]:
+			write('{0:<24}{1:>10,}{2:>12.4f}{3:>7.1f}%{4:>12.4f}{5:>7.1f}%'.format(
+				name[:23], stats.calls, stats.self_time, 100 * stats.self_time / total,
+				stats.total_time, 100 * stats.total_time / total))
+		write()
+		write('{0:<8}{1:<24}{2:>10}{3:>12}{4:>8}'.format('line', 'function', 'hits', 'self s', '%'))
+		lines = sorted(self.lines.items(), key=lambda item: -item[1].time)
+		for (_, line), stats in lines[:top]:
+			write('{0:<8}{1:<24}{2:>10,}{3:>12.4f}{4:>7.1f}%'.format(
+				line, stats.function[:23], stats.hits, stats.time, 100 * stats.time / total))
+		memo = [(key, counts) for key, counts in sorted(self.memo.items(), key=lambda item: -item[1][0]) if any(counts)]
+		if memo:
+			write()
+			write('{0:<24}{1:<8}{2:>10}{3:>10}{4:>8}{5:>10}{6:>10}'.format('memo', 'line', 'hits', 'misses', 'hit %', 'evicted', 'skipped'))
+			for (name, line), (hits, misses, evictions, skipped) in memo[:top]:
+				write('{0:<24}{1:<8}{2:>10,}{3:>10,}{4:>7.1f}%{5:>10,}{6:>10,}'.format(
+					(name or ANONYMOUS)[:23], '' if line is None else line, hits, misses,
+					100.0 * hits / (hits + misses) if hits + misses else 0.0, evictions, skipped))
@@ -0,0 +1,289 @@
+from evaluator import EvalExeption
+from nodes import Kind, Node
+from resolver import block_names
+
+# Purity analysis for `memo func`. A function may be memoized when its result
+# depends on its arguments alone and calling it changes nothing, which this
+# pass proves the simple way: the function
+#   - only reads names of its own, pure primitives, and functions defined
+#     once and never assigned, which must be pure in turn,
+#   - only calls such functions, its own included: a call through a
+#     variable, a parameter or a computed value may reach anything,
+#   - assigns no variable of an enclosing function or the program,
+#   - uses no member but the list ones and defines no class,
+# and the same holds for every function nested in it. print, input, read,
+# lines, mmap and throw are not pure primitives, nor are those that make an
+# array or a string builder: a cached one would be shared by the callers and
+# may be changed by any of them. Names resolve as resolver.py does it, so
+# mutual recursion and functions nested in functions (_strToNum.help) are
+# fine. Whether the arguments can be keys is a run time matter, see
+# evaluator.MemoCache.
+#
+#   memoize(ast)              fails on a `memo func` that isn't pure
+#   memoize(ast, auto=True)   also memoizes the pure recursive functions
+
+PURE_PRIMITIVES = frozenset((
+	'null', 'undefined', 'true', 'false',
+	'$list', '$string_to_char_list', '$char_code', ',', 'int', 'round', '[]', '[:]', 'sum', 'chars', '$range',
+	'_-', '+', '-', '*', '/', '/.', '%', '**',
+	'==', '!=', '>', '>=', '<', '<=', '_!', '&&', '||',
+))
+LIST_MEMBERS = ('head', 'tail', 'isEmpty', 'length')
+SYNTAX_NAMES = {'$generator': 'yield', '$yield': 'yield'}	# what the parser made them of
+
+class Binding(object):
+	__slots__ = ('function', 'defs', 'assigned')
+
+	def __init__(self):
+		self.function = None	# FunctionInfo of a `func` binding
+		self.defs = 0
+		self.assigned = False
+
+	def is_constant_function(self):
+		return self.function is not None and self.defs == 1 and not self.assigned
+
+class Scope(object):
+	__slots__ = ('parent', 'names', 'declared', 'function', 'is_function')
+
+	def __init__(self, parent, names, function, is_function=False):
+		self.parent = parent
+		self.names = {}
+		for name in names:
+			self.names.setdefault(name, Binding())
+		self.declared = set()
+		self.function = function	# FunctionInfo the scope belongs to, None at the top
+		self.is_function = is_function
+
+class FunctionInfo(object):
+	__slots__ = ('node', 'parent', 'reason', 'reads', 'callees', 'calls')
+
+	def __init__(self, node, parent):
+		self.node = node
+		self.parent = parent	# enclosing FunctionInfo
+		self.reason = None		# why it isn't pure
+		self.reads = []			# (binding or None, name, line) from outside it
+		self.callees = []		# (binding, name, line) of its own it calls
+		self.calls = []			# (FunctionInfo, name, line)
+
+	def impure(self, reason, line):
+		if self.reason is None:
+			self.reason = reason if line is None else '{0} (line {1})'.format(reason, line)
+
+class Analysis(object):
+	def __init__(self, ast):
+		self.functions = []
+		self.scope = Scope(None, block_names(ast), None, True)
+		self.walk(ast)
+		self.settle()
+
+	''' Scopes '''
+	def enter(self, names, function=None, params=()):
+		scope = Scope(self.scope, list(params) + list(names), function or self.scope.function, function is not None)
+		scope.declared.update(params)
+		self.scope = scope
+
+	def leave(self):
+		self.scope = self.scope.parent
+
+	def lookup(self, name):
+		# -> (binding, scope), (None, None) for a builtin; as in Resolver.resolve
+		# a name of the current function is only visible once declared
+		inline = True
+		scope = self.scope
+		while scope is not None:
+			binding = scope.names.get(name)
+			if binding is not None and (not inline or name in scope.declared):
+				return binding, scope
+			if scope.is_function:
+				inline = False
+			scope = scope.parent
+		return None, None
+
+	def outside(self, scope):
+		# the functions around the current position that scope is not in
+		owner = scope.function if scope is not None else None
+		function = self.scope.function
+		while function is not None and function is not owner:
+			yield function
+			function = function.parent
+
+	def taint(self, reason, line):
+		# the current function and every one around it
+		function = self.scope.function
+		while function is not None:
+			function.impure(reason, line)
+			function = function.parent
+
+	''' Walk '''
+	def walk(self, stmt):
+		if isinstance(stmt, list):
+			for s in stmt:
+				self.walk(s)
+			return
+		elif not isinstance(stmt, Node):
+			return
+		kind = stmt.kind
+		if kind == Kind.VAR:
+			self.read(stmt.name, stmt.line)
+		elif kind == Kind.VAR_DEF:
+			self.var_def(stmt)
+		elif kind == Kind.FUNC_DEF:
+			self.func_def(stmt)
+		elif kind == Kind.ASSIGN:
+			self.assign(stmt)
+		elif kind == Kind.APPLY:
+			self.apply(stmt)
+		elif kind == Kind.IF:
+			self.walk(stmt.predicate)
+			self.block(stmt.consequent)
+			self.block(stmt.alternative)
+		elif kind == Kind.WHILE:
+			self.walk(stmt.predicate)
+			self.block(stmt.consequent)
+		elif kind == Kind.SWITCH:
+			self.walk(stmt.variable)
+			for case in stmt.cases:
+				self.walk(list(case.value))
+				self.block(case.stmt)
+			self.block(stmt.default)
+		elif kind == Kind.FOR:
+			self.walk(stmt.range)
+			self.walk(stmt.increment)
+			self.enter(block_names(stmt.consequent), params=(stmt.variable.name,))
+			self.walk(stmt.consequent)
+			self.leave()
+		else:
+			for _, attr in stmt.FIELDS:
+				self.walk(getattr(stmt, attr))
+
+	def block(self, stmt):
+		if not isinstance(stmt, list):
+			self.walk(stmt)
+			return
+		self.enter(block_names(stmt))
+		self.walk(stmt)
+		self.leave()
+
+	def read(self, name, line):
+		binding, scope = self.lookup(name)
+		for function in self.outside(scope):
+			function.reads.append((binding, name, line))
+
+	def var_def(self, stmt):
+		right = stmt.right
+		if isinstance(right, Node) and right.kind == Kind.FUNC_DEF:
+			function = self.func_def(right)
+		else:
+			function = None
+			self.walk(right)
+		self.scope.declared.add(stmt.left)
+		binding = self.scope.names.setdefault(stmt.left, Binding())
+		binding.defs += 1
+		binding.function = function
+
+	def func_def(self, stmt):
+		if stmt.is_class:
+			self.taint('defines a class', stmt.line)
+			return None
+		function = FunctionInfo(stmt, self.scope.function)
+		self.functions.append(function)
+		self.enter(block_names(stmt.body), function, stmt.parameters)
+		self.walk(stmt.body)
+		self.leave()
+		return function
+
+	def assign(self, stmt):
+		left = stmt.left
+		if left.kind == Kind.VAR:
+			binding, scope = self.lookup(left.name)
+			if binding is not None:
+				binding.assigned = True
+			if any(True for _ in self.outside(scope)):
+				# also the functions around it: a nested function that
+				# keeps state in their frames makes their results stateful
+				self.taint('assigns non-local variable ' + left.name, stmt.line)
+		else:
+			self.taint('assigns a member', stmt.line)
+			self.walk(left.operands[0])
+		self.walk(stmt.right)
+
+	def apply(self, stmt):
+		operator = stmt.operator
+		if operator.kind == Kind.VAR and operator.name == '.':
+			obj, member = stmt.operands
+			self.walk(obj)
+			if member.kind == Kind.APPLY:
+				self.taint('calls method ' + member.operator.name, stmt.line)
+				self.walk(member.operands)
+			elif member.name not in LIST_MEMBERS:
+				self.taint('reads member ' + member.name, stmt.line)
+			return
+		if operator.kind != Kind.VAR:
+			self.taint('calls a computed function', stmt.line)
+		elif self.scope.function is not None:
+			binding, scope = self.lookup(operator.name)
+			if binding is not None and not any(True for _ in self.outside(scope)):
+				self.scope.function.callees.append((binding, operator.name, stmt.line))
+		self.walk(operator)
+		self.walk(stmt.operands)
+
+	''' Result '''
+	def settle(self):
+		# pure until shown otherwise, so mutually recursive functions are
+		# pure together unless something else makes one of them impure
+		for function in self.functions:
+			for binding, name, line in function.reads:
+				if binding is None:
+					if name not in PURE_PRIMITIVES:
+						function.impure('uses ' + SYNTAX_NAMES.get(name, name), line)
+				elif binding.is_constant_function():
+					function.calls.append((binding.function, name, line))
+				else:
+					function.impure('reads non-local variable ' + name, line)
+			for binding, name, line in function.callees:
+				if binding.is_constant_function():
+					function.calls.append((binding.function, name, line))
+				else:
+					function.impure('calls {0}, which is not a known function'.format(name), line)
+		changed = True
+		while changed:
+			changed = False
+			for function in self.functions:
+				if function.reason is not None:
+					continue
+				for callee, name, line in function.calls:
+					if callee.reason is not None:
+						function.impure('calls {0}, which {1}'.format(name, callee.reason), None)
+						changed = True
+						break
+
+	def is_recursive(self, function):
+		seen = set()
+		todo = [callee for callee, _, _ in function.calls]
+		while todo:
+			callee = todo.pop()
+			if callee is function:
+				return True
+			if id(callee) not in seen:
+				seen.add(id(callee))
+				todo.extend(c for c, _, _ in callee.calls)
+		return False
+
+def analyze(ast):
+	# -> (FuncDef, reason) for every function, reason None if it is pure
+	return [(function.node, function.reason) for function in Analysis(ast or []).functions]
+
+def memoize(ast, auto=False):
+	# checks every memo function is pure and, with auto, memoizes the pure
+	# recursive functions that take arguments; -> the FuncDefs it memoized
+	analysis = Analysis(ast or [])
+	memoized = []
+	for function in analysis.functions:
+		node = function.node
+		if node.memo:
+			if function.reason is not None:
+				raise EvalExeption('Cannot memoize {0} (line {1}): it {2}'.format(node.name or '<anonymous>', node.line, function.reason))
+		elif auto and function.reason is None and node.parameters and analysis.is_recursive(function):
+			node.memo = True
+			memoized.append(node)
+	return memoized
@@ -0,0 +1,136 @@
+from evaluator import missing_variable
+from nodes import Kind, Node
+
+# Lexical addressing: every variable reference is resolved ahead of time to a
+# (depth, slot) pair. At run time a frame is a list laid out as
+#   [parent frame, Scope, slot 2, slot 3, ...]
+# so a lookup is `depth` parent hops followed by one index.
+#
+# A name is looked up where its definition has run, as the tree engine does
+# with its dict frames. Within a function that is mostly known ahead of
+# time. A function nested in another may run before a `var` of the
+# enclosing one that comes after it, and a `for` body keeps one frame for
+# all its iterations, so a `var` in it has run for every iteration but the
+# first. There the name resolves to a list of places: that slot, which
+# stays UNSET until its `var` runs, then the places further out. The first
+# place that is set is the variable.
+
+FRAME_HEADER = 2
+
+class Unset(object):
+	# pickles as the module's UNSET, so cached programs keep it
+	__slots__ = ()
+
+	def __reduce__(self):
+		return 'UNSET'
+
+	def __repr__(self):
+		return '<unset>'
+
+UNSET = Unset()
+
+class Scope(object):
+	__slots__ = ('parent', 'names', 'size', 'declared', 'is_function', 'is_loop', 'unset', 'blank')
+
+	def __init__(self, parent, names, is_function=False, is_loop=False):
+		self.parent = parent
+		self.names = {}
+		for name in names:
+			if name not in self.names:
+				self.names[name] = FRAME_HEADER + len(self.names)
+		self.size = len(self.names)
+		self.declared = set()
+		self.is_function = is_function
+		self.is_loop = is_loop	# the frame of a `for`, kept from one iteration to the next
+		self.unset = set()		# slots that may be looked up before their `var`
+		self.blank = None		# the slots of a new frame, made by Resolver.leave
+
+	def new_frame(self, parent):
+		return [parent, self] + self.blank
+
+	def seal(self):
+		# all lookups of the scope's names are resolved by now
+		self.blank = [None] * self.size
+		for slot in self.unset:
+			self.blank[slot - FRAME_HEADER] = UNSET
+
+def block_names(stmt):
+	# names declared directly in a block, i.e. in the frame it runs in
+	names = []
+	def collect(stmt):
+		if isinstance(stmt, list):
+			for s in stmt:
+				collect(s)
+		elif isinstance(stmt, Node) and stmt.kind == Kind.VAR_DEF:
+			names.append(stmt.left)
+	collect(stmt)
+	return names
+
+def is_func_def(stmt):
+	# the right side of a `var` whose body can only run once the var is set
+	return isinstance(stmt, Node) and stmt.kind == Kind.FUNC_DEF
+
+class Resolver(object):
+	def __init__(self, builtins):
+		self.scope = Scope(None, builtins)
+		self.scope.declared.update(builtins)
+		self.scope.seal()
+		self.builtins = self.scope
+
+	def enter(self, names, params=(), is_function=False, is_loop=False):
+		# blocks that declare nothing get no frame at run time
+		if not names and not params and not is_function:
+			return None
+		scope = Scope(self.scope, list(params) + list(names), is_function, is_loop)
+		scope.declared.update(params)
+		self.scope = scope
+		return scope
+
+	def leave(self, scope):
+		if scope is not None:
+			scope.seal()
+			self.scope = scope.parent
+
+	def declare(self, name):
+		self.scope.declared.add(name)
+		return self.scope.names[name]
+
+	def resolve(self, name, line=None):
+		# -> the places [(depth, slot), ...] name may be at, one when it is
+		# known; the list ends in None when no place is sure to be set
+		depth = 0
+		inline = True
+		places = []
+		scope = self.scope
+		while scope is not None:
+			slot = scope.names.get(name)
+			if slot is not None:
+				if name in scope.declared:
+					places.append((depth, slot))
+					return places
+				if not inline or scope.is_loop:
+					# an enclosing function's `var` that may not have run
+					# yet, or one of a `for` body run by an earlier iteration
+					scope.unset.add(slot)
+					places.append((depth, slot))
+			if scope.is_function:
+				inline = False
+			scope = scope.parent
+			depth += 1
+		if not places:
+			raise missing_variable(name, line)
+		places.append(None)
+		return places
+
+def find_place(env, places, name, line=None):
+	# -> (frame, slot) of the first place that is set
+	for place in places:
+		if place is None:
+			break
+		depth, slot = place
+		frame = env
+		for _ in range(depth):
+			frame = frame[0]
+		if frame[slot] is not UNSET:
+			return frame, slot
+	raise missing_variable(name, line)
@@ -0,0 +1,152 @@
+import threading
+
+import lst
+
+# Lazy sequences: neither is ever stored element by element, `for` and the
+# bulk primitives pull one element at a time.
+#
+# A Range is a...b, a..<b or a..>b with a step, what a `for` over a range
+# literal counts through, as a value. Over ints it is a Python range.
+#
+# A Generator is a call of a script function with yield. Iterating it runs
+# the function on a thread of its own, which hands each yielded value over
+# and waits until the next one is wanted, so only one of the two threads
+# runs at a time and the function is never ahead of the loop by more than
+# one value. Every iteration runs the function afresh; one that is left
+# early, by a break or an error, stops its thread at the pending yield.
+
+class Range(object):
+	__slots__ = ('start', 'end', 'step', 'closed')
+
+	def __init__(self, start, end, step=1, closed=False):
+		self.start = start
+		self.end = end
+		self.step = step
+		self.closed = closed
+
+	def ints(self):
+		# the Python range of a range over ints, None for one over floats
+		start, end, step = self.start, self.end, self.step
+		if type(start) is not int or type(end) is not int or type(step) is not int:
+			return None
+		if self.closed:
+			end += 1 if step > 0 else -1
+		return range(start, end, step)
+
+	def __iter__(self):
+		r = self.ints()
+		if r is not None:
+			return iter(r)
+		return self.count()
+
+	def count(self):
+		# as the for loop counts, by adding the step, so the floats agree
+		value, end, step, closed = self.start, self.end, self.step, self.closed
+		while value < end or (closed and value == end) if step > 0 else value > end or (closed and value == end):
+			yield value
+			value += step
+
+	def __len__(self):
+		r = self.ints()
+		if r is not None:
+			return len(r)
+		return sum(1 for _ in self.count())
+
+	def __repr__(self):
+		if self.closed:
+			op, step = '...', self.step
+		else:
+			op, step = '..<' if self.step > 0 else '..>', abs(self.step)
+		text = '{0}{1}{2}'.format(self.start, op, self.end)
+		return text if step == 1 else '{0} step {1}'.format(text, step)
+
+lst.IMMUTABLE.add(Range)
+
+class Stop(BaseException):
+	# raised at the pending yield of a generator nobody iterates any more;
+	# not an Exception so no engine takes it for a script error
+	pass
+
+DONE = object()
+
+class Channel(object):
+	# hands values from the thread running a generator to the one iterating
+	# it, each side waits on its own semaphore while the other one runs
+	__slots__ = ('body', 'value', 'error', 'stopped', 'producer', 'consumer')
+
+	def __init__(self, body):
+		self.body = body
+		self.value = None
+		self.error = None
+		self.stopped = False
+		self.producer = threading.Semaphore(0)
+		self.consumer = threading.Semaphore(0)
+
+	def run(self):
+		# on the generator's thread
+		producing.channel = self
+		self.producer.acquire()
+		try:
+			if not self.stopped:
+				self.body()
+		except Stop:
+			pass
+		except BaseException as e:
+			self.error = e
+		self.value = DONE
+		self.consumer.release()
+
+	def emit(self, value):
+		self.value = value
+		self.consumer.release()
+		self.producer.acquire()
+		if self.stopped:
+			raise Stop()
+
+	def next(self):
+		self.producer.release()
+		self.consumer.acquire()
+		if self.error is not None:
+			raise self.error
+		return self.value
+
+	def stop(self):
+		if self.value is not DONE:
+			self.stopped = True
+			self.producer.release()
+
+class Producing(threading.local):
+	channel = None
+
+producing = Producing()
+
+class Generator(object):
+	__slots__ = ('start',)
+
+	def __init__(self, start):
+		# start() is called where an iteration begins and returns what runs
+		# the function on the generator's thread
+		self.start = start
+
+	def __iter__(self):
+		channel = Channel(self.start())
+		threading.Thread(target=channel.run, daemon=True).start()
+		try:
+			while True:
+				value = channel.next()
+				if value is DONE:
+					return
+				yield value
+		finally:
+			channel.stop()
+
+	def __repr__(self):
+		return '<generator>'
+
+def emit(value):
+	# yield on the thread of a generator; -> False anywhere else
+	channel = producing.channel
+	if channel is None:
+		return False
+	channel.emit(value)
+	return True
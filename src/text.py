@@ -0,0 +1,68 @@
+import lst
+
+# Strings without copying. A CharView is a string seen as a list of its
+# characters from some position on: head, tail, isEmpty and length work as
+# on a list made by $string_to_char_list, but the view only holds the string
+# and an index, so a scan over it allocates one small object per step
+# instead of a cell per character up front. The tail of the last character
+# is the empty list.
+#
+# A StringBuilder collects pieces and joins them once, where `s += c` in a
+# loop copies the whole string on every step.
+
+class CharView(object):
+	__slots__ = ('string', 'pos', 'head')
+
+	def __init__(self, string, pos=0):
+		self.string = string
+		self.pos = pos
+		self.head = string[pos]
+
+	@property
+	def tail(self):
+		pos = self.pos + 1
+		if pos < len(self.string):
+			return CharView(self.string, pos)
+		return lst.EMPTY
+
+	def __len__(self):
+		return len(self.string) - self.pos
+
+	def __iter__(self):
+		return iter(self.string[self.pos:])
+
+	def __repr__(self):
+		return repr(list(self.string[self.pos:]))
+
+lst.IMMUTABLE.add(CharView)
+
+def chars(s):
+	return CharView(s) if s else lst.EMPTY
+
+class StringBuilder(object):
+	__slots__ = ('parts', 'length')
+
+	def __init__(self):
+		self.parts = []
+		self.length = 0
+
+	def add(self, s):
+		if type(s) is not str:
+			s = str(s)
+		self.parts.append(s)
+		self.length += len(s)
+
+	def text(self):
+		# joined once, later calls reuse the result
+		parts = self.parts
+		if len(parts) != 1:
+			s = ''.join(parts)
+			parts[:] = [s] if s else []
+		return parts[0] if parts else ''
+
+	def clear(self):
+		self.parts = []
+		self.length = 0
+
+	def __repr__(self):
+		return self.text()
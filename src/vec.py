@@ -0,0 +1,73 @@
+import files
+import lst
+import seq
+import text
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+# Native arrays: #[1, 2, 3] in a script. An Array is a Python list, so a[i]
+# and a[i] = x are O(1), push is amortized O(1) and the bulk primitives in
+# evaluator.py (map, filter, sum, sort, slicing) are single loops in C or
+# over a Python list. Unlike the lst lists an array is mutable.
+#
+# With NumPy installed a large array of only ints or only floats is sorted by
+# numpy.sort, stable like list.sort so the result is the same either way;
+# what doesn't fit an int64 or float64, or has a NaN, stays on list.sort.
+
+NUMPY_MIN_LENGTH = 1 << 12	# below this the conversions cost more than they save
+
+class Array(list):
+	__slots__ = ()
+
+	def __repr__(self):
+		return '#' + list.__repr__(self)
+
+	# list operations would return plain lists
+	def __add__(self, other):
+		return Array(list.__add__(self, other))
+
+	def __mul__(self, n):
+		return Array(list.__mul__(self, n))
+
+	__rmul__ = __mul__
+
+def array(*items):
+	return Array(items)
+
+def items(xs):
+	# the elements of an array, list, string, character view, range,
+	# generator, lines or file view, None for anything else
+	t = type(xs)
+	if t is Array or t is str:
+		return xs
+	if t is lst.Cons:
+		return lst.iterate(xs)
+	if t is text.CharView:
+		return xs.string[xs.pos:]
+	if t is seq.Range or t is seq.Generator or t is files.Lines or t is files.FileView:
+		return xs
+	return None
+
+def nth(xs, i):
+	# element i of a list, None if it is shorter
+	while type(xs) is lst.Cons and xs is not lst.EMPTY:
+		if i == 0:
+			return xs
+		xs = xs.tail
+		i -= 1
+	return None
+
+def sort(xs):
+	if numpy is not None and len(xs) >= NUMPY_MIN_LENGTH:
+		types = set(map(type, xs))
+		if types == {int} or types == {float}:
+			try:
+				values = numpy.array(xs, dtype=numpy.int64 if types == {int} else numpy.float64)
+			except OverflowError:
+				values = None
+			if values is not None and not (values.dtype == numpy.float64 and numpy.isnan(values).any()):
+				return Array(numpy.sort(values, kind='stable').tolist())
+	return Array(sorted(xs))
@@ -0,0 +1,267 @@
+import lst
+from evaluator import (FunctionType, EvalExeption, Instance, MISSING, data_member, for_items, lst_method, memo_cache,
+	range_step, running, set_index)
+from compiler import global_frame, export_globals
+from resolver import FRAME_HEADER, UNSET, find_place
+from bytecode import (
+	LOAD_CONST, LOAD_LOCAL, LOAD_OUTER, STORE_LOCAL, STORE_OUTER, POP, DUP,
+	JUMP, POP_JUMP_IF_FALSE, POP_JUMP_IF_TRUE, JUMP_UNLESS_TRUE, JUMP_UNLESS_FALSE,
+	CALL, RETURN_VALUE, RETURN_NONE, MAKE_FUNCTION, MAKE_INSTANCE,
+	PUSH_FRAME, POP_FRAME, GET_MEMBER, SET_MEMBER, CONTAINS,
+	RANGE_TEST, BINARY_ADD, GET_ITER, FOR_ITER, SET_INDEX, LOAD_NAME, STORE_NAME, LOOP_TEST,
+	DEPTH_SHIFT, SLOT_MASK,
+)
+
+# Stack VM for bytecode.py. Control flow is jumps within one instruction
+# list; a call to a user function saves (code, pc, env, memo) on a call stack
+# kept in a Python list, so neither loops nor script recursion use Python
+# frames. memo is None, or what the return stores in a memo function's cache.
+
+def is_function(fun):
+	return isinstance(fun, tuple) and len(fun) > 1 and fun[0] in FunctionType.VALUES
+
+def member_env(obj):
+	if isinstance(obj, Instance):
+		return obj.env
+	if is_function(obj):
+		# a function used as a namespace runs its body once, on first access
+		func = obj[1]
+		if 'instance' not in func:
+			func_env = func['scope'].new_frame(func['env'])
+			run(func['body'], func_env)
+			func['instance'] = func_env
+		return func['instance']
+	raise EvalExeption('Unknown reference')
+
+def find_member(code, pos, obj, name):
+	# returns (frame, slot); the slot is cached per instruction by Scope
+	frame = member_env(obj)
+	scope = frame[1]
+	cache = code.caches.get(pos)
+	if cache is not None and cache[0] is scope:
+		return frame, cache[1]
+	slot = scope.names.get(name)
+	if slot is None or frame[slot] is UNSET:
+		env = frame[0]
+		while env:
+			slot = env[1].names.get(name)
+			if slot is not None and env[slot] is not UNSET:
+				return env, slot
+			env = env[0]
+		raise EvalExeption('Cannot find variable: ' + name)
+	if slot not in scope.unset:
+		code.caches[pos] = (scope, slot)
+	return frame, slot
+
+def get_member(code, pos, obj, name):
+	if isinstance(obj, Instance) or is_function(obj):
+		frame, slot = find_member(code, pos, obj, name)
+		return frame[slot]
+	if isinstance(obj, lst.Cons):
+		return lst_method(obj, name)
+	return data_member(obj, name)
+
+def run(code, env):
+	stack = []
+	push = stack.append
+	pop = stack.pop
+	calls = []
+	ins = code.instructions
+	consts = code.constants
+	pc = 0
+	# an iteration of a loop is a step for the governor, as is a call
+	governor = running.governor
+	while True:
+		op = ins[pc]
+		arg = ins[pc + 1]
+		pc += 2
+		if op == LOAD_LOCAL:
+			push(env[arg])
+		elif op == LOAD_OUTER:
+			frame = env
+			for _ in range(arg >> DEPTH_SHIFT):
+				frame = frame[0]
+			push(frame[arg & SLOT_MASK])
+		elif op == LOAD_CONST:
+			push(consts[arg])
+		elif op == CALL:
+			if arg == 2:
+				y = pop()
+				x = pop()
+				fun = pop()
+				if fun[0] == FunctionType.PRIMITIVE:
+					push(fun[1](x, y))
+					continue
+				args = [x, y]
+			elif arg:
+				args = stack[-arg:]
+				del stack[-arg:]
+				fun = pop()
+			else:
+				args = []
+				fun = pop()
+			if fun[0] == FunctionType.PRIMITIVE:
+				push(fun[1](*args))
+			elif fun[0] == FunctionType.FUNCTION:
+				func = fun[1]
+				if len(func['parameters']) != len(args):
+					raise EvalExeption('error, make frames')
+				store = None
+				memo = func.get('memo')
+				if memo is not None:
+					key, value = memo.lookup(args)
+					if value is not MISSING:
+						push(value)
+						continue
+					if key is not None:
+						store = (memo, key, args)
+				if governor is not None:
+					governor.step(func['line'])
+				frame = func['scope'].new_frame(func['env'])
+				frame[FRAME_HEADER:FRAME_HEADER + len(args)] = args
+				if ins[pc] != RETURN_VALUE or store is not None:
+					calls.append((code, pc, env, store))
+				# else a tail call: the callee returns straight to our caller
+				code = func['body']
+				ins = code.instructions
+				consts = code.constants
+				pc = 0
+				env = frame
+			else:
+				raise EvalExeption('Unknown application')
+		elif op == STORE_LOCAL:
+			env[arg] = pop()
+		elif op == POP_JUMP_IF_FALSE:
+			if not pop():
+				pc = arg
+		elif op == JUMP:
+			pc = arg
+		elif op == RETURN_VALUE or op == RETURN_NONE:
+			val = pop() if op == RETURN_VALUE else None
+			if not calls:
+				return val
+			code, pc, env, store = calls.pop()
+			if store is not None:
+				store[0].store(store[1], store[2], val)
+			ins = code.instructions
+			consts = code.constants
+			push(val)
+		elif op == STORE_OUTER:
+			frame = env
+			for _ in range(arg >> DEPTH_SHIFT):
+				frame = frame[0]
+			frame[arg & SLOT_MASK] = pop()
+		elif op == POP:
+			pop()
+		elif op == DUP:
+			push(stack[-1])
+		elif op == PUSH_FRAME:
+			env = consts[arg].new_frame(env)
+		elif op == POP_FRAME:
+			env = env[0]
+		elif op == GET_MEMBER:
+			push(get_member(code, pc - 2, pop(), consts[arg]))
+		elif op == SET_MEMBER:
+			obj = pop()
+			frame, slot = find_member(code, pc - 2, obj, consts[arg])
+			frame[slot] = pop()
+		elif op == POP_JUMP_IF_TRUE:
+			if pop():
+				pc = arg
+		elif op == JUMP_UNLESS_TRUE:
+			if not stack[-1] == True:
+				pc = arg
+		elif op == JUMP_UNLESS_FALSE:
+			if not stack[-1] == False:
+				pc = arg
+		elif op == CONTAINS:
+			values = pop()
+			push(pop() in values)
+		elif op == LOAD_NAME:
+			name, places = consts[arg]
+			frame, slot = find_place(env, places, name, code.lines[pc // 2 - 1])
+			push(frame[slot])
+		elif op == STORE_NAME:
+			name, places = consts[arg]
+			frame, slot = find_place(env, places, name, code.lines[pc // 2 - 1])
+			frame[slot] = pop()
+		elif op == LOOP_TEST:
+			if not pop():
+				pc = arg
+			elif governor is not None:
+				governor.step(code.lines[pc // 2 - 1])
+		elif op == RANGE_TEST:
+			step = pop()
+			to_val = pop()
+			var_val = pop()
+			if step > 0:
+				push(var_val < to_val or (arg and var_val == to_val))
+			elif step < 0:
+				push(var_val > to_val or (arg and var_val == to_val))
+			else:
+				range_step(step)
+		elif op == BINARY_ADD:
+			y = pop()
+			push(pop() + y)
+		elif op == FOR_ITER:
+			# the iterator stays under the item, the loop stores both
+			it = stack[-1]
+			item = next(it, MISSING)
+			if item is MISSING:
+				pop()
+				pc = arg
+			else:
+				push(item)
+				if governor is not None:
+					governor.step(code.lines[pc // 2 - 1])
+		elif op == GET_ITER:
+			stack[-1] = for_items(stack[-1])
+		elif op == MAKE_FUNCTION:
+			fun_code = consts[arg]
+			func = {
+				'tag': 'function_value',
+				'name': fun_code.name,
+				'parameters': fun_code.parameters,
+				'body': fun_code,
+				'scope': fun_code.scope,
+				'env': env,
+				'line': fun_code.line,
+			}
+			if fun_code.memo:
+				func['memo'] = memo_cache(fun_code.name, fun_code.line, fun_code.memo)
+			push((FunctionType.FUNCTION, func))
+		elif op == SET_INDEX:
+			i = pop()
+			xs = pop()
+			set_index(xs, i, pop())
+		elif op == MAKE_INSTANCE:
+			push(Instance(env))
+		else:
+			raise EvalExeption('Unknown opcode {0}'.format(op))
+
+def call(fun, args):
+	# a call from Python, see evaluator.call_function
+	func = fun[1]
+	if len(func['parameters']) != len(args):
+		raise EvalExeption('error, make frames')
+	memo = func.get('memo')
+	if memo is not None:
+		key, value = memo.lookup(args)
+		if value is not MISSING:
+			return value
+	governor = running.governor
+	if governor is not None:
+		governor.step(func['line'])
+	frame = func['scope'].new_frame(func['env'])
+	frame[FRAME_HEADER:FRAME_HEADER + len(args)] = args
+	value = run(func['body'], frame)
+	if memo is not None and key is not None:
+		memo.store(key, args, value)
+	return value
+
+def execute(program, env):
+	frame = global_frame(program, env)
+	try:
+		return run(program.code, frame)
+	finally:
+		export_globals(program, frame, env)
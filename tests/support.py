@@ -0,0 +1,27 @@
+from evaluator import ENGINES, EvalExeption, Governor
+from interpreter import Interpreter
+from output import MemoryWriter
+
+# Runs a script and returns what it printed; a script error ends the output
+# with a line "error: <message>", so runs that fail can be compared too.
+# max_steps runs it under a fresh Governor with that step limit.
+
+def run(source, engine='tree', optimize=False, input=None, globals=None, max_steps=None):
+	out = MemoryWriter()
+	governor = Governor(max_steps=max_steps) if max_steps is not None else None
+	try:
+		Interpreter(engine, optimize).run(source, globals, governor, output=out, input=input)
+	except EvalExeption as e:
+		out.write('error: {0}\n'.format(e))
+	return out.getvalue()
+
+def run_all(source, input=None, max_steps=None, globals=None):
+	# engine name, with '-O' when optimized -> output
+	return dict(('{0}{1}'.format(engine, ' -O' if optimize else ''), run(source, engine, optimize, input, globals, max_steps))
+		for engine in ENGINES for optimize in (False, True))
+
+def same_on_all(source, input=None, max_steps=None, globals=None):
+	# the output every engine agrees on
+	outputs = run_all(source, input, max_steps, globals)
+	assert len(set(outputs.values())) == 1, outputs
+	return outputs['tree']
@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+import vec
+from support import same_on_all
+
+def test_literals_indexes_and_members():
+	source = '''var a = #[1, 2, 3]
+a[0] = 10
+a.push(4)
+print(a)
+print(a[0] + a[3])
+print(a.pop())
+print(a.length)
+print(#[].isEmpty)
+'''
+	assert same_on_all(source) == '#[10, 2, 3, 4]\n14\n4\n3\nTrue\n'
+
+def test_bulk_primitives():
+	source = '''func double(x) { return x * 2 }
+func odd(x) { return x % 2 == 1 }
+func neg(x) { return -x }
+var a = array([3, 1, 2])
+print(map(double, a))
+print(filter(odd, [1, 2, 3, 4, 5]))
+print(sum(a))
+print(sort(a))
+print(sort(a, neg))
+print(a)
+print(a[1:])
+print(a[:2])
+print(array(3, 0))
+'''
+	assert same_on_all(source) == '#[6, 2, 4]\n#[1, 3, 5]\n6\n#[1, 2, 3]\n#[3, 2, 1]\n#[3, 1, 2]\n#[1, 2]\n#[3, 1]\n#[0, 0, 0]\n'
+
+def test_arrays_are_not_lists():
+	assert same_on_all('var a = #[1]\nprint(a == [1])\nvar b = [1]\nb[0] = 2') == 'False\nerror: Only array elements can be assigned\n'
+
+@pytest.mark.parametrize('source, message', [
+	('#[1][1]', 'Index out of range: 1'),
+	('#[1][-1]', 'Index out of range: -1'),
+	('#[1]["a"]', "Index must be an integer: 'a'"),
+	('#[].pop()', 'Pop from an empty array'),
+	('#[1][-1:]', 'Slice bounds must be integers from 0: -1'),
+])
+def test_errors(source, message):
+	assert same_on_all(source) == 'error: {0}\n'.format(message)
+
+def test_large_sorts_keep_every_value():
+	n = vec.NUMPY_MIN_LENGTH * 2
+	for values in ([random.randrange(-n, n) for _ in range(n)], [random.random() for _ in range(n)], [1 << 70, 1] * n):
+		assert vec.sort(values) == sorted(values)
+
+def test_numpy_sort_is_list_sort():
+	pytest.importorskip('numpy')
+	values = [random.randrange(1 << 40) for _ in range(vec.NUMPY_MIN_LENGTH)]
+	assert vec.sort(values) == sorted(values)
+	# with a NaN it is list.sort, the same NaN object compares equal to itself
+	values = [float('nan'), 1.0, 0.5] * vec.NUMPY_MIN_LENGTH
+	assert vec.sort(values) == sorted(values)
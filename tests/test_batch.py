@@ -0,0 +1,31 @@
+import json
+import binast
+import optimizer
+from batch import load_program
+from interpreter import Interpreter
+from lexer import Lexer
+from nodes import to_json
+from parser import Parser
+
+SOURCE = 'var x = 2 * 3 + 1\nprint(x)\n'
+
+def script_files(directory):
+	# the same script as source text, a JSON AST and a binary AST
+	ast = Parser().parse(Lexer().tokenize(SOURCE))
+	paths = [directory / 'script.yjlo', directory / 'script.json', directory / 'script.yjab']
+	paths[0].write_text(SOURCE)
+	paths[1].write_text(json.dumps(to_json(ast)))
+	paths[2].write_bytes(binast.dumps(ast))
+	return [str(path) for path in paths]
+
+def test_optimize_applies_to_every_script_format(tmp_path):
+	expected = to_json(optimizer.optimize(Parser().parse(Lexer().tokenize(SOURCE))))
+	interpreter = Interpreter(optimize=True)
+	for path in script_files(tmp_path):
+		assert to_json(load_program(path, interpreter).ast) == expected, path
+
+def test_without_optimize_every_format_is_as_parsed(tmp_path):
+	expected = to_json(Parser().parse(Lexer().tokenize(SOURCE)))
+	interpreter = Interpreter()
+	for path in script_files(tmp_path):
+		assert to_json(load_program(path, interpreter).ast) == expected, path
@@ -0,0 +1,28 @@
+import json
+import os
+import subprocess
+import sys
+
+from evaluator import ENGINES
+
+SUITE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bench', 'suite.py')
+
+def suite(*args):
+	return subprocess.run([sys.executable, SUITE] + list(args), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+		universal_newlines=True)
+
+def test_results_and_comparison(tmp_path):
+	out = str(tmp_path / 'results.json')
+	assert suite('bmi', '-r', '1', '-o', out).returncode == 0
+	with open(out) as f:
+		results = json.load(f)
+	assert list(results['workloads']) == ['bmi'] and results['repeat'] == 1
+	bmi = results['workloads']['bmi']
+	assert bmi['tokens'] > 0 and bmi['tokenize_s'] > 0 and bmi['parse_peak_bytes'] > 0
+	assert sorted(bmi['engines']) == sorted(ENGINES)
+	compared = suite('bmi', '-r', '1', '-e', 'vm', '-O', '-o', str(tmp_path / 'again.json'), '--compare', out)
+	assert compared.returncode == 0 and 'vs base' in compared.stdout
+
+def test_unknown_workload(tmp_path):
+	result = suite('nope', '-o', str(tmp_path / 'results.json'))
+	assert result.returncode != 0 and 'unknown workload nope' in result.stderr
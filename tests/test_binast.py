@@ -0,0 +1,48 @@
+import glob
+import json
+import os
+
+import pytest
+
+import binast
+from interpreter import Interpreter
+from nodes import from_json
+
+EXAMPLES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'example', '*.json')))
+
+def example(path):
+	with open(path) as f:
+		return json.load(f)
+
+@pytest.mark.parametrize('path', EXAMPLES, ids=os.path.basename)
+def test_examples_convert_without_loss(path):
+	source = example(path)
+	data = binast.json_to_binary(source)
+	assert binast.is_binary(data) and len(data) < len(json.dumps(source)) // 4
+	assert binast.binary_to_json(data) == source
+
+@pytest.mark.parametrize('path', EXAMPLES, ids=os.path.basename)
+def test_statements_decode_one_at_a_time(path, tmp_path):
+	ast = from_json(example(path))
+	out = tmp_path / 'program.yjab'
+	out.write_bytes(binast.dumps(ast))
+	with binast.open_file(str(out)) as f:
+		assert len(f) == len(ast)
+		assert f.statement(len(ast) - 1) == ast[-1]
+		assert list(f) == ast
+		assert f.program() == ast
+
+def test_values_and_lines():
+	ast = Interpreter().parse('var a = [-1, 0, 127, 128, 1 << 70, 2.5, "é", true, null]\n\n\nvar b = a\nvar c = b')
+	assert binast.loads(binast.dumps(ast)) == ast
+	# the parser wraps every top-level `var` in a list of its own
+	assert [s[0].line for s in binast.loads(binast.dumps(ast))] == [1, 4, 5]
+
+@pytest.mark.parametrize('data, message', [
+	(b'YJ', 'too short'),
+	(b'XXXX' + bytes(20), 'bad magic'),
+	(b'YJAB\x09\x00' + bytes(18), 'Unsupported binary AST version: 9'),
+])
+def test_not_a_binary_ast(data, message):
+	with pytest.raises(ValueError, match=message):
+		binast.AstFile(data)
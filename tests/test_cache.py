@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+EXAMPLE = os.path.join(SRC, '..', 'example', 'bmi.json')
+
+def run(tmp_path, args, **env):
+	environ = dict(os.environ)
+	environ.pop('YJLO_CACHE_DIR', None)
+	environ.update(XDG_CACHE_HOME=str(tmp_path / 'xdg'), **env)
+	subprocess.run([sys.executable] + args, cwd=SRC, env=environ, input='70\n180\n',
+		stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+
+def cached(directory):
+	return sorted(os.listdir(str(directory))) if directory.exists() else []
+
+def test_nothing_is_cached_by_default(tmp_path):
+	run(tmp_path, ['main.py'])
+	run(tmp_path, ['evaluator.py', EXAMPLE])
+	assert not (tmp_path / 'xdg').exists()
+
+def test_cache_flags(tmp_path):
+	run(tmp_path, ['evaluator.py', EXAMPLE, '--cache'])
+	assert len(cached(tmp_path / 'xdg' / 'yjlo-script')) == 1
+	run(tmp_path, ['evaluator.py', EXAMPLE, '--cache-dir', str(tmp_path / 'dir')])
+	assert len(cached(tmp_path / 'dir')) == 1
+
+def test_cache_from_the_environment(tmp_path):
+	directory = tmp_path / 'env'
+	run(tmp_path, ['main.py'], YJLO_CACHE_DIR=str(directory))
+	assert len(cached(directory)) == 1
+	run(tmp_path, ['evaluator.py', EXAMPLE, '--no-cache'], YJLO_CACHE_DIR=str(tmp_path / 'none'))
+	assert cached(tmp_path / 'none') == []
@@ -0,0 +1,43 @@
+import sys
+
+import cek
+from support import run
+
+# The cek engine keeps its continuation in a list of tasks, so a script may
+# recurse deeper than Python would let evaluate() go, and a self tail call
+# leaves the task list as long as it was.
+
+DEPTH = '''func depth(n) {
+	if n == 0 { return 0 }
+	return 1 + depth(n - 1)
+}
+print(depth(N))
+'''
+
+COUNT = '''func count(n, total) {
+	if n == 0 { return total }
+	return count(n - 1, total + 1)
+}
+print(count(N, 0))
+'''
+
+def most_tasks(monkeypatch, source, n):
+	# the longest the task list gets while the script runs
+	push_stmt = cek.push_stmt
+	most = [0]
+	def recording(stmt, env, tasks):
+		push_stmt(stmt, env, tasks)
+		most[0] = max(most[0], len(tasks))
+	monkeypatch.setattr(cek, 'push_stmt', recording)
+	assert run(source.replace('N', str(n)), 'cek') == '{0}\n'.format(n)
+	return most[0]
+
+def test_recursion_deeper_than_the_python_stack():
+	n = sys.getrecursionlimit() * 10
+	assert run(DEPTH.replace('N', str(n)), 'cek') == '{0}\n'.format(n)
+
+def test_tail_calls_run_in_constant_space(monkeypatch):
+	assert most_tasks(monkeypatch, COUNT, 10) == most_tasks(monkeypatch, COUNT, 1000)
+
+def test_other_calls_stack_up(monkeypatch):
+	assert most_tasks(monkeypatch, DEPTH, 1000) > 1000
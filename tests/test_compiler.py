@@ -0,0 +1,57 @@
+import compiler
+from evaluator import init_env
+from interpreter import Interpreter
+from support import run
+
+COUNTER = '''func counter() {
+	var n = 0
+	func next() {
+		n += 1
+		return n
+	}
+	return next
+}
+var a = counter()
+var b = counter()
+a()
+print(a())
+print(b())
+'''
+
+SWITCH = '''func name(n) {
+	switch n {
+	case 1:
+		return "one"
+	case 2:
+		fallthrough
+	case 3:
+		return "two or three"
+	default:
+		return "many"
+	}
+}
+for i in 1...4 {
+	print(name(i))
+}
+'''
+
+def test_closures_keep_their_own_frames():
+	assert run(COUNTER, 'closure') == run(COUNTER, 'tree') == '2\n1\n'
+
+def test_switch_and_fallthrough():
+	assert run(SWITCH, 'closure') == run(SWITCH, 'tree') == 'one\ntwo or three\ntwo or three\nmany\n'
+
+def test_a_program_is_compiled_once_per_globals():
+	interpreter = Interpreter('closure')
+	program = interpreter.compile('var x = limit * 2')
+	code = program.compiled('closure', {'limit': 1})
+	assert program.compiled('closure', {'limit': 2}) is code
+	assert program.compiled('closure', {'limit': 1, 'step': 1}) is not code
+	assert interpreter.run(program, {'limit': 1})['x'] == 2
+	assert interpreter.run(program, {'limit': 5})['x'] == 10
+
+def test_compile_program_against_the_builtins():
+	ast = Interpreter().parse('var x = [1, 2, 3].length + 1')
+	env = init_env()
+	compiler.execute(compiler.compile_program(ast, list(env[1])), env)
+	assert env[1]['x'] == 4
@@ -0,0 +1,47 @@
+import glob
+import os
+
+import pytest
+
+from batch import load_program
+from evaluator import ENGINES
+from interpreter import Interpreter
+from support import run
+
+# The example programs, as source and as JSON ASTs, and the bench workloads
+# print the same on every engine, optimized or not. The examples read their
+# input from what bench/suite.py gives them.
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+EXAMPLES = sorted(glob.glob(os.path.join(ROOT, 'example', '*.yjlo')) + glob.glob(os.path.join(ROOT, 'example', '*.json')))
+WORKLOADS = sorted(glob.glob(os.path.join(ROOT, 'bench', 'workloads', '*.yjlo')))
+INPUTS = {
+	'bmi': '70\n180\n',
+	'exp_eval': '1+2*3\n(4-1)*2\n12 * (3 + 4) - 100 / 7\n((((1+2)*3)-4)/5)%6\nexit\n',
+}
+
+def name_of(path):
+	return os.path.splitext(os.path.basename(path))[0]
+
+def outputs(path):
+	found = {}
+	for optimize in (False, True):
+		program = load_program(path, Interpreter(optimize=optimize))
+		for engine in ENGINES:
+			found['{0}{1}'.format(engine, ' -O' if optimize else '')] = run(program, engine, optimize, INPUTS.get(name_of(path), ''))
+	return found
+
+def agreed(path):
+	found = outputs(path)
+	assert len(set(found.values())) == 1, found
+	assert 'error: ' not in found['tree'], found['tree']
+	return found['tree']
+
+@pytest.mark.parametrize('path', EXAMPLES + WORKLOADS, ids=os.path.basename)
+def test_engines_agree(path):
+	assert agreed(path)
+
+@pytest.mark.parametrize('name', sorted(set(name_of(path) for path in EXAMPLES)))
+def test_source_and_json_agree(name):
+	directory = os.path.join(ROOT, 'example')
+	assert agreed(os.path.join(directory, name + '.yjlo')) == agreed(os.path.join(directory, name + '.json'))
@@ -0,0 +1,42 @@
+from support import same_on_all
+
+def numbers(tmp_path):
+	path = tmp_path / 'numbers.txt'
+	path.write_text('1\n2\n30')
+	return {'path': str(path)}
+
+def test_read_and_lines_of_a_file(tmp_path):
+	source = '''print(read(path).length)
+print(sum(map(int, lines(path))))
+var n = 0
+var ls = lines(path)
+for l in ls { n += 1 }
+for l in ls { n += 1 }
+print(n)
+'''
+	assert same_on_all(source, globals=numbers(tmp_path)) == '6\n33\n6\n'
+
+def test_stdin_goes_on_where_it_stopped():
+	source = 'print(input())\nfor l in lines() { print(l) }\nprint(read() == "")'
+	assert same_on_all(source, input='a\nb\nc') == 'a\nb\nc\nTrue\n'
+
+def test_file_views(tmp_path):
+	source = '''var v = mmap(path)
+print(v.length)
+print(v[0])
+print(v[0:3])
+print(v.find("30"))
+for l in v.lines { print(l) }
+v.close()
+print(v[0])
+'''
+	globals = numbers(tmp_path)
+	expected = '6\n49\n1\n2\n4\n1\n2\n30\nerror: The file view of {0} is closed\n'.format(globals['path'])
+	assert same_on_all(source, globals=globals) == expected
+
+def test_missing_files(tmp_path):
+	globals = {'path': str(tmp_path / 'missing.txt')}
+	message = 'error: Cannot read {0}: No such file or directory\n'.format(globals['path'])
+	for name in ('read', 'lines', 'mmap'):
+		assert same_on_all('{0}(path)'.format(name), globals=globals) == message
+	assert same_on_all('read(1)') == 'error: Not a file name: 1\n'
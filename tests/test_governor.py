@@ -0,0 +1,30 @@
+from support import same_on_all
+from interpreter import Interpreter
+
+# A step is an iteration of a loop, at the line of the loop, or a call of a
+# script function, at the line of its definition.
+
+def test_while_loop():
+	source = 'var x = 0\nwhile true {\n\tx += 1\n\tprint(x)\n}'
+	assert same_on_all(source, max_steps=3) == '1\n2\n3\nerror: Step limit of 3 exceeded (line 2)\n'
+
+def test_for_range_loop():
+	source = 'print("go")\nfor i in 0..<100 {\n\tprint(i)\n}'
+	assert same_on_all(source, max_steps=3) == 'go\n0\n1\n2\nerror: Step limit of 3 exceeded (line 2)\n'
+
+def test_for_in_loop():
+	source = 'var xs = [1, 2, 3, 4]\n\nfor x in xs {\n\tif x == 2 { continue }\n\tprint(x)\n}'
+	assert same_on_all(source, max_steps=3) == '1\n3\nerror: Step limit of 3 exceeded (line 3)\n'
+
+def test_recursion():
+	source = '\nfunc f(n) {\n\tprint(n)\n\treturn f(n + 1)\n}\n\nf(0)'
+	assert same_on_all(source, max_steps=3) == '0\n1\n2\nerror: Step limit of 3 exceeded (line 2)\n'
+
+def test_loops_that_end_within_the_limit():
+	source = 'var t = 0\nfor i in 0..<3 { t += i }\nwhile t > 0 { t -= 1 }\nprint(t)'
+	assert same_on_all(source, max_steps=6) == '0\n'
+
+def test_function_values_carry_their_line():
+	for engine in ('tree', 'closure', 'cek', 'vm'):
+		env = Interpreter(engine).run('var x = 1\n\nfunc f() { return x }')
+		assert env['f'][1]['line'] == 3, engine
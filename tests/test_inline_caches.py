@@ -0,0 +1,61 @@
+import threading
+import evaluator
+from evaluator import ENGINES, bind_operator, plus, running
+from interpreter import Interpreter
+from nodes import Kind
+
+def operator_site(program):
+	# the node of the first `+` in a program of one `var`
+	return program.ast[0][0].right
+
+def test_host_operator_binding_on_every_engine():
+	for engine in ENGINES:
+		result = Interpreter(engine).run('var r = 1 + 2', {'+': lambda x, y: 42})
+		assert result['r'] == 42, engine
+
+def test_binding_stays_within_its_run():
+	interpreter = Interpreter('tree')
+	interpreter.run('var r = 1 + 2', {'+': lambda x, y: 42})
+	assert running.inline_caches
+	program = interpreter.compile('var r = 1 + 2')
+	interpreter.run(program)
+	# specialized on ints, which only the cached path does
+	assert operator_site(program).cache.left is int
+
+def test_a_miss_makes_a_new_site():
+	program = Interpreter('tree').compile('var r = 1 + 2')
+	node = operator_site(program)
+	assert node.kind == Kind.APPLY
+	site = node.cache = bind_operator(node)
+	assert site.guarded and site.left is None
+	assert site.miss(node, 1, 2) == 3
+	specialized = node.cache
+	assert specialized is not site and specialized.left is int and specialized.guarded
+	# the old site is as it was, for a thread still holding it
+	assert site.fun is plus and site.left is None
+	for i in range(evaluator.MAX_CACHE_MISSES):
+		node.cache.miss(node, 'a', 'b')
+	generic = node.cache
+	assert generic.fun is plus and not generic.guarded
+	assert specialized.fun is not plus and specialized.left is int
+
+def test_concurrent_misses_on_a_shared_program():
+	interpreter = Interpreter('tree')
+	program = interpreter.compile('''func add(a, b) { return a + b }
+var r = 0
+for i in 0..<300 {
+	if (i + k) % 3 == 0 { r = add("x", "y") } else { if (i + k) % 3 == 1 { r = add(1.5, 2) } else { r = add(i, 1) } }
+}''')
+	errors = []
+	def work(k):
+		try:
+			for _ in range(20):
+				interpreter.run(program, {'k': k})
+		except Exception as e:
+			errors.append(e)
+	threads = [threading.Thread(target=work, args=(k,)) for k in range(6)]
+	for t in threads:
+		t.start()
+	for t in threads:
+		t.join()
+	assert errors == []
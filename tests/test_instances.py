@@ -0,0 +1,30 @@
+from support import same_on_all
+
+# An instance is built once, by running its class body; reading a member,
+# calling a method or assigning a member uses that instance from then on.
+
+POINT = '''class Point {
+	print("body")
+	var x
+	var y = 0
+	@(x_) {
+		x = x_
+	}
+	func move(dx) {
+		x += dx
+		return x
+	}
+}
+'''
+
+def test_the_body_runs_once_per_instance():
+	source = POINT + 'var p = Point(1)\nprint(p.x)\nprint(p.x + p.y)\nprint(p.move(2))\nvar q = Point(5)\nprint(q.x)'
+	assert same_on_all(source) == 'body\n1\n1\n3\nbody\n5\n'
+
+def test_member_assignment_changes_the_instance():
+	source = POINT + 'var p = Point(1)\nvar q = Point(1)\np.x = 10\np.y += 1\nprint(p.move(1))\nprint(p.y)\nprint(q.x)'
+	assert same_on_all(source) == 'body\nbody\n11\n1\n1\n'
+
+def test_instances_in_a_list_stay_the_same():
+	source = POINT + 'var ps = [Point(1), Point(2)]\nps.head.move(5)\nprint(ps.head.x)\nprint(ps.tail.head.x)'
+	assert same_on_all(source) == 'body\nbody\n6\n2\n'
@@ -0,0 +1,24 @@
+from interpreter import Interpreter
+
+def test_run_leaves_the_globals_as_they_were():
+	log = []
+	add = lambda x: log.append(x)
+	for engine in ('tree', 'closure', 'cek', 'vm'):
+		interpreter = Interpreter(engine)
+		program = interpreter.compile('add(limit)\nvar total = limit + 1\nlimit = 0')
+		globals = {'limit': 10, 'add': add}
+		for _ in range(2):
+			result = interpreter.run(program, globals)
+			assert result['total'] == 11 and result['limit'] == 0, engine
+		assert globals == {'limit': 10, 'add': add}, engine
+	assert log == [10] * 8
+
+def test_globals_shadowing_a_builtin_are_not_folded_away():
+	globals = {'+': lambda x, y: 42, 'true': 7}
+	for engine in ('tree', 'closure', 'cek', 'vm'):
+		for optimize in (False, True):
+			interpreter = Interpreter(engine, optimize)
+			program = interpreter.compile('var r = 1 + 2\nvar t = true\nvar s = 2 * 3')
+			result = interpreter.run(program, globals)
+			assert (result['r'], result['t'], result['s']) == (42, 7, 6), (engine, optimize)
+			assert interpreter.run(program)['r'] == 3, (engine, optimize)
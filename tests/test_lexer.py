@@ -0,0 +1,32 @@
+import glob
+import io
+import os
+
+import pytest
+
+from lexer import Lexer, tokenize_file
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SCRIPTS = sorted(glob.glob(os.path.join(ROOT, 'example', '*.yjlo')) + glob.glob(os.path.join(ROOT, 'bench', 'workloads', '*.yjlo')))
+
+def tokens(tokens):
+	return [(t.type, t.value, t.line) for t in tokens]
+
+@pytest.mark.parametrize('path', SCRIPTS, ids=os.path.basename)
+def test_scan_matches_tokenize(path):
+	with open(path) as f:
+		source = f.read()
+	expected = tokens(Lexer().tokenize(source))
+	assert tokens(Lexer().scan(source)) == expected
+	assert tokens(Lexer().stream(io.StringIO(source), 7)) == expected
+	assert tokens(tokenize_file(path)) == expected
+
+def test_unterminated_string():
+	with pytest.raises(Exception, match=r'\[Lexer\] Unterminated string\.'):
+		list(Lexer().scan("print('abc)"))
+
+def test_lines_after_a_multiline_string():
+	assert tokens(Lexer().scan('var s = `a\nb`\nx'))[-2:] == tokens(Lexer().scan('var s = 1\n\nx'))[-2:]
+
+def test_number_before_a_dot_at_the_end():
+	assert [t.value for t in Lexer().scan('1.')] == [1, '.', None]
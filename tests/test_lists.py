@@ -0,0 +1,64 @@
+import sys
+
+import lst
+import vec
+from support import same_on_all
+
+def test_list_is_not_equal_to_other_values():
+	assert not lst.EMPTY == None
+	assert not lst.EMPTY == []
+	assert not lst.lst(1, 2) == 1
+	assert lst.lst(1, 2) != 1
+	assert not vec.Array([1]) == lst.lst(1)
+
+def test_lists_compare_by_their_cells():
+	assert lst.lst(1, 2) == lst.lst(1, 2)
+	assert lst.pair(1, 2) == lst.pair(1, 2)
+	assert lst.lst(1, 2) != lst.lst(1)
+	assert lst.pair(1, lst.pair(2, 3)) != lst.pair(1, 2)
+
+def test_list_against_null_in_scripts():
+	assert same_on_all('var xs = [1]\nprint(xs == null)\nprint(xs != null)\nprint(xs == 1)') == 'False\nTrue\nFalse\n'
+
+def test_list_operand_of_logic():
+	# as before lists had equality: a list is not == true, nor == false
+	assert same_on_all('var xs = [1]\nprint(xs && 1)\nprint(xs || 2)') == 'None\n[1]\n'
+
+def test_switch_on_a_list():
+	source = '''var xs = [1, 2]
+switch xs {
+	case 1, "a": print("one")
+	default: print("none")
+}
+switch [] {
+	case 0: print("zero")
+	default: print("empty")
+}'''
+	assert same_on_all(source) == 'none\nempty\n'
+
+def test_cells_know_their_length_and_ending():
+	xs = lst.from_sequence(range(5))
+	assert (xs.length, xs.proper, lst.is_lst(xs)) == (5, True, True)
+	assert (xs.tail.length, lst.length(lst.EMPTY), lst.is_lst(lst.EMPTY)) == (4, 0, True)
+	ys = lst.pair(1, lst.pair(2, 3))
+	assert (ys.length, ys.proper, lst.is_lst(ys), lst.is_pair(ys)) == (2, False, False, True)
+	assert lst.lst2arr(xs) == [0, 1, 2, 3, 4]
+
+def test_lists_longer_than_the_recursion_limit():
+	n = sys.getrecursionlimit() * 10
+	xs = lst.from_sequence(range(n))
+	assert lst.lst2arr(xs) == list(range(n)) and repr(xs).startswith('[0, 1, 2')
+	assert xs == lst.from_sequence(range(n))
+	source = '''var xs = []
+for i in 0..<{0} {{
+	xs = (i, xs)
+}}
+var n = 0
+for x in xs {{
+	n += 1
+}}
+print(n)
+print(xs.length)
+print($string_to_char_list("abc"))
+'''.format(n)
+	assert same_on_all(source) == "{0}\n{0}\n['a', 'b', 'c']\n".format(n)
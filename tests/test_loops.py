@@ -0,0 +1,62 @@
+import sys
+
+from support import same_on_all
+
+# Loops run in constant Python stack on every engine, so one that goes round
+# more often than the recursion limit allows frames still ends.
+
+def test_long_loops_do_not_recurse():
+	count = sys.getrecursionlimit() * 4
+	source = '''var n = 0
+var i = 0
+while i < {0} {{
+	i += 1
+	n += 1
+}}
+for j in 0..<{0} {{
+	n += 1
+}}
+for x in $range(0, {0}, false) {{
+	n += 1
+}}
+print(n)
+'''.format(count)
+	assert same_on_all(source) == '{0}\n'.format(count * 3)
+
+def test_break_and_continue():
+	source = '''var i = 0
+while true {
+	i += 1
+	if i % 2 == 0 { continue }
+	if i > 7 { break }
+	print(i)
+}
+for j in 0..<10 {
+	if j < 7 { continue }
+	print(j)
+	break
+}
+for x in [1, 2, 3, 4] {
+	if x == 2 { continue }
+	if x == 4 { break }
+	print(x)
+}
+'''
+	assert same_on_all(source) == '1\n3\n5\n7\n7\n1\n3\n'
+
+def test_return_from_inside_loops():
+	source = '''func find(xs, y) {
+	var i = 0
+	for x in xs {
+		while true {
+			if x == y { return i }
+			break
+		}
+		i += 1
+	}
+	return -1
+}
+print(find([5, 6, 7], 7))
+print(find([5, 6, 7], 8))
+'''
+	assert same_on_all(source) == '2\n-1\n'
@@ -0,0 +1,57 @@
+import pytest
+
+import lst
+import vec
+from evaluator import EvalExeption, init_env, memo_key, run_ast
+from interpreter import Interpreter
+from profiler import Profiler
+from support import same_on_all
+
+FIB = 'memo func fib(n) {\n\tif n < 2 { return n }\n\treturn fib(n - 1) + fib(n - 2)\n}\nvar x = fib(20)'
+
+def counts(interpreter):
+	return [(stats['name'], stats['line'], stats['hits'], stats['misses']) for stats in interpreter.memo_stats()]
+
+def test_each_interpreter_counts_its_own_runs():
+	for engine in ('tree', 'closure', 'cek', 'vm'):
+		first, second = Interpreter(engine), Interpreter(engine)
+		program = first.compile(FIB)
+		assert first.run(program)['x'] == 6765
+		assert counts(first) == [('fib', 1, 18, 21)], engine
+		assert counts(second) == []
+		first.run(program)
+		second.run(program)
+		assert counts(first) == [('fib', 1, 36, 42)], engine
+		assert counts(second) == [('fib', 1, 18, 21)], engine
+
+def test_runs_outside_an_interpreter_count_nowhere():
+	interpreter = Interpreter()
+	run_ast(interpreter.compile(FIB).ast, init_env())
+	assert counts(interpreter) == []
+
+def test_profiler_counts_memo_calls():
+	ast = Interpreter().compile(FIB).ast
+	profiler = Profiler()
+	with profiler:
+		run_ast(ast, init_env())
+	assert profiler.memo == {('fib', 1): [18, 21, 0, 0]}
+
+@pytest.mark.parametrize('source, reason', [
+	('memo func f(xs, n) {\n\tvar g = xs.head\n\treturn g(n)\n}', 'calls g, which is not a known function (line 3)'),
+	('memo func f(g, n) {\n\treturn g(n)\n}', 'calls g, which is not a known function (line 2)'),
+	('memo func f(xs, n) {\n\treturn (xs.head)(n)\n}', 'calls a computed function (line 2)'),
+])
+def test_calls_through_values_are_not_pure(source, reason):
+	with pytest.raises(EvalExeption) as e:
+		Interpreter().compile(source)
+	assert str(e.value) == 'Cannot memoize f (line 1): it ' + reason
+
+def test_calls_of_nested_functions_are_pure():
+	Interpreter().compile('memo func f(n) {\n\tfunc g(m) { return m + 1 }\n\treturn g(n)\n}')
+
+def test_lists_holding_mutable_values_are_not_keys():
+	assert memo_key((lst.lst(1, lst.lst('a', 2.5)),)) is not None
+	assert memo_key((lst.lst(1, vec.array(2)),)) is None
+	assert memo_key((lst.Cons(1, vec.array(2)),)) is None
+	source = 'memo func first(xs) { return xs.head[0] }\nvar a = #[1]\nvar xs = [a]\nprint(first(xs))\na[0] = 2\nprint(first(xs))'
+	assert same_on_all(source) == '1\n2\n'
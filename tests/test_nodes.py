@@ -0,0 +1,35 @@
+import glob
+import json
+import os
+import sys
+
+import pytest
+
+from nodes import Kind, Variable, from_json, to_json
+
+EXAMPLES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'example', '*.json')))
+
+@pytest.mark.parametrize('path', EXAMPLES, ids=os.path.basename)
+def test_examples_convert_without_loss(path):
+	with open(path) as f:
+		source = json.load(f)
+	assert to_json(from_json(source)) == source
+
+def test_nodes_are_slotted_with_interned_names():
+	node = from_json({'tag': 'variable', 'line': 3, 'name': ''.join(['co', 'unt']), 'type': 'variable'})
+	assert node == Variable('count', 'variable', 3) and node.kind == Kind.VAR
+	assert node.name is sys.intern('count')
+	assert not hasattr(node, '__dict__')
+
+def test_optional_fields_may_be_left_out():
+	obj = {'tag': 'var_definition', 'left': 'x', 'right': 1}
+	assert to_json(from_json(obj)) == obj
+
+@pytest.mark.parametrize('obj, message', [
+	({'tag': 'nope'}, 'Unknown AST tag: nope'),
+	({'tag': 'var_definition', 'right': 1}, 'Missing AST field: var_definition.left'),
+	({'tag': 'var_definition', 'left': 'x', 'right': 1, 'extra': 2}, 'Unknown AST field: var_definition.extra'),
+])
+def test_malformed_nodes(obj, message):
+	with pytest.raises(ValueError, match=message):
+		from_json(obj)
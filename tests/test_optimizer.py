@@ -0,0 +1,55 @@
+import pytest
+
+import optimizer
+from interpreter import Interpreter
+from nodes import Apply, Return, Variable, VarDef
+from support import same_on_all
+
+def optimized(source, shadowed=()):
+	return optimizer.optimize(Interpreter().parse(source), shadowed)
+
+def value_of(source, shadowed=()):
+	# the right side of the last var
+	return optimized(source, shadowed)[-1].right
+
+def op(name, x, y, line=1):
+	return Apply(Variable(name, 'operator', line), [x, y], line)
+
+@pytest.mark.parametrize('source, value', [
+	('var x = 1 + 2 * 3', 7),
+	('var x = "a" * 3', 'aaa'),
+	('var x = -(4 % 3)', -1),
+	('var x = true && 1', 1),
+	('var x = false || 2 < 1', False),
+	('var x = int(2.5) + round(1.25, 1)', 3.2),
+])
+def test_constants_fold(source, value):
+	assert value_of(source) == value
+
+@pytest.mark.parametrize('source', [
+	'var x = 1 / 0',
+	'var x = 2 ** 100',
+	'var x = "a" * 1000',
+])
+def test_failures_and_large_results_are_left_for_run_time(source):
+	assert isinstance(value_of(source), Apply)
+
+def test_names_bound_anywhere_are_not_folded():
+	assert value_of('func f(int) {\n\treturn int\n}\nvar x = int(2.5)') == Apply(Variable('int', 'variable', 4), [2.5], 4)
+	assert value_of('var true = 3\nvar x = true') == Variable('true', 'variable', 2)
+	assert value_of('var x = 1 + 2', shadowed=('+',)) == op('+', 1, 2)
+
+def test_dead_branches_go():
+	assert optimized('if true { print(1) } else { print(2) }') == [Apply(Variable('print', 'variable', 1), [1], 1)]
+	assert optimized('while false { print(1) }') == []
+	assert optimized('switch 2 {\ncase 1:\n\tprint(1)\ncase 2:\n\tprint(2)\n}')[0].cases[0].value == (2,)
+	body = optimized('func f() {\n\treturn 1\n\tprint(2)\n}')[0].right.body
+	assert body == [Return(1, 2)]
+
+def test_square_becomes_a_product():
+	y = Variable('y', 'variable', 2)
+	assert value_of('var y = 2\nvar x = y ** 2') == op('*', y, y, 2)
+
+def test_optimized_programs_print_the_same():
+	source = 'var y = 3\nprint(y ** 2 + 2 * 3)\nif 1 < 2 { print("yes") }\nprint("ab" * 2)'
+	assert same_on_all(source) == '15\nyes\nabab\n'
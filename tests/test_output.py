@@ -0,0 +1,72 @@
+import pytest
+
+import lst
+import vec
+from interpreter import Interpreter
+from output import CallbackWriter, FileWriter, MemoryWriter, Sink, sink_for, write_repr
+
+PROGRAM = 'print("a", 1)\nprint([1, [2, "b"]], #[3])\nprint((1, 2))'
+PRINTED = "a\n1\n[1, [2, 'b']]\n#[3]\n[1, 2]\n"
+
+def test_every_kind_of_output(tmp_path, capsys):
+	interpreter = Interpreter()
+	program = interpreter.compile(PROGRAM)
+	out = MemoryWriter()
+	interpreter.run(program, output=out)
+	pieces = []
+	interpreter.run(program, output=pieces.append)
+	path = str(tmp_path / 'out.txt')
+	with open(path + '.open', 'w') as f:
+		interpreter.run(program, output=FileWriter(f))
+	# a sink given to a run is the caller's to close
+	sink = Sink(FileWriter(path))
+	interpreter.run(program, output=sink)
+	sink.close()
+	assert out.getvalue() == ''.join(pieces) == PRINTED
+	for name in (path, path + '.open'):
+		with open(name) as f:
+			assert f.read() == PRINTED
+	assert capsys.readouterr().out == ''
+
+def test_buffering():
+	flushes = []
+	sink = Sink(CallbackWriter(flushes.append), buffer_size=8)
+	sink.print('a')
+	sink.print('b')
+	assert flushes == []
+	sink.print('c', 'd')
+	assert flushes == ['a\nb\nc\nd\n']
+	sink.write('e')
+	sink.flush()
+	assert flushes == ['a\nb\nc\nd\n', 'e']
+
+def test_line_policy_flushes_every_print():
+	flushes = []
+	sink = Sink(CallbackWriter(flushes.append), flush='line')
+	sink.print('a', 'b')
+	sink.print('c')
+	assert flushes == ['a\nb\n', 'c\n']
+
+def written(x):
+	pieces = []
+	write_repr(x, pieces.append)
+	return ''.join(pieces)
+
+def test_lists_are_written_as_their_repr():
+	a = vec.array(1, lst.lst('x', 2.5))
+	a.append(a)
+	for x in (lst.EMPTY, lst.lst(1, lst.lst(2)), lst.pair(1, lst.pair(2, 3)), vec.Array(range(1000)), a):
+		assert written(x) == repr(x)
+
+def test_deep_nesting_is_written_without_recursion():
+	n = 5000
+	xs = lst.EMPTY
+	for _ in range(n):
+		xs = lst.lst(xs)
+	assert written(xs) == '[' * (n + 1) + ']' * (n + 1)
+
+def test_bad_outputs():
+	with pytest.raises(ValueError, match='Unknown flush policy: never'):
+		Sink(MemoryWriter(), flush='never')
+	with pytest.raises(TypeError):
+		sink_for(1)
@@ -0,0 +1,117 @@
+import pytest
+
+from interpreter import Interpreter
+from lexer import Lexer
+from nodes import (Variable, Apply, Assign, VarDef, FuncDef, If, While, Switch, Case, For, Range,
+	Break, Continue, Fallthrough, Return)
+from parser import Parser
+
+def parse(source):
+	return Parser().parse(list(Lexer().scan(source)))
+
+def var(name, line=1):
+	return Variable(name, 'variable', line)
+
+def op(name, x, y, line=1):
+	return Apply(Variable(name, 'operator', line), [x, y], line)
+
+NULL = var('null')
+
+def test_var():
+	assert parse('var a = 1, b') == [[VarDef('a', 1, 1), VarDef('b', NULL, 1)]]
+
+def test_expression_statement():
+	assert parse('a = b + 1') == [Assign(var('a'), op('+', var('b'), 1), False, 1)]
+
+def test_func():
+	body = [Return(op('+', var('x', 2), 1, 2), 2)]
+	assert parse('func f(x) {\n\treturn x + 1\n}') == [VarDef('f', FuncDef('f', ['x'], body, False, [], None, 1), 1)]
+
+def test_memo_func():
+	assert parse('memo(16) func f() {}') == [VarDef('f', FuncDef('f', [], [], False, [], 16, 1), 1)]
+	assert parse('memo func f() {}')[0].right.memo is True
+
+def test_memo_as_a_name():
+	assert parse('memo(1)') == [Apply(var('memo'), [1], 1)]
+
+def test_class():
+	this = VarDef('this', FuncDef('', [], None, True, [], None, 1), 1)
+	ctor = VarDef('@', FuncDef('@', ['a'], [], False, [], None, 2), 2)
+	call = Apply(var('@', 3), [var('@a', 2)], 3)
+	body = [this, ctor, call, Return(var('this', 3), 3)]
+	assert parse('class C {\n\t@(a) {}\n}') == [VarDef('C', FuncDef('C', ['@a'], body, False, [], None, 1), 1)]
+
+def test_if_else_if():
+	inner = If(var('b', 2), [], [], 2)
+	assert parse('if a {\n} else if b {\n} else {}') == [If(var('a'), [], inner, 1)]
+
+def test_while():
+	assert parse('while a { break; continue }') == [While(var('a'), [Break(1), Continue(1)], 1)]
+
+def test_for_range_with_step():
+	assert parse('for i in 0..<9 step 2 {}') == [For(var('i'), Range(0, 9, False, 1), 2, [], 1)]
+
+def test_for_range_without_step():
+	assert parse('for i in 1...3 {}') == [For(var('i'), Range(1, 3, True, 1), None, [], 1)]
+
+def test_for_in():
+	assert parse('for x in xs {}') == [For(var('x'), var('xs'), None, [], 1)]
+
+def test_switch():
+	source = 'switch a {\ncase 1, 2:\n\tfallthrough\ndefault:\n\tb\n}'
+	assert parse(source) == [Switch(var('a'), [Case([1, 2], [Fallthrough(3)], 2)], [var('b', 5)], 1)]
+
+def test_return_without_value():
+	assert parse('func f() { return }')[0].right.body == [Return(NULL, 1)]
+
+def test_yield_makes_a_generator():
+	body = parse('func g() { yield 1 }')[0].right.body
+	assert len(body) == 1 and body[0].expression.operator.name == '$generator'
+
+def expr(source):
+	return parse(source)[0]
+
+def test_precedence():
+	a, b, c = var('a'), var('b'), var('c')
+	assert expr('a + b * c') == op('+', a, op('*', b, c))
+	assert expr('(a + b) * c') == op('*', op('+', a, b), c)
+	assert expr('a < b == c') == op('==', op('<', a, b), c)
+	assert expr('!a && b || c') == op('||', op('&&', Apply(Variable('_!', 'operator', 1), [a], 1), b), c)
+
+def test_associativity():
+	a, b, c = var('a'), var('b'), var('c')
+	assert expr('a - b - c') == op('-', op('-', a, b), c)
+	assert expr('a ** b ** c') == op('**', a, op('**', b, c))
+	assert expr('a = b = 1') == Assign(a, Assign(b, 1, False, 1), False, 1)
+
+def test_unary_operators():
+	x = var('x')
+	assert expr('-x ** 2') == Apply(Variable('_-', 'operator', 1), [op('**', x, 2)], 1)
+	assert expr('x++') == Assign(x, op('+', x, 1), True, 1)
+
+def test_calls_members_and_indexes():
+	assert expr('f(1, g(2))') == Apply(var('f'), [1, Apply(var('g'), [2], 1)], 1)
+	assert expr('a.b.c') == op('.', op('.', var('a'), var('b')), var('c'))
+	assert expr('a[1] + [1, 2]') == op('+', op('[]', var('a'), 1), Apply(var('$list'), [1, 2], 1))
+	assert expr('(1, 2)') == op(',', 1, 2)
+
+def test_expressions_span_lines_inside_brackets():
+	assert expr('f(1,\n\t2)') == Apply(var('f'), [1, 2], 1)
+
+@pytest.mark.parametrize('source, message', [
+	('var 1', r'Expected a name \(line 1\)'),
+	('for i of xs {}', r'Expected in \(line 1\)'),
+	('a b', r"Unexpected token 'b' \(line 1\)"),
+	('switch a {\n\tb\n}', r"Unexpected token 'b' in switch \(line 2\)"),
+	('yield 1', r'yield outside a function \(line 1\)'),
+	('class C {\n\tyield 1\n}', r'yield outside a function \(line 2\)'),
+	('memo(0) func f() {}', r'Memo size must be a positive integer'),
+	('class C {', r'Unexpected end of input in class C'),
+])
+def test_errors(source, message):
+	with pytest.raises(Exception, match=r'\[Parser\] ' + message):
+		parse(source)
+
+def test_interpreter_parses_the_same():
+	source = 'var a = 1\nwhile a < 3 { a += 1 }'
+	assert Interpreter().parse(source) == parse(source)
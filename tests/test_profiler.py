@@ -0,0 +1,40 @@
+import sys
+
+from evaluator import init_env, run_ast
+from interpreter import Interpreter
+from profiler import Profiler
+
+def profile(source):
+	profiler = Profiler()
+	with profiler:
+		run_ast(Interpreter().parse(source), init_env())
+	return profiler
+
+def hits(profiler):
+	return dict((key, stats.hits) for key, stats in profiler.lines.items())
+
+RECURSIVE = 'func f(n) {\n\tif n == 0 { return 0 }\n\treturn f(n - 1)\n}\nf({0})'
+
+def test_a_line_is_hit_once_per_statement_run_on_it():
+	assert hits(profile(RECURSIVE.replace('{0}', '30'))) == {
+		('<program>', 1): 1, ('<program>', 5): 1, ('f', 2): 32, ('f', 3): 30}
+
+def test_while_test_is_hit_every_time():
+	assert hits(profile('var i = 0\nwhile i < 50 {\n\ti += 1\n}')) == {
+		('<program>', 1): 1, ('<program>', 2): 51, ('<program>', 3): 50}
+
+def test_lines_are_kept_per_function():
+	# line 1 defines g at the top level and is g's body
+	assert hits(profile('func g() { return 1 }\nvar x = g() + g()')) == {
+		('<program>', 1): 1, ('<program>', 2): 1, ('g', 1): 2}
+
+def test_recursion_as_deep_as_without_the_profiler():
+	limit = sys.getrecursionlimit()
+	assert hits(profile(RECURSIVE.replace('{0}', '100')))[('f', 3)] == 100
+	assert sys.getrecursionlimit() == limit
+
+def test_report_lists_lines_with_their_function():
+	import io
+	out = io.StringIO()
+	profile(RECURSIVE.replace('{0}', '5')).report(file=out)
+	assert any(line.split()[:3] == ['3', 'f', '5'] for line in out.getvalue().splitlines())
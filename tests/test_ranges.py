@@ -0,0 +1,39 @@
+from support import same_on_all
+
+def test_computed_step_of_zero_in_a_for_loop():
+	source = 'var s = 0\nprint("before")\nfor i in 0..<3 step s { print(i) }\nprint("after")'
+	assert same_on_all(source) == 'before\nerror: Range step cannot be 0\n'
+
+def test_step_that_folds_to_zero():
+	source = 'for i in 0...3 step 1 - 1 { print(i) }'
+	assert same_on_all(source) == 'error: Range step cannot be 0\n'
+
+def test_range_value_with_step_zero():
+	assert same_on_all('var s = 0\nvar r = 0..<3 step s') == 'error: Range step cannot be 0\n'
+
+def test_steps_in_for_loops():
+	source = 'for i in 0..<6 step 2 { print(i) }\nfor i in 3..>0 { print(i) }\nfor i in 1...2 step 0.5 { print(i) }'
+	assert same_on_all(source) == '0\n2\n4\n3\n2\n1\n1\n1.5\n2.0\n'
+
+def test_for_over_a_range_call():
+	source = 'for x in $range(0, 3, false) { print(x) }\nvar c = true\nfor x in $range(3, 1, c, -1) { print(x) }'
+	assert same_on_all(source) == '0\n1\n2\n3\n2\n1\n'
+
+def test_literal_step_of_zero_in_a_loaded_ast(tmp_path):
+	import json
+	import binast
+	from batch import load_program
+	from evaluator import ENGINES
+	from interpreter import Interpreter
+	from nodes import to_json
+	from support import run
+	ast = Interpreter().parse('for i in 0..<3 step 2 { print(i) }')
+	ast[0].increment = 0
+	(tmp_path / 'zero.json').write_text(json.dumps(to_json(ast)))
+	(tmp_path / 'zero.yjab').write_bytes(binast.dumps(ast))
+	for name in ('zero.json', 'zero.yjab'):
+		for optimize in (False, True):
+			program = load_program(str(tmp_path / name), Interpreter(optimize=optimize))
+			assert program.ast[0].increment == 0
+			for engine in ENGINES:
+				assert run(program, engine, optimize) == 'error: Range step cannot be 0\n', (name, engine, optimize)
@@ -0,0 +1,94 @@
+import pickle
+import bytecode
+import resolver
+from bytecode import disassemble
+from evaluator import init_env
+from interpreter import Interpreter
+from support import same_on_all
+
+# A name is the variable whose definition has run, on every engine: the
+# tree and cek engines look names up in dict frames as they run, closure
+# and vm resolve them ahead of time (resolver.py).
+
+def test_enclosing_var_after_the_inner_function():
+	source = '''var x = 1
+func outer() {
+	func inner() { return x }
+	print(inner())
+	var x = 2
+	print(inner())
+}
+outer()'''
+	assert same_on_all(source) == '1\n2\n'
+
+def test_assignment_before_the_enclosing_var():
+	source = '''var n = 0
+func outer() {
+	func bump() { n += 1 }
+	bump()
+	var n = 10
+	bump()
+	print(n)
+}
+outer()
+print(n)'''
+	assert same_on_all(source) == '11\n1\n'
+
+def test_global_defined_after_the_function():
+	source = '''func f() { return limit }
+var limit = 3
+print(f())'''
+	assert same_on_all(source) == '3\n'
+
+def test_global_used_before_its_var():
+	source = '''func f() { return later }
+print(f())
+var later = 1'''
+	assert same_on_all(source) == 'error: Cannot find variable: later (line 1)\n'
+
+def test_undefined_variable_has_a_line():
+	assert same_on_all('var a = 1\nprint(b)') == 'error: Cannot find variable: b (line 2)\n'
+	assert same_on_all('var a = 1\n\nb = 2') == 'error: Cannot find variable: b (line 3)\n'
+
+def test_forward_and_own_references():
+	source = '''func isEven(n) {
+	if n == 0 { return true }
+	return isOdd(n - 1)
+}
+func isOdd(n) {
+	if n == 0 { return false }
+	return isEven(n - 1)
+}
+func fact(n) {
+	if n < 2 { return 1 }
+	return n * fact(n - 1)
+}
+print(isEven(10))
+print(fact(5))'''
+	assert same_on_all(source) == 'True\n120\n'
+
+def test_null_is_a_value_not_unset():
+	source = '''func outer() {
+	func inner() { return x }
+	var x = null
+	print(inner())
+}
+var x = 1
+outer()'''
+	assert same_on_all(source) == 'None\n'
+
+def test_unset_survives_pickling():
+	assert pickle.loads(pickle.dumps(resolver.UNSET)) is resolver.UNSET
+
+def test_disassembly_shows_constants_and_places():
+	ast = Interpreter().parse('var x = "hi"\nfunc f() { return y }\nvar y = f()')
+	text = disassemble(bytecode.compile_program(ast, list(init_env()[1])).code)
+	assert "LOAD_CONST         0 ('hi')" in text
+	assert 'LOAD_NAME          0 (y at 1:' in text
+
+def test_for_body_var_shadows_from_the_next_iteration():
+	# a `for` keeps one frame for all its iterations
+	assert same_on_all('var x = 1\nfor i in 0..<2 {\n print(x)\n var x = 2\n}') == '1\n2\n'
+	assert same_on_all('var x = 1\nfor i in [1, 2] {\n if i == 2 { print(x) }\n var x = 2\n}') == '2\n'
+	assert same_on_all('var x = 1\nfor i in 0..<3 {\n print(x)\n x = i + 10\n var x = 2\n}\nprint(x)') == '1\n2\n2\n10\n'
+	assert same_on_all('var x = 1\nfor i in 0..<2 {\n func f() { return x }\n print(f())\n var x = 2\n}') == '1\n2\n'
@@ -0,0 +1,45 @@
+import text
+from support import same_on_all
+
+# the exp_eval tokenizer's way of scanning a string, over a char list or a view
+SCAN = '''func digits(cs) {
+	var b = builder()
+	var current = ""
+	while !cs.isEmpty {
+		if cs.head != " " {
+			b.add(cs.head)
+			current += cs.head
+		}
+		cs = cs.tail
+	}
+	print(b.toString())
+	print(current)
+}
+'''
+
+def test_views_scan_like_char_lists():
+	source = SCAN + 'digits($string_to_char_list("1 2 é3"))\ndigits(chars("1 2 é3"))'
+	assert same_on_all(source) == '12é3\n12é3\n' * 2
+
+def test_view_members():
+	source = 'var cs = chars("héllo")\nprint(cs.tail.tail.head)\nprint(cs.tail.length)\nprint(cs[1])\nprint(cs)\nprint(chars("a").tail.isEmpty)\nprint(chars("") == [])'
+	assert same_on_all(source) == "l\n4\né\n['h', 'é', 'l', 'l', 'o']\nTrue\nTrue\n"
+
+def test_builder_members():
+	source = 'var b = builder()\nb.add("ab")\nb.add(1)\nprint(b.length)\nprint(b.toString())\nb.clear()\nprint(b.length)\nprint(b.toString() == "")'
+	assert same_on_all(source) == '3\nab1\n0\nTrue\n'
+
+def test_strings_have_a_length_and_iterate():
+	assert same_on_all('print("abc".length)\nprint("".isEmpty)\nfor c in "ab" { print(c) }') == '3\nTrue\na\nb\n'
+
+def test_chars_of_a_non_string():
+	assert same_on_all('chars(1)') == 'error: Not a string: 1\n'
+
+def test_builder_joins_once():
+	b = text.StringBuilder()
+	for s in ('a', 'b', 'c'):
+		b.add(s)
+	first = b.text()
+	assert first == 'abc' and b.parts == ['abc'] and b.text() is first
+	b.add('d')
+	assert b.text() == 'abcd' and b.length == 4
@@ -0,0 +1,40 @@
+import os
+import pickle
+import subprocess
+import sys
+
+import bytecode
+import vm
+from evaluator import init_env
+from interpreter import Interpreter
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+LOOP = 'var s = 0\nfor i in 0..<3 {\n\ts += i\n}'
+
+def compile_program(source):
+	return bytecode.compile_program(Interpreter().parse(source), list(init_env()[1]))
+
+def test_disassembly_has_lines_and_jump_targets():
+	lines = bytecode.disassemble(compile_program(LOOP).code).splitlines()
+	assert lines[0] == 'Disassembly of <program>:'
+	assert lines[1].split()[:3] == ['1', '0', 'LOAD_CONST']
+	test = next(line for line in lines if 'LOOP_TEST' in line)
+	target = int(test.split()[-1])
+	assert [line.split()[-2] for line in lines if line.endswith(' POP_FRAME')] == [str(target)]
+	assert lines[-1].split()[-1] == 'RETURN_NONE'
+
+def test_functions_are_disassembled_after_the_program():
+	text = bytecode.disassemble(compile_program('func f(n) { return n + 1 }\nprint(f(1))').code)
+	assert text.index('Disassembly of <program>:') < text.index('Disassembly of f')
+
+def test_compiled_programs_pickle():
+	program = pickle.loads(pickle.dumps(compile_program(LOOP)))
+	env = init_env()
+	vm.execute(program, env)
+	assert env[1]['s'] == 3
+
+def test_dis_flag():
+	path = os.path.join(SRC, '..', 'example', 'bmi.json')
+	out = subprocess.run([sys.executable, 'evaluator.py', path, '--dis'], cwd=SRC, stdout=subprocess.PIPE,
+		universal_newlines=True, check=True).stdout
+	assert out.startswith('Disassembly of <program>:')